@@ -0,0 +1,214 @@
+"""
+Messages per second through Events.on_message and the rows built for the activity flush,
+against the nested string keyed dicts the handler used before usage.ActivityBuffer.
+
+The emoji regexes cost the same in both and dominate the handler, so every run is repeated
+with the emoji lookups memoized to show the cost of the counting itself.
+
+Run from the repository root:
+
+    python benchmarks/activity_benchmark.py [messages] [guilds] [users]
+"""
+
+import os
+import sys
+import random
+import asyncio
+import functools
+from time import perf_counter
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.events import Events  # noqa: E402
+from modules import usage, util  # noqa: E402
+
+CONTENTS = [
+    "hello",
+    "what is everyone listening to today",
+    "lol 😂",
+    "<:pog:123456789012345678> <:pog:123456789012345678>",
+    "good morning ☀️ 🌸",
+    "ok",
+    "that new album is really good, the third track especially",
+    "<a:dance:223456789012345678> 🎉",
+]
+
+
+class LegacyEvents:
+    """The accumulation part of on_message and write_usage_data before ActivityBuffer."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.xp_cache = {}
+        self.emoji_usage_cache = {"unicode": {}, "custom": {}}
+
+    async def on_message(self, message):
+        if not self.bot.is_ready():
+            return
+
+        if message.guild is None:
+            return
+
+        message_xp = util.xp_from_message(message)
+        if self.xp_cache.get(str(message.guild.id)) is None:
+            self.xp_cache[str(message.guild.id)] = {}
+        try:
+            self.xp_cache[str(message.guild.id)][str(message.author.id)]["xp"] += message_xp
+            self.xp_cache[str(message.guild.id)][str(message.author.id)]["messages"] += 1
+        except KeyError:
+            self.xp_cache[str(message.guild.id)][str(message.author.id)] = {
+                "xp": message_xp,
+                "messages": 1,
+                "bot": message.author.bot,
+            }
+
+        if message.author.bot:
+            return
+
+        self.bot.cache.autoresponse.get(str(message.guild.id), True)
+        unicode_emojis = util.find_unicode_emojis(message.content)
+        custom_emojis = util.find_custom_emojis(message.content)
+
+        unicode_cache = self.emoji_usage_cache["unicode"]
+        for emoji_name in unicode_emojis:
+            if unicode_cache.get(str(message.guild.id)) is None:
+                unicode_cache[str(message.guild.id)] = {}
+            if unicode_cache[str(message.guild.id)].get(str(message.author.id)) is None:
+                unicode_cache[str(message.guild.id)][str(message.author.id)] = {}
+            try:
+                unicode_cache[str(message.guild.id)][str(message.author.id)][emoji_name] += 1
+            except KeyError:
+                unicode_cache[str(message.guild.id)][str(message.author.id)][emoji_name] = 1
+
+        custom_cache = self.emoji_usage_cache["custom"]
+        for emoji_name, emoji_id in custom_emojis:
+            if custom_cache.get(str(message.guild.id)) is None:
+                custom_cache[str(message.guild.id)] = {}
+            if custom_cache[str(message.guild.id)].get(str(message.author.id)) is None:
+                custom_cache[str(message.guild.id)][str(message.author.id)] = {}
+            try:
+                custom_cache[str(message.guild.id)][str(message.author.id)][str(emoji_id)][
+                    "uses"
+                ] += 1
+            except KeyError:
+                custom_cache[str(message.guild.id)][str(message.author.id)][str(emoji_id)] = {
+                    "uses": 1,
+                    "name": emoji_name,
+                }
+
+    def rows(self):
+        values = []
+        for guild_id in self.xp_cache:
+            for user_id, value in self.xp_cache[guild_id].items():
+                values.append(
+                    (int(guild_id), int(user_id), value["bot"], value["xp"], value["messages"])
+                )
+        unicode_values = []
+        for guild_id, users in self.emoji_usage_cache["unicode"].items():
+            for user_id, emojis in users.items():
+                for emoji_name, uses in emojis.items():
+                    unicode_values.append((int(guild_id), int(user_id), emoji_name, uses))
+        custom_values = []
+        for guild_id, users in self.emoji_usage_cache["custom"].items():
+            for user_id, emojis in users.items():
+                for emoji_id, value in emojis.items():
+                    custom_values.append(
+                        (int(guild_id), int(user_id), value["name"], emoji_id, value["uses"])
+                    )
+        self.xp_cache = {}
+        self.emoji_usage_cache = {"unicode": {}, "custom": {}}
+        return values, unicode_values, custom_values
+
+
+def current_rows(events):
+    buffer = events.activity_buffer
+    events.activity_buffer = usage.ActivityBuffer()
+    return (
+        buffer.activity_rows(),
+        buffer.user_rows(),
+        buffer.unicode_emoji_rows(),
+        buffer.custom_emoji_rows(),
+    )
+
+
+def make_messages(count, guilds, users):
+    random.seed(0)
+    guild_objects = [SimpleNamespace(id=random.getrandbits(60)) for _ in range(guilds)]
+    user_objects = [
+        SimpleNamespace(id=random.getrandbits(60), bot=random.random() < 0.1) for _ in range(users)
+    ]
+    channel = SimpleNamespace(id=1)
+    return [
+        SimpleNamespace(
+            guild=random.choice(guild_objects),
+            author=random.choice(user_objects),
+            channel=channel,
+            content=random.choice(CONTENTS),
+            attachments=[],
+        )
+        for _ in range(count)
+    ], guild_objects
+
+
+def make_bot(guild_objects):
+    cache = SimpleNamespace(
+        votechannels={},
+        # autoresponses off, easter eggs are the same code path before and after
+        autoresponse={str(guild.id): False for guild in guild_objects},
+    )
+    return SimpleNamespace(is_ready=lambda: True, cache=cache)
+
+
+async def run(handler, messages):
+    start = perf_counter()
+    for message in messages:
+        await handler(message)
+    return perf_counter() - start
+
+
+def timed(func, *args):
+    start = perf_counter()
+    func(*args)
+    return perf_counter() - start
+
+
+def main():
+    args = [int(arg) for arg in sys.argv[1:4]]
+    count, guilds, users = args + [200000, 50, 5000][len(args) :]
+    messages, guild_objects = make_messages(count, guilds, users)
+    bot = make_bot(guild_objects)
+
+    legacy = LegacyEvents(bot)
+    # the cog is never added to a bot, so skip __init__ and its background loops
+    events = Events.__new__(Events)
+    events.bot = bot
+    events.activity_buffer = usage.ActivityBuffer()
+
+    loop = asyncio.new_event_loop()
+    print(f"{count} messages, {guilds} guilds, {users} users")
+    find_unicode_emojis = util.find_unicode_emojis
+    find_custom_emojis = util.find_custom_emojis
+    for emoji_parsing in ["parsed", "memoized"]:
+        if emoji_parsing == "memoized":
+            util.find_unicode_emojis = functools.lru_cache(maxsize=None)(find_unicode_emojis)
+            util.find_custom_emojis = functools.lru_cache(maxsize=None)(find_custom_emojis)
+
+        for name, handler, rows in [
+            ("nested dicts", legacy.on_message, legacy.rows),
+            ("ActivityBuffer", events.on_message, lambda: current_rows(events)),
+        ]:
+            # warm up the regexes and caches
+            loop.run_until_complete(run(handler, messages[:1000]))
+            rows()
+            elapsed = loop.run_until_complete(run(handler, messages))
+            flush = timed(rows)
+            print(
+                f"emojis {emoji_parsing:>8} | {name:>14}: {count / elapsed:>10,.0f} msg/s "
+                f"through the handler, flush rows built in {flush * 1000:.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
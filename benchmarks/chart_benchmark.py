@@ -0,0 +1,162 @@
+"""
+Labeled chart render times: chart.compose_grid in a worker process against the HTML renderer
+with the fm_chart template that it replaced.
+
+Synthetic covers are written to a temporary directory. The pillow side reads them from there,
+like covers already in the image store, and they are served over http for the HTML renderer.
+The HTML side needs a running renderer (RENDERER_URLS, default http://localhost:3000) that
+can reach this machine at --host, and is skipped when none answers.
+
+Run from the repository root:
+
+    CHART_FONT=/path/to/font.ttf python benchmarks/chart_benchmark.py [--sizes 3 5 10]
+"""
+
+import os
+import sys
+import random
+import asyncio
+import argparse
+import statistics
+import tempfile
+import concurrent.futures
+from time import perf_counter
+import aiohttp
+from aiohttp import web
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import chart, util  # noqa: E402
+
+LABELS = [
+    "{0} plays<br>Short album",
+    "{0} plays<br>A very long album name that does not fit on one row of the tile",
+    "{0} plays<br>아주 긴 한국어 앨범 이름은 타일 한 줄에 들어가지 않습니다",
+    "{0} plays<br>ずっと真夜中でいいのに。の長いアルバムのタイトル",
+]
+
+
+def make_covers(directory, count):
+    random.seed(0)
+    names = []
+    for i in range(count):
+        color = tuple(random.randrange(256) for _ in range(3))
+        image = Image.new("RGB", (300, 300), color)
+        image.paste(tuple(255 - c for c in color), (50, 50, 250, 250))
+        name = f"cover{i}.jpg"
+        image.save(os.path.join(directory, name), quality=90)
+        names.append(name)
+    return names
+
+
+def report(name, times):
+    times = sorted(times)
+    p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+    print(f"{name:>24}: median {statistics.median(times):>8.1f}ms  p95 {p95:>8.1f}ms")
+
+
+async def serve(directory, port):
+    app = web.Application()
+    app.router.add_static("/", directory)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "0.0.0.0", port).start()
+    return runner
+
+
+async def time_pillow(pool, paths, labels, size, font_path, repeat):
+    loop = asyncio.get_event_loop()
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        await loop.run_in_executor(pool, chart.compose_grid, paths, labels, size, size, font_path)
+        times.append((perf_counter() - start) * 1000)
+    return times
+
+
+async def time_html(session, renderer_url, template, urls, labels, size, repeat):
+    img_div_template = '<div class="art"><img src="{0}"><p class="label">{1}</p></div>'
+    img_divs = "\n".join(img_div_template.format(*item) for item in zip(urls, labels))
+    payload = {
+        "html": util.format_html(
+            template, {"WIDTH": 300 * size, "HEIGHT": 300 * size, "CHART_ITEMS": img_divs}
+        ),
+        "width": 300 * size,
+        "height": 300 * size,
+        "imageFormat": "jpeg",
+    }
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        async with session.post(f"{renderer_url}/html", data=payload) as response:
+            response.raise_for_status()
+            await response.read()
+        times.append((perf_counter() - start) * 1000)
+    return times
+
+
+async def run(args):
+    font_path = os.environ.get("CHART_FONT")
+    if not font_path:
+        sys.exit("Set CHART_FONT to a TrueType font to draw the labels with")
+
+    renderer_url = os.environ.get("RENDERER_URLS", "http://localhost:3000").split(",")[0]
+    with open("html/fm_chart.min.html", "r", encoding="utf-8") as file:
+        template = file.read().replace("\n", "")
+
+    with tempfile.TemporaryDirectory() as directory:
+        names = make_covers(directory, max(args.sizes) ** 2)
+        runner = await serve(directory, args.port)
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=1)
+        try:
+            async with aiohttp.ClientSession() as session:
+                try:
+                    async with session.get(renderer_url):
+                        html_available = True
+                except aiohttp.ClientError as e:
+                    print(f"No renderer at {renderer_url} ({e}), timing pillow only")
+                    html_available = False
+
+                for size in args.sizes:
+                    count = size * size
+                    labels = [LABELS[i % len(LABELS)].format(i + 1) for i in range(count)]
+                    paths = [os.path.join(directory, name) for name in names[:count]]
+                    label_lines = [label.split("<br>") for label in labels]
+                    print(f"{size}x{size} chart, {args.repeat} renders")
+                    # the first render loads the font in the worker
+                    await time_pillow(pool, paths, label_lines, size, font_path, 1)
+                    report(
+                        "pillow compose_grid",
+                        await time_pillow(pool, paths, label_lines, size, font_path, args.repeat),
+                    )
+                    if html_available:
+                        report(
+                            "HTML renderer",
+                            await time_html(
+                                session,
+                                renderer_url,
+                                template,
+                                [f"http://{args.host}:{args.port}/{n}" for n in names[:count]],
+                                labels,
+                                size,
+                                args.repeat,
+                            ),
+                        )
+        finally:
+            pool.shutdown()
+            await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3, 5, 10])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--host", default="localhost", help="host the renderer reaches us at")
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+fm colorchart nearest colour lookup: the old per call kdtree against ColorIndex.
+
+Needs the kdtree package the old path used (pip install kdtree). Run from the repository root:
+
+    python benchmarks/colorindex_benchmark.py [album counts...]
+"""
+
+import os
+import sys
+import random
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import kdtree  # noqa: E402
+from modules.colorindex import ColorIndex  # noqa: E402
+
+RAINBOW = [
+    (255, 0, 0),
+    (255, 127, 0),
+    (255, 255, 0),
+    (0, 255, 0),
+    (0, 0, 255),
+    (75, 0, 130),
+    (148, 0, 211),
+]
+K = 14  # width + height of the 7x7 rainbow chart
+
+
+class AlbumColorNode(object):
+    """The point class the kdtree path used."""
+
+    def __init__(self, rgb, image_url):
+        self.rgb = rgb
+        self.data = image_url
+
+    def __len__(self):
+        return len(self.rgb)
+
+    def __getitem__(self, i):
+        return self.rgb[i]
+
+
+def kdtree_path(image_ids, colors):
+    tree = kdtree.create([AlbumColorNode(rgb, i) for i, rgb in zip(image_ids, colors)])
+    return [list(tree.search_knn(rgb, K)) for rgb in RAINBOW]
+
+
+def index_path(image_ids, colors, space):
+    return ColorIndex(image_ids, colors, space=space).knn(RAINBOW, K)
+
+
+def cached_index_path(index):
+    return index.knn(RAINBOW, K)
+
+
+def timed(func, *args, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = perf_counter()
+        func(*args)
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [500, 2000, 10000, 50000]
+    random.seed(0)
+    print(f"{'albums':>8} {'kdtree':>10} {'index rgb':>10} {'index lab':>10} {'reused':>10}")
+    for count in counts:
+        image_ids = [f"{i:032x}" for i in range(count)]
+        colors = [tuple(random.randrange(256) for _ in range(3)) for _ in range(count)]
+
+        # both paths must find the same distances (kdtree reports them squared)
+        expected = [[round(d**0.5, 3) for _, d in q] for q in kdtree_path(image_ids, colors)]
+        got = [[round(d, 3) for _, _, d in q] for q in index_path(image_ids, colors, "rgb")]
+        assert expected == got, "results differ"
+
+        index = ColorIndex(image_ids, colors)
+        print(
+            f"{count:>8} "
+            f"{timed(kdtree_path, image_ids, colors):>8.1f}ms "
+            f"{timed(index_path, image_ids, colors, 'rgb'):>8.1f}ms "
+            f"{timed(index_path, image_ids, colors, 'lab'):>8.1f}ms "
+            f"{timed(cached_index_path, index):>8.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
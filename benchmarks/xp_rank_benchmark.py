@@ -0,0 +1,236 @@
+"""
+XP rank queries on MariaDB: RANK() over the summed hourly columns against counting
+through the xp index, on a few million synthetic user_activity rows.
+
+Everything goes into bench_ prefixed copies of the tables, in the database named by
+MISOBOT_BENCH_DB_NAME, using MISOBOT_DB_USER and MISOBOT_DB_PASSWORD on localhost.
+Run from the repository root:
+
+    python benchmarks/xp_rank_benchmark.py generate [--rows 3000000] [--users 1000000]
+    python benchmarks/xp_rank_benchmark.py run [--samples 20]
+"""
+
+import os
+import re
+import sys
+import random
+import argparse
+import statistics
+from time import perf_counter
+import pymysql
+
+ACTIVITY_TABLE = "bench_user_activity"
+GLOBAL_TABLE = "bench_user_xp_global"
+HOURS = "+".join(f"h{hour}" for hour in range(24))
+HOUR_COLUMNS = ", ".join(f"h{hour}" for hour in range(24))
+BATCH_SIZE = 5000
+
+OLD_GLOBAL_RANK = f"""
+    SELECT (SELECT COUNT(DISTINCT(user_id)) FROM {ACTIVITY_TABLE} WHERE not is_bot),
+    ranking FROM (
+        SELECT RANK() OVER(ORDER BY xp DESC) AS ranking, user_id, SUM({HOURS}) as xp
+        FROM {ACTIVITY_TABLE}
+        WHERE not is_bot
+        GROUP BY user_id
+    ) as sub
+    WHERE user_id = %s
+"""
+NEW_GLOBAL_RANK = f"""
+    SELECT
+        (SELECT COUNT(*) FROM {GLOBAL_TABLE}
+            WHERE activity_table = 'user_activity' AND NOT is_bot),
+        (SELECT COUNT(*) + 1 FROM {GLOBAL_TABLE}
+            WHERE activity_table = 'user_activity' AND NOT is_bot AND xp > me.xp)
+    FROM {GLOBAL_TABLE} me
+    WHERE activity_table = 'user_activity' AND user_id = %s AND NOT is_bot
+"""
+OLD_GUILD_RANK = f"""
+    SELECT (SELECT COUNT(user_id) FROM {ACTIVITY_TABLE} WHERE not is_bot AND guild_id = %s),
+    ranking FROM (
+        SELECT RANK() OVER(ORDER BY xp DESC) AS ranking, user_id, SUM({HOURS}) as xp
+        FROM {ACTIVITY_TABLE}
+        WHERE not is_bot
+        AND guild_id = %s
+        GROUP BY user_id
+    ) as sub
+    WHERE user_id = %s
+"""
+NEW_GUILD_RANK = f"""
+    SELECT
+        (SELECT COUNT(*) FROM {ACTIVITY_TABLE}
+            WHERE guild_id = %s AND NOT is_bot),
+        (SELECT COUNT(*) + 1 FROM {ACTIVITY_TABLE}
+            WHERE guild_id = %s AND NOT is_bot AND xp > me.xp)
+    FROM {ACTIVITY_TABLE} me
+    WHERE guild_id = %s AND user_id = %s AND NOT is_bot
+"""
+
+
+def connect():
+    database = os.environ.get("MISOBOT_BENCH_DB_NAME")
+    if not database:
+        sys.exit("Set MISOBOT_BENCH_DB_NAME to the database to run the benchmark in")
+
+    return pymysql.connect(
+        host="localhost",
+        port=3306,
+        user=os.environ.get("MISOBOT_DB_USER"),
+        password=os.environ.get("MISOBOT_DB_PASSWORD"),
+        db=database,
+        autocommit=True,
+    )
+
+
+def create_statement(schema, table, new_name):
+    """The CREATE TABLE statement of table in schema.sql, renamed."""
+    match = re.search(rf"CREATE TABLE IF NOT EXISTS {table} \(.*?\n\);", schema, re.S)
+    return match.group(0).replace(f"EXISTS {table} (", f"EXISTS {new_name} (", 1)
+
+
+def generate(args):
+    with open(os.path.join(os.path.dirname(__file__), "..", "sql", "schema.sql")) as file:
+        schema = file.read()
+
+    random.seed(0)
+    connection = connect()
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {ACTIVITY_TABLE}, {GLOBAL_TABLE}")
+        cursor.execute(create_statement(schema, "user_activity", ACTIVITY_TABLE))
+        cursor.execute(create_statement(schema, "user_xp_global", GLOBAL_TABLE))
+
+        # a few huge guilds and a long tail of small ones, like the real data
+        guild_weights = [1 / (rank + 1) for rank in range(args.guilds)]
+        bots = set(random.sample(range(args.users), args.users // 100))
+        insert = f"""
+            INSERT IGNORE INTO {ACTIVITY_TABLE}
+                (guild_id, user_id, is_bot, message_count, {HOUR_COLUMNS}, xp)
+                VALUES ({", ".join(["%s"] * 28)})
+        """
+        rows = []
+        start = perf_counter()
+        guilds = random.choices(range(args.guilds), weights=guild_weights, k=args.rows)
+        for i, guild_id in enumerate(guilds):
+            user_id = random.randrange(args.users)
+            # activity is heavily skewed, most members barely talk
+            hours = [int(random.paretovariate(1.5)) - 1 for _ in range(24)]
+            rows.append(
+                (
+                    guild_id + 1,
+                    user_id + 1,
+                    user_id in bots,
+                    sum(hours) // 3 + 1,
+                    *hours,
+                    sum(hours),
+                )
+            )
+            if len(rows) >= BATCH_SIZE:
+                cursor.executemany(insert, rows)
+                rows = []
+                if (i + 1) % 500000 < BATCH_SIZE:
+                    print(f"{i + 1} rows generated ({perf_counter() - start:.0f}s)")
+        if rows:
+            cursor.executemany(insert, rows)
+
+        cursor.execute(
+            f"""
+            INSERT INTO {GLOBAL_TABLE} (activity_table, user_id, is_bot, xp, message_count)
+                SELECT 'user_activity', user_id, MAX(is_bot), SUM(xp), SUM(message_count)
+                FROM {ACTIVITY_TABLE} GROUP BY user_id
+            """
+        )
+        cursor.execute(f"ANALYZE TABLE {ACTIVITY_TABLE}, {GLOBAL_TABLE}")
+        cursor.execute(f"SELECT COUNT(*), COUNT(DISTINCT guild_id) FROM {ACTIVITY_TABLE}")
+        total, guild_count = cursor.fetchone()
+        print(f"{total} activity rows in {guild_count} guilds in {perf_counter() - start:.0f}s")
+
+
+def timed(cursor, statement, params, repeat):
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        cursor.execute(statement, params)
+        result = cursor.fetchall()
+        times.append((perf_counter() - start) * 1000)
+    return times, result
+
+
+def report(name, times):
+    times = sorted(times)
+    p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+    print(f"{name:>20}: median {statistics.median(times):>9.2f}ms  p95 {p95:>9.2f}ms")
+
+
+def run(args):
+    connection = connect()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT guild_id, COUNT(*) FROM {ACTIVITY_TABLE} "
+            "GROUP BY guild_id ORDER BY COUNT(*) DESC LIMIT 1"
+        )
+        big_guild, big_guild_size = cursor.fetchone()
+        cursor.execute(
+            f"SELECT guild_id, user_id FROM {ACTIVITY_TABLE} WHERE NOT is_bot AND guild_id = %s "
+            "ORDER BY RAND() LIMIT %s",
+            (big_guild, args.samples),
+        )
+        members = cursor.fetchall()
+        print(f"Guild ranks in the biggest guild ({big_guild_size} members)")
+
+        results = {}
+        for name, statement, params, repeat in [
+            ("old global rank", OLD_GLOBAL_RANK, lambda g, u: (u,), args.old_repeat),
+            ("new global rank", NEW_GLOBAL_RANK, lambda g, u: (u,), 1),
+            ("old guild rank", OLD_GUILD_RANK, lambda g, u: (g, g, u), 1),
+            ("new guild rank", NEW_GUILD_RANK, lambda g, u: (g, g, g, u), 1),
+        ]:
+            times = []
+            # the old global query scans everything, a few samples are enough
+            sample = members[: args.old_samples] if name == "old global rank" else members
+            for guild_id, user_id in sample:
+                elapsed, result = timed(cursor, statement, params(guild_id, user_id), repeat)
+                times += elapsed
+                results.setdefault(name.split(" ", 1)[1], {}).setdefault(user_id, []).append(
+                    result[0][1] if result else None
+                )
+            report(name, times)
+
+        for kind, ranks in results.items():
+            mismatched = [
+                user_id
+                for user_id, found in ranks.items()
+                if len(found) == 2 and found[0] != found[1]
+            ]
+            if mismatched:
+                print(f"{kind}: old and new ranks differ for users {mismatched[:5]}")
+
+        guild_id, user_id = members[0]
+        for name, statement, params in [
+            ("new global rank", NEW_GLOBAL_RANK, (user_id,)),
+            ("new guild rank", NEW_GUILD_RANK, (guild_id, guild_id, guild_id, user_id)),
+        ]:
+            cursor.execute("EXPLAIN " + statement, params)
+            print(f"\nEXPLAIN {name}")
+            for row in cursor.fetchall():
+                print("  ", row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate_parser = commands.add_parser("generate", help="create and fill the bench tables")
+    generate_parser.add_argument("--rows", type=int, default=3000000)
+    generate_parser.add_argument("--users", type=int, default=1000000)
+    generate_parser.add_argument("--guilds", type=int, default=5000)
+    run_parser = commands.add_parser("run", help="time the rank queries")
+    run_parser.add_argument("--samples", type=int, default=20)
+    run_parser.add_argument("--old-samples", type=int, default=3)
+    run_parser.add_argument("--old-repeat", type=int, default=1)
+    args = parser.parse_args()
+    if args.command == "generate":
+        generate(args)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -42,7 +42,10 @@ class Configuration(commands.Cog):
             raise exceptions.Warning("Prefix cannot be over 32 characters.")
 
         prefix = prefix.lstrip()
-        await self.bot.db.execute(
+        await self.bot.cache.set_value(
+            "prefixes",
+            str(ctx.guild.id),
+            prefix,
             """
             INSERT INTO guild_prefix (guild_id, prefix)
                 VALUES (%s, %s)
@@ -52,7 +55,6 @@ class Configuration(commands.Cog):
             ctx.guild.id,
             prefix,
         )
-        self.bot.cache.prefixes[str(ctx.guild.id)] = prefix
         await util.send_success(
             ctx,
             f"Command prefix for this server is now `{prefix}`. "
@@ -70,6 +72,7 @@ class Configuration(commands.Cog):
     async def greeter_toggle(self, ctx, value: bool):
         """Enable or disable the greeter."""
         await queries.update_setting(ctx, "greeter_settings", "is_enabled", value)
+        self.bot.cache.invalidate_guild_settings(ctx.guild.id)
         if value:
             await util.send_success(ctx, "Greeter is now **enabled**")
         else:
@@ -79,6 +82,7 @@ class Configuration(commands.Cog):
     async def greeter_channel(self, ctx, *, channel: discord.TextChannel):
         """Set the greeter channel."""
         await queries.update_setting(ctx, "greeter_settings", "channel_id", channel.id)
+        self.bot.cache.invalidate_guild_settings(ctx.guild.id)
         await util.send_success(ctx, f"Greeter channel is now {channel.mention}")
 
     @greeter.command(name="message")
@@ -91,6 +95,7 @@ class Configuration(commands.Cog):
             message = None
 
         await queries.update_setting(ctx, "greeter_settings", "message_format", message)
+        self.bot.cache.invalidate_guild_settings(ctx.guild.id)
 
         preview = util.create_welcome_embed(ctx.author, ctx.guild, message)
         await ctx.send(
@@ -109,6 +114,7 @@ class Configuration(commands.Cog):
     async def goodbye_toggle(self, ctx, value: bool):
         """Enable or disable the goodbye messages."""
         await queries.update_setting(ctx, "goodbye_settings", "is_enabled", value)
+        self.bot.cache.invalidate_guild_settings(ctx.guild.id)
         if value:
             await util.send_success(ctx, "Goodbye messages are now **enabled**")
         else:
@@ -118,6 +124,7 @@ class Configuration(commands.Cog):
     async def goodbye_channel(self, ctx, *, channel: discord.TextChannel):
         """Set the goodbye messages channel."""
         await queries.update_setting(ctx, "goodbye_settings", "channel_id", channel.id)
+        self.bot.cache.invalidate_guild_settings(ctx.guild.id)
         await util.send_success(ctx, f"Goodbye messages channel is now {channel.mention}")
 
     @goodbyemessage.command(name="message")
@@ -130,6 +137,7 @@ class Configuration(commands.Cog):
             message = None
 
         await queries.update_setting(ctx, "goodbye_settings", "message_format", message)
+        self.bot.cache.invalidate_guild_settings(ctx.guild.id)
 
         preview = util.create_goodbye_message(ctx.author, ctx.guild, message)
         await ctx.send(
@@ -156,6 +164,7 @@ class Configuration(commands.Cog):
             "member_log_channel_id",
             channel.id if channel is not None else None,
         )
+        self.bot.cache.invalidate_guild_settings(ctx.guild.id)
         if channel is None:
             await util.send_success(ctx, "Members logging **disabled**")
         else:
@@ -174,6 +183,7 @@ class Configuration(commands.Cog):
             "ban_log_channel_id",
             channel.id if channel is not None else None,
         )
+        self.bot.cache.invalidate_guild_settings(ctx.guild.id)
         if channel is None:
             await util.send_success(ctx, "Bans logging **disabled**")
         else:
@@ -197,6 +207,7 @@ class Configuration(commands.Cog):
             "message_log_channel_id",
             channel.id if channel is not None else None,
         )
+        self.bot.cache.invalidate_guild_settings(ctx.guild.id)
         if channel is None:
             await util.send_success(ctx, "Deleted message logging **disabled**")
         else:
@@ -212,9 +223,8 @@ class Configuration(commands.Cog):
             ctx.guild.id,
             channel.id,
         )
-        await util.send_success(
-            ctx, f"No longer logging any messages deleted in {channel.mention}"
-        )
+        self.bot.cache.invalidate_guild_settings(ctx.guild.id)
+        await util.send_success(ctx, f"No longer logging any messages deleted in {channel.mention}")
 
     @logger_deleted.command(name="unignore")
     async def deleted_unignore(self, ctx, *, channel: discord.TextChannel):
@@ -224,6 +234,7 @@ class Configuration(commands.Cog):
             ctx.guild.id,
             channel.id,
         )
+        self.bot.cache.invalidate_guild_settings(ctx.guild.id)
         await util.send_success(
             ctx, f"{channel.mention} is no longer being ignored from deleted message logging."
         )
@@ -233,8 +244,19 @@ class Configuration(commands.Cog):
     @commands.has_permissions(manage_messages=True)
     async def levelup(self, ctx, value: bool):
         """Enable or disable levelup messages."""
-        await queries.update_setting(ctx, "guild_settings", "levelup_messages", value)
-        self.bot.cache.levelupmessage[str(ctx.guild.id)] = value
+        await self.bot.cache.set_value(
+            "levelupmessage",
+            str(ctx.guild.id),
+            value,
+            """
+            INSERT INTO guild_settings (guild_id, levelup_messages)
+                VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE
+                levelup_messages = VALUES(levelup_messages)
+            """,
+            ctx.guild.id,
+            value,
+        )
         if value:
             await util.send_success(ctx, "Level up messages are now **enabled**")
         else:
@@ -251,12 +273,14 @@ class Configuration(commands.Cog):
     async def starboard_channel(self, ctx, channel: discord.TextChannel):
         """Set starboard channel."""
         await queries.update_setting(ctx, "starboard_settings", "channel_id", channel.id)
+        self.bot.cache.invalidate_guild_settings(ctx.guild.id)
         await util.send_success(ctx, f"Starboard channel is now {channel.mention}")
 
     @starboard.command(name="amount")
     async def starboard_amount(self, ctx, amount: int):
         """Change the amount of reactions required to starboard a message."""
         await queries.update_setting(ctx, "starboard_settings", "reaction_count", amount)
+        self.bot.cache.invalidate_guild_settings(ctx.guild.id)
         emoji_name, emoji_id, emoji_type = await self.bot.db.execute(
             """
             SELECT emoji_name, emoji_id, emoji_type
@@ -278,6 +302,7 @@ class Configuration(commands.Cog):
     async def starboard_toggle(self, ctx, value: bool):
         """Enable or disable the starboard."""
         await queries.update_setting(ctx, "starboard_settings", "is_enabled", value)
+        self.bot.cache.invalidate_guild_settings(ctx.guild.id)
         if value:
             await util.send_success(ctx, "Starboard is now **enabled**")
         else:
@@ -306,6 +331,7 @@ class Configuration(commands.Cog):
                 emoji_obj.id,
                 "custom",
             )
+            self.bot.cache.invalidate_guild_settings(ctx.guild.id)
             await util.send_success(
                 ctx, f"Starboard emoji is now {emoji} (emoji id `{emoji_obj.id}`)"
             )
@@ -329,6 +355,7 @@ class Configuration(commands.Cog):
                 None,
                 "unicode",
             )
+            self.bot.cache.invalidate_guild_settings(ctx.guild.id)
             await util.send_success(ctx, f"Starboard emoji is now {emoji}")
 
     @commands.group()
@@ -355,7 +382,10 @@ class Configuration(commands.Cog):
         else:
             raise exceptions.Warning(f"Unknown reaction type `{reaction_type}`", help_footer=True)
 
-        await self.bot.db.execute(
+        await self.bot.cache.set_value(
+            "votechannels",
+            channel.id,
+            channel_type,
             """
             INSERT INTO voting_channel (guild_id, channel_id, voting_type)
                 VALUES (%s, %s, %s)
@@ -366,7 +396,6 @@ class Configuration(commands.Cog):
             channel.id,
             channel_type,
         )
-        self.bot.cache.votechannels.add(channel.id)
         await util.send_success(
             ctx, f"{channel.mention} is now a voting channel of type `{channel_type}`"
         )
@@ -374,12 +403,13 @@ class Configuration(commands.Cog):
     @votechannel.command(name="remove")
     async def votechannel_remove(self, ctx, *, channel: discord.TextChannel):
         """Remove a voting channel."""
-        await self.bot.db.execute(
+        await self.bot.cache.delete_value(
+            "votechannels",
+            channel.id,
             "DELETE FROM voting_channel WHERE guild_id = %s and channel_id = %s",
             ctx.guild.id,
             channel.id,
         )
-        self.bot.cache.votechannels.discard(channel.id)
         await util.send_success(ctx, f"{channel.mention} is no longer a voting channel.")
 
     @votechannel.command(name="list")
@@ -424,6 +454,7 @@ class Configuration(commands.Cog):
         await self.bot.db.execute(
             "INSERT IGNORE autorole (guild_id, role_id) VALUES (%s, %s)", ctx.guild.id, role.id
         )
+        self.bot.cache.invalidate_guild_settings(ctx.guild.id)
         await util.send_success(ctx, f"New members will now automatically get {role.mention}")
 
     @autorole.command(name="remove")
@@ -437,6 +468,7 @@ class Configuration(commands.Cog):
         await self.bot.db.execute(
             "DELETE FROM autorole WHERE guild_id = %s AND role_id = %s", ctx.guild.id, role_id
         )
+        self.bot.cache.invalidate_guild_settings(ctx.guild.id)
         await util.send_success(ctx, f"No longer giving new members <@&{role_id}>")
 
     @autorole.command(name="list")
@@ -464,8 +496,19 @@ class Configuration(commands.Cog):
     @commands.has_permissions(manage_messages=True)
     async def autoresponses(self, ctx, value: bool):
         """Disable or enable automatic responses to certain message content."""
-        await queries.update_setting(ctx, "guild_settings", "autoresponses", value)
-        self.bot.cache.autoresponse[str(ctx.guild.id)] = value
+        await self.bot.cache.set_value(
+            "autoresponse",
+            str(ctx.guild.id),
+            value,
+            """
+            INSERT INTO guild_settings (guild_id, autoresponses)
+                VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE
+                autoresponses = VALUES(autoresponses)
+            """,
+            ctx.guild.id,
+            value,
+        )
         if value:
             await util.send_success(ctx, "Automatic responses are now **enabled**")
         else:
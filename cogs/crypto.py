@@ -1,5 +1,4 @@
 import discord
-import aiohttp
 import re
 from discord.ext import commands
 from decimal import Decimal
@@ -48,11 +47,10 @@ class Cryptocurrency(commands.Cog):
             raise exceptions.Error("Limit must be 100 or less.")
 
         symbol = (coin + pair).upper()
-        async with aiohttp.ClientSession() as session:
-            url = "https://api.binance.com/api/v3/klines"
-            params = {"symbol": symbol, "interval": interval, "limit": limit}
-            async with session.get(url, params=params) as response:
-                data = await response.json()
+        url = "https://api.binance.com/api/v3/klines"
+        params = {"symbol": symbol, "interval": interval, "limit": limit}
+        async with self.bot.session.get(url, params=params) as response:
+            data = await response.json()
 
         if isinstance(data, dict):
             raise exceptions.Error(data.get("msg"))
@@ -73,23 +71,14 @@ class Cryptocurrency(commands.Cog):
             return str(replacements[m.group().strip("$")])
 
         formatted_html = re.sub(r"\$(\S*)\$", dictsub, self.candlestick_chart_html)
-        async with aiohttp.ClientSession() as session:
-            data = {
-                "html": formatted_html,
-                "width": 720,
-                "height": 512,
-                "imageFormat": "png",
-            }
-            async with session.post("http://localhost:3000/html", data=data) as response:
-                with open("downloads/candlestick.png", "wb") as f:
-                    while True:
-                        block = await response.content.read(1024)
-                        if not block:
-                            break
-                        f.write(block)
-
-        with open("downloads/candlestick.png", "rb") as f:
-            await ctx.send(file=discord.File(f))
+        data = {
+            "html": formatted_html,
+            "width": 720,
+            "height": 512,
+            "imageFormat": "png",
+        }
+        buffer = await util.render_html(self.bot, data)
+        await ctx.send(file=discord.File(fp=buffer, filename="candlestick.png"))
 
     @crypto.command()
     async def price(self, ctx, coin, pair="USDT"):
@@ -97,9 +86,8 @@ class Cryptocurrency(commands.Cog):
         symbol = (coin + pair).upper()
         url = "https://api.binance.com/api/v3/ticker/24hr"
         params = {"symbol": symbol}
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                data = await response.json()
+        async with self.bot.session.get(url, params=params) as response:
+            data = await response.json()
 
         error = data.get("msg")
         if error:
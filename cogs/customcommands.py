@@ -1,17 +1,86 @@
 import discord
 import arrow
+import bisect
 from discord.ext import commands
 from modules import queries, exceptions, util, log
 
 command_logger = log.get_command_logger()
 
 
+class TriggerIndex:
+    """
+    Custom commands of one guild.
+
+    Triggers are matched case insensitively, same as the database does.
+    Lowercase triggers are also kept sorted for prefix searches.
+    """
+
+    def __init__(self):
+        # lowercase trigger : (trigger, response)
+        self.commands = {}
+        self.sorted_keys = []
+
+    def __len__(self):
+        return len(self.commands)
+
+    def get(self, trigger):
+        """:returns : Response of the trigger or None"""
+        command = self.commands.get(trigger.lower())
+        return command[1] if command is not None else None
+
+    def add(self, trigger, response):
+        key = trigger.lower()
+        if key not in self.commands:
+            bisect.insort(self.sorted_keys, key)
+        self.commands[key] = (trigger, response)
+
+    def remove(self, trigger):
+        key = trigger.lower()
+        if self.commands.pop(key, None) is not None:
+            del self.sorted_keys[bisect.bisect_left(self.sorted_keys, key)]
+
+    def triggers(self, prefix=""):
+        """:returns : List of triggers starting with prefix, in alphabetical order"""
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self.sorted_keys, prefix)
+        result = []
+        for key in self.sorted_keys[start:]:
+            if not key.startswith(prefix):
+                break
+            result.append(self.commands[key][0])
+        return result
+
+
 class CustomCommands(commands.Cog, name="Commands"):
     """Custom server commands"""
 
     def __init__(self, bot):
         self.bot = bot
         self.icon = "📌"
+        # guild_id : TriggerIndex
+        self.custom_commands = {}
+        bot.loop.create_task(self.load_custom_commands())
+
+    async def load_custom_commands(self):
+        custom_commands = {}
+        data = await self.bot.db.execute(
+            "SELECT guild_id, command_trigger, content FROM custom_command"
+        )
+        for guild_id, command_trigger, content in data:
+            index = custom_commands.get(guild_id)
+            if index is None:
+                index = TriggerIndex()
+                custom_commands[guild_id] = index
+            index.add(command_trigger, content)
+
+        self.custom_commands = custom_commands
+
+    def trigger_index(self, guild_id):
+        index = self.custom_commands.get(guild_id)
+        if index is None:
+            index = TriggerIndex()
+            self.custom_commands[guild_id] = index
+        return index
 
     def bot_command_list(self, match=""):
         """Returns list of bot commands."""
@@ -43,18 +112,12 @@ class CustomCommands(commands.Cog, name="Commands"):
 
         return filtered_commands
 
-    async def custom_command_list(self, guild_id, match=""):
-        """Returns a list of custom commands on server."""
-        command_list = set()
-        data = await self.bot.db.execute(
-            "SELECT command_trigger FROM custom_command WHERE guild_id = %s", guild_id
-        )
-        for command_name in data:
-            command_name = command_name[0]
-            if match == "" or match in command_name:
-                command_list.add(command_name)
-
-        return command_list
+    def custom_command_list(self, guild_id, match=""):
+        """Returns a list of custom commands on server that start with match."""
+        index = self.custom_commands.get(guild_id)
+        if index is None:
+            return []
+        return index.triggers(match)
 
     async def can_add_commands(self, ctx):
         """Checks if guild is restricting command adding and whether the current user can add commands."""
@@ -78,27 +141,15 @@ class CustomCommands(commands.Cog, name="Commands"):
         error = getattr(error, "original", error)
         if isinstance(error, commands.CommandNotFound):
             keyword = ctx.message.content[len(ctx.prefix) :].split(" ", 1)[0]
-            response = await self.bot.db.execute(
-                "SELECT content FROM custom_command WHERE guild_id = %s AND command_trigger = %s",
-                ctx.guild.id,
-                keyword,
-                one_value=True,
-            )
+            index = self.custom_commands.get(ctx.guild.id)
+            if index is None:
+                return
+
+            response = index.get(keyword)
             if response:
                 command_logger.info(log.custom_command_format(ctx, keyword))
                 await ctx.send(response)
-                await self.bot.db.execute(
-                    """
-                    INSERT INTO command_usage (guild_id, user_id, command_name, command_type)
-                        VALUES (%s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE
-                        uses = uses + 1
-                    """,
-                    ctx.guild.id,
-                    ctx.author.id,
-                    keyword,
-                    "custom",
-                )
+                self.bot.command_usage.add(ctx.guild.id, ctx.author.id, keyword, "custom")
 
     @commands.group()
     @commands.guild_only()
@@ -114,12 +165,7 @@ class CustomCommands(commands.Cog, name="Commands"):
 
         if name in self.bot_command_list():
             raise exceptions.Warning(f"`{ctx.prefix}{name}` is already a built in command!")
-        if await self.bot.db.execute(
-            "SELECT content FROM custom_command WHERE guild_id = %s AND command_trigger = %s",
-            ctx.guild.id,
-            name,
-            one_value=True,
-        ):
+        if self.trigger_index(ctx.guild.id).get(name) is not None:
             raise exceptions.Warning(
                 f"Custom command `{ctx.prefix}{name}` already exists on this server!"
             )
@@ -132,6 +178,7 @@ class CustomCommands(commands.Cog, name="Commands"):
             arrow.utcnow().datetime,
             ctx.author.id,
         )
+        self.trigger_index(ctx.guild.id).add(name, response)
         await util.send_success(
             ctx, f"Custom command `{ctx.prefix}{name}` added with the response \n```{response}```"
         )
@@ -160,6 +207,7 @@ class CustomCommands(commands.Cog, name="Commands"):
             ctx.guild.id,
             name,
         )
+        self.trigger_index(ctx.guild.id).remove(name)
         await util.send_success(ctx, f"Custom command `{ctx.prefix}{name}` has been deleted")
 
     @command.command()
@@ -174,7 +222,7 @@ class CustomCommands(commands.Cog, name="Commands"):
             content.add_field(name="Internal commands", value="\n".join(internal_rows))
 
         custom_rows = []
-        for command in await self.custom_command_list(ctx.guild.id, match=name):
+        for command in self.custom_command_list(ctx.guild.id, match=name):
             custom_rows.append(f"{ctx.prefix}{command}")
         if custom_rows:
             content.add_field(name="Custom commands", value="\n".join(custom_rows))
@@ -188,7 +236,7 @@ class CustomCommands(commands.Cog, name="Commands"):
     async def list(self, ctx):
         """List all commands on this server."""
         rows = []
-        for command in await self.custom_command_list(ctx.guild.id):
+        for command in self.custom_command_list(ctx.guild.id):
             rows.append(f"{ctx.prefix}{command}")
 
         if rows:
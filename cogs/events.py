@@ -1,3 +1,4 @@
+import os
 import discord
 import re
 import arrow
@@ -5,7 +6,7 @@ import asyncio
 import random
 from time import time
 from discord.ext import commands, tasks
-from modules import queries, util, log, emojis
+from modules import util, log, emojis, usage, ttlcache
 from libraries import emoji_literals
 
 logger = log.get_logger(__name__)
@@ -24,8 +25,16 @@ class Events(commands.Cog):
             ("playing", lambda: "misobot.xyz"),
         ]
         self.activities = {"playing": 0, "streaming": 1, "listening": 2, "watching": 3}
-        self.xp_cache = {}
-        self.emoji_usage_cache = {"unicode": {}, "custom": {}}
+        self.activity_buffer = usage.ActivityBuffer()
+        # original message id : starboard message id, 0 if not on the board
+        self.starboard_messages = ttlcache.TTLCache(
+            maxsize=int(os.environ.get("STARBOARD_CACHE_SIZE", 10000))
+        )
+        self.starboard_ttl = 24 * 60 * 60
+        self.starboard_delay = float(os.environ.get("STARBOARD_UPDATE_DELAY", 2))
+        # message id : task waiting to update the board
+        self.starboard_updates = {}
+        self.starboard_dirty = set()
         self.current_status = None
         self.status_loop.start()
         self.xp_loop.start()
@@ -37,50 +46,55 @@ class Events(commands.Cog):
 
     async def write_usage_data(self):
         start = time()
-        values = []
-        total_messages = 0
-        for guild_id in self.xp_cache:
-            for user_id, value in self.xp_cache[guild_id].items():
-                values.append(
-                    (int(guild_id), int(user_id), value["bot"], value["xp"], value["messages"])
-                )
-                total_messages += value["messages"]
+        buffer = self.activity_buffer
+        self.activity_buffer = usage.ActivityBuffer()
+        total_messages = buffer.messages
 
         self.average_mps.append(total_messages)
         if len(self.average_mps) > 10:
             self.average_mps = self.average_mps[1:]
 
         sql_tasks = []
-        if values:
+        # (activity_table, guild or global, write)
+        activity_tasks = []
+        activity_tables = [
+            "user_activity",
+            "user_activity_day",
+            "user_activity_week",
+            "user_activity_month",
+        ]
+        activity_values = buffer.activity_rows()
+        user_values = buffer.user_rows()
+        if activity_values:
             currenthour = arrow.utcnow().hour
-            for activity_table in [
-                "user_activity",
-                "user_activity_day",
-                "user_activity_week",
-                "user_activity_month",
-            ]:
-                sql_tasks.append(
-                    self.bot.db.executemany(
-                        f"""
-                    INSERT INTO {activity_table} (guild_id, user_id, is_bot, h{currenthour}, message_count)
-                        VALUES (%s, %s, %s, %s, %s)
+            # xp is kept as a running total next to the hourly columns so ranks can use an index
+            values = [(g, u, b, xp, xp, m) for g, u, b, xp, m in activity_values]
+            for activity_table in activity_tables:
+                guild_write = self.bot.db.executemany(
+                    f"""
+                    INSERT INTO {activity_table} (guild_id, user_id, is_bot, h{currenthour}, xp, message_count)
+                        VALUES (%s, %s, %s, %s, %s, %s)
                     ON DUPLICATE KEY UPDATE
                         h{currenthour} = h{currenthour} + VALUES(h{currenthour}),
+                        xp = xp + VALUES(xp),
                         message_count = message_count + VALUES(message_count)
                     """,
-                        values,
-                    )
+                    values,
                 )
-        self.xp_cache = {}
-
-        unicode_emoji_values = []
-        for guild_id in self.emoji_usage_cache["unicode"]:
-            for user_id in self.emoji_usage_cache["unicode"][guild_id]:
-                for emoji_name, value in self.emoji_usage_cache["unicode"][guild_id][
-                    user_id
-                ].items():
-                    unicode_emoji_values.append((int(guild_id), int(user_id), emoji_name, value))
+                global_write = self.bot.db.executemany(
+                    """
+                    INSERT INTO user_xp_global (activity_table, user_id, is_bot, xp, message_count)
+                        VALUES (%s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        xp = xp + VALUES(xp),
+                        message_count = message_count + VALUES(message_count)
+                    """,
+                    [(activity_table,) + row for row in user_values],
+                )
+                activity_tasks.append((activity_table, "guild", guild_write))
+                activity_tasks.append((activity_table, "global", global_write))
 
+        unicode_emoji_values = buffer.unicode_emoji_rows()
         if unicode_emoji_values:
             sql_tasks.append(
                 self.bot.db.executemany(
@@ -93,16 +107,8 @@ class Events(commands.Cog):
                     unicode_emoji_values,
                 )
             )
-        self.emoji_usage_cache["unicode"] = {}
-
-        custom_emoji_values = []
-        for guild_id in self.emoji_usage_cache["custom"]:
-            for user_id in self.emoji_usage_cache["custom"][guild_id]:
-                for emoji_id, value in self.emoji_usage_cache["custom"][guild_id][user_id].items():
-                    custom_emoji_values.append(
-                        (int(guild_id), int(user_id), value["name"], emoji_id, value["uses"])
-                    )
 
+        custom_emoji_values = buffer.custom_emoji_rows()
         if custom_emoji_values:
             sql_tasks.append(
                 self.bot.db.executemany(
@@ -115,8 +121,32 @@ class Events(commands.Cog):
                     custom_emoji_values,
                 )
             )
-        self.emoji_usage_cache["custom"] = {}
-        await asyncio.gather(*sql_tasks)
+
+        async with self.bot.leaderboards.lock:
+            results = await asyncio.gather(
+                *(task for _, _, task in activity_tasks), *sql_tasks, return_exceptions=True
+            )
+            # the writes are not one transaction, so only the boards of the writes that went
+            # through are updated, and the periodic leaderboard resync fixes the rest
+            written = set()
+            for (activity_table, scope, _), result in zip(activity_tasks, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Failed to write {scope} activity to {activity_table}: {result}")
+                else:
+                    written.add((activity_table, scope))
+            for activity_table in activity_tables:
+                self.bot.leaderboards.add_activity(
+                    activity_table,
+                    activity_values if (activity_table, "guild") in written else [],
+                    user_values if (activity_table, "global") in written else [],
+                )
+
+        errors = [
+            result for result in results[len(activity_tasks) :] if isinstance(result, Exception)
+        ]
+        if errors:
+            raise errors[0]
+
         logger.info(
             f"Inserted {total_messages} messages in {time()-start:.3f}s, "
             f"{len(self.average_mps)*2} min average: {(sum(self.average_mps) / len(self.average_mps))/(60*2):.2f} msg/s"
@@ -129,7 +159,7 @@ class Events(commands.Cog):
         if ctx.invoked_subcommand is None:
             command_logger.info(log.log_command(ctx))
             if ctx.guild is not None:
-                await queries.save_command_usage(ctx)
+                self.bot.command_usage.add(ctx.guild.id, ctx.author.id, ctx.command.qualified_name)
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -220,42 +250,30 @@ class Events(commands.Cog):
     @commands.Cog.listener()
     async def on_member_join(self, member):
         """Called when a new member joins a guild."""
+        settings = await self.bot.cache.get_guild_settings(member.guild.id)
         # log event
-        logging_channel_id = await self.bot.db.execute(
-            "SELECT member_log_channel_id FROM logging_settings WHERE guild_id = %s",
-            member.guild.id,
-            one_value=True,
-        )
-        if logging_channel_id:
-            logging_channel = member.guild.get_channel(logging_channel_id)
+        if settings.member_log_channel_id:
+            logging_channel = member.guild.get_channel(settings.member_log_channel_id)
             if logging_channel is not None:
                 embed = discord.Embed(color=discord.Color.green())
                 embed.set_author(name=str(member), icon_url=member.avatar_url)
                 await logging_channel.send(embed=embed)
 
         # welcome message
-        greeter = await self.bot.db.execute(
-            "SELECT channel_id, is_enabled, message_format FROM greeter_settings WHERE guild_id = %s",
-            member.guild.id,
-            one_row=True,
-        )
-        if greeter:
-            channel_id, is_enabled, message_format = greeter
-            if is_enabled:
-                greeter_channel = member.guild.get_channel(channel_id)
-                if greeter_channel is not None:
-                    try:
-                        await greeter_channel.send(
-                            embed=util.create_welcome_embed(member, member.guild, message_format)
+        if settings.greeter_enabled:
+            greeter_channel = member.guild.get_channel(settings.greeter_channel_id)
+            if greeter_channel is not None:
+                try:
+                    await greeter_channel.send(
+                        embed=util.create_welcome_embed(
+                            member, member.guild, settings.greeter_format
                         )
-                    except discord.errors.Forbidden:
-                        pass
+                    )
+                except discord.errors.Forbidden:
+                    pass
 
         # add autoroles
-        roles = await self.bot.db.execute(
-            "SELECT role_id FROM autorole WHERE guild_id = %s", member.guild.id, as_list=True
-        )
-        for role_id in roles:
+        for role_id in settings.autoroles:
             role = member.guild.get_role(role_id)
             if role is None:
                 continue
@@ -267,15 +285,11 @@ class Events(commands.Cog):
     @commands.Cog.listener()
     async def on_member_ban(self, guild, user):
         """Called when user gets banned from a server."""
-        channel_id = await self.bot.db.execute(
-            "SELECT ban_log_channel_id FROM logging_settings WHERE guild_id = %s",
-            guild.id,
-            one_value=True,
-        )
-        if not channel_id:
+        settings = await self.bot.cache.get_guild_settings(guild.id)
+        if not settings.ban_log_channel_id:
             return
 
-        channel = guild.get_channel(channel_id)
+        channel = guild.get_channel(settings.ban_log_channel_id)
         if channel is not None:
             try:
                 await channel.send(
@@ -291,39 +305,29 @@ class Events(commands.Cog):
     @commands.Cog.listener()
     async def on_member_remove(self, member):
         """Called when member leaves a guild."""
+        settings = await self.bot.cache.get_guild_settings(member.guild.id)
         # log event
-        logging_channel_id = await self.bot.db.execute(
-            "SELECT member_log_channel_id FROM logging_settings WHERE guild_id = %s",
-            member.guild.id,
-            one_value=True,
-        )
-        if logging_channel_id:
-            logging_channel = member.guild.get_channel(logging_channel_id)
+        if settings.member_log_channel_id:
+            logging_channel = member.guild.get_channel(settings.member_log_channel_id)
             if logging_channel is not None:
                 embed = discord.Embed(color=discord.Color.red())
                 embed.set_author(name=str(member), icon_url=member.avatar_url)
                 await logging_channel.send(embed=embed)
 
         # goodbye message
-        goodbye = await self.bot.db.execute(
-            "SELECT channel_id, is_enabled, message_format FROM goodbye_settings WHERE guild_id = %s",
-            member.guild.id,
-            one_row=True,
-        )
-        if goodbye:
-            channel_id, is_enabled, message_format = goodbye
-            if is_enabled:
-                channel = member.guild.get_channel(channel_id)
-                if channel is not None:
-                    if message_format is None:
-                        message_format = "Goodbye **{user}** {mention}"
+        if settings.goodbye_enabled:
+            channel = member.guild.get_channel(settings.goodbye_channel_id)
+            if channel is not None:
+                message_format = settings.goodbye_format
+                if message_format is None:
+                    message_format = "Goodbye **{user}** {mention}"
 
-                    try:
-                        await channel.send(
-                            util.create_goodbye_message(member, member.guild, message_format)
-                        )
-                    except discord.errors.Forbidden:
-                        pass
+                try:
+                    await channel.send(
+                        util.create_goodbye_message(member, member.guild, message_format)
+                    )
+                except discord.errors.Forbidden:
+                    pass
 
     @commands.Cog.listener()
     async def on_message_delete(self, message):
@@ -343,28 +347,27 @@ class Events(commands.Cog):
         if len(message.content) == 0 and len(message.attachments) == 0:
             return
 
+        settings = await self.bot.cache.get_guild_settings(message.guild.id)
         # ignored channels
-        ignored_channels = await self.bot.db.execute(
-            "SELECT channel_id FROM message_log_ignore WHERE guild_id = %s",
-            message.guild.id,
-            as_list=True,
-        )
-        if message.channel.id in ignored_channels:
+        if message.channel.id in settings.message_log_ignored:
             return
 
-        channel_id = await self.bot.db.execute(
-            "SELECT message_log_channel_id FROM logging_settings WHERE guild_id = %s",
-            message.guild.id,
-            one_value=True,
-        )
-        if channel_id:
-            channel = message.guild.get_channel(channel_id)
+        if settings.message_log_channel_id:
+            channel = message.guild.get_channel(settings.message_log_channel_id)
             if channel is not None and message.channel != channel:
                 try:
                     await channel.send(embed=util.message_embed(message))
                 except discord.errors.Forbidden:
                     pass
 
+    async def add_reactions(self, message, reactions):
+        """Add reactions in order, in the background so the message handler can carry on."""
+        for reaction in reactions:
+            try:
+                await message.add_reaction(reaction)
+            except (discord.errors.Forbidden, discord.errors.NotFound):
+                return
+
     @commands.Cog.listener()
     async def on_message(self, message):
         """Listener that gets called on every message."""
@@ -375,33 +378,20 @@ class Events(commands.Cog):
         if message.guild is None:
             return
 
-        if message.channel.id in self.bot.cache.votechannels:
-            # votechannels
-            votechannel_type = await self.bot.db.execute(
-                "SELECT voting_type FROM voting_channel WHERE channel_id = %s",
-                message.channel.id,
-                one_value=True,
+        # votechannels
+        votechannel_type = self.bot.cache.votechannels.get(message.channel.id)
+        if votechannel_type == "rating":
+            self.bot.loop.create_task(
+                self.add_reactions(message, ["0️⃣", "1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣"])
             )
-            if votechannel_type == "rating":
-                for e in ["0️⃣", "1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣"]:
-                    await message.add_reaction(e)
-            elif votechannel_type == "voting":
-                await message.add_reaction(emojis.UPVOTE)
-                await message.add_reaction(emojis.DOWNVOTE)
+        elif votechannel_type == "voting":
+            self.bot.loop.create_task(self.add_reactions(message, [emojis.UPVOTE, emojis.DOWNVOTE]))
 
         # xp gain
         message_xp = util.xp_from_message(message)
-        if self.xp_cache.get(str(message.guild.id)) is None:
-            self.xp_cache[str(message.guild.id)] = {}
-        try:
-            self.xp_cache[str(message.guild.id)][str(message.author.id)]["xp"] += message_xp
-            self.xp_cache[str(message.guild.id)][str(message.author.id)]["messages"] += 1
-        except KeyError:
-            self.xp_cache[str(message.guild.id)][str(message.author.id)] = {
-                "xp": message_xp,
-                "messages": 1,
-                "bot": message.author.bot,
-            }
+        guild_id = message.guild.id
+        user_id = message.author.id
+        self.activity_buffer.add_message(guild_id, user_id, message.author.bot, message_xp)
 
         # if bot account, ignore everything after this
         if message.author.bot:
@@ -417,44 +407,10 @@ class Events(commands.Cog):
         custom_emojis = util.find_custom_emojis(message.content)
 
         for emoji_name in unicode_emojis:
-            if self.emoji_usage_cache["unicode"].get(str(message.guild.id)) is None:
-                self.emoji_usage_cache["unicode"][str(message.guild.id)] = {}
-            if (
-                self.emoji_usage_cache["unicode"][str(message.guild.id)].get(
-                    str(message.author.id)
-                )
-                is None
-            ):
-                self.emoji_usage_cache["unicode"][str(message.guild.id)][
-                    str(message.author.id)
-                ] = {}
-            try:
-                self.emoji_usage_cache["unicode"][str(message.guild.id)][str(message.author.id)][
-                    emoji_name
-                ] += 1
-            except KeyError:
-                self.emoji_usage_cache["unicode"][str(message.guild.id)][str(message.author.id)][
-                    emoji_name
-                ] = 1
+            self.activity_buffer.add_unicode_emoji(guild_id, user_id, emoji_name)
 
         for emoji_name, emoji_id in custom_emojis:
-            if self.emoji_usage_cache["custom"].get(str(message.guild.id)) is None:
-                self.emoji_usage_cache["custom"][str(message.guild.id)] = {}
-            if (
-                self.emoji_usage_cache["custom"][str(message.guild.id)].get(str(message.author.id))
-                is None
-            ):
-                self.emoji_usage_cache["custom"][str(message.guild.id)][
-                    str(message.author.id)
-                ] = {}
-            try:
-                self.emoji_usage_cache["custom"][str(message.guild.id)][str(message.author.id)][
-                    str(emoji_id)
-                ]["uses"] += 1
-            except KeyError:
-                self.emoji_usage_cache["custom"][str(message.guild.id)][str(message.author.id)][
-                    str(emoji_id)
-                ] = {"uses": 1, "name": emoji_name}
+            self.activity_buffer.add_custom_emoji(guild_id, user_id, emoji_name, int(emoji_id))
 
         if autoresponses:
             await self.easter_eggs(message)
@@ -552,121 +508,160 @@ class Events(commands.Cog):
         if not self.bot.is_ready():
             return
 
+        # ignore DMs
+        if payload.guild_id is None:
+            return
+
         user = self.bot.get_user(payload.user_id)
-        if user.bot:
+        if user is None or user.bot:
+            return
+
+        settings = await self.bot.cache.get_guild_settings(payload.guild_id)
+        if not settings.starboard_enabled or settings.starboard_channel_id is None:
             return
 
-        starboard_settings = await self.bot.db.execute(
-            """
-            SELECT is_enabled, channel_id, reaction_count, emoji_name, emoji_id, emoji_type
-            FROM starboard_settings WHERE guild_id = %s
-            """,
-            payload.guild_id,
-            one_row=True,
+        # trying to star a starboard message
+        if payload.channel_id == settings.starboard_channel_id:
+            return
+
+        if is_starboard_emoji(settings, payload.emoji):
+            self.queue_starboard_update(payload.guild_id, payload.channel_id, payload.message_id)
+
+    def queue_starboard_update(self, guild_id, channel_id, message_id):
+        """Update the board after a short delay, any stars added meanwhile are included."""
+        if message_id in self.starboard_updates:
+            self.starboard_dirty.add(message_id)
+            return
+
+        self.starboard_updates[message_id] = self.bot.loop.create_task(
+            self.starboard_update_task(guild_id, channel_id, message_id)
         )
 
-        if not starboard_settings:
+    async def starboard_update_task(self, guild_id, channel_id, message_id):
+        try:
+            while True:
+                await asyncio.sleep(self.starboard_delay)
+                self.starboard_dirty.discard(message_id)
+                try:
+                    await self.update_starboard(guild_id, channel_id, message_id)
+                except Exception as e:
+                    logger.error(f"Starboard update error: {e}")
+
+                # reactions that came in while updating need one more pass
+                if message_id not in self.starboard_dirty:
+                    return
+        finally:
+            del self.starboard_updates[message_id]
+
+    async def get_starboard_message_id(self, message_id):
+        """:returns : Id of the board message of given message, 0 if it's not on the board"""
+        board_message_id = self.starboard_messages.get(message_id)
+        if board_message_id is None:
+            board_message_id = (
+                await self.bot.db.execute(
+                    """
+                    SELECT starboard_message_id FROM starboard_message
+                    WHERE original_message_id = %s
+                    """,
+                    message_id,
+                    one_value=True,
+                )
+                or 0
+            )
+            self.starboard_messages.set(message_id, board_message_id, self.starboard_ttl)
+        return board_message_id
+
+    async def update_starboard(self, guild_id, channel_id, message_id):
+        settings = await self.bot.cache.get_guild_settings(guild_id)
+        if not settings.starboard_enabled:
             return
 
-        (
-            is_enabled,
-            board_channel_id,
-            required_reaction_count,
-            emoji_name,
-            emoji_id,
-            emoji_type,
-        ) = starboard_settings
-        board_channel = self.bot.get_channel(board_channel_id)
-        if not is_enabled or board_channel is None:
+        board_channel = self.bot.get_channel(settings.starboard_channel_id)
+        message_channel = self.bot.get_channel(channel_id)
+        if board_channel is None or message_channel is None:
             return
 
-        if (
-            emoji_type == "custom"
-            and emoji_id is not None
-            and payload.emoji.id is not None
-            and payload.emoji.id == emoji_id
-        ) or (
-            emoji_type == "unicode"
-            and emoji_literals.UNICODE_TO_NAME.get(payload.emoji.name) == emoji_name
-        ):
-            message_channel = self.bot.get_channel(payload.channel_id)
-
-            # trying to star a starboard message
-            if message_channel.id == board_channel_id:
-                return
+        try:
+            message = await message_channel.fetch_message(message_id)
+        except (discord.errors.Forbidden, discord.errors.NotFound):
+            return
+
+        reaction_count = 0
+        for react in message.reactions:
+            if is_starboard_emoji(settings, react.emoji):
+                reaction_count = react.count
+                break
+
+        if reaction_count < settings.starboard_reaction_count:
+            return
+
+        emoji_display = (
+            "⭐"
+            if settings.starboard_emoji_type == "custom"
+            else emoji_literals.NAME_TO_UNICODE[settings.starboard_emoji_name]
+        )
+        footer = f"{reaction_count} {emoji_display} #{message.channel.name}"
+
+        board_message_id = await self.get_starboard_message_id(message_id)
+        board_message = None
+        if board_message_id:
             try:
-                message = await message_channel.fetch_message(payload.message_id)
-            except (discord.errors.Forbidden, discord.errors.NotFound):
-                return
+                board_message = await board_channel.fetch_message(board_message_id)
+            except discord.errors.NotFound:
+                pass
 
-            reaction_count = 0
-            for react in message.reactions:
-                if emoji_type == "custom":
-                    if (
-                        isinstance(react.emoji, (discord.Emoji, discord.PartialEmoji))
-                        and react.emoji.id == payload.emoji.id
-                    ):
-                        reaction_count = react.count
-                        break
-                else:
-                    if react.emoji == payload.emoji.name:
-                        reaction_count = react.count
-                        break
+        if board_message is None:
+            # message is not on board yet, or it was deleted
+            content = discord.Embed(color=int("ffac33", 16))
+            content.set_author(name=f"{message.author}", icon_url=message.author.avatar_url)
+            jump = f"\n\n[context]({message.jump_url})"
+            content.description = message.content[: 2048 - len(jump)] + jump
+            content.timestamp = message.created_at
+            content.set_footer(text=footer)
+            if len(message.attachments) > 0:
+                content.set_image(url=message.attachments[0].url)
 
-            if reaction_count < required_reaction_count:
+            try:
+                board_message = await board_channel.send(embed=content)
+            except discord.errors.Forbidden:
                 return
 
-            board_message_id = await self.bot.db.execute(
-                "SELECT starboard_message_id FROM starboard_message WHERE original_message_id = %s",
-                payload.message_id,
-                one_value=True,
-            )
-            emoji_display = (
-                "⭐" if emoji_type == "custom" else emoji_literals.NAME_TO_UNICODE[emoji_name]
+            await self.bot.db.execute(
+                """
+                INSERT INTO starboard_message (original_message_id, starboard_message_id)
+                    VALUES(%s, %s)
+                ON DUPLICATE KEY UPDATE
+                    starboard_message_id = VALUES(starboard_message_id)
+                """,
+                message_id,
+                board_message.id,
             )
+            self.starboard_messages.set(message_id, board_message.id, self.starboard_ttl)
 
-            board_message = None
-            if board_message_id:
-                try:
-                    board_message = await board_channel.fetch_message(board_message_id)
-                except discord.errors.NotFound:
-                    pass
+        else:
+            # message is on board, update star count
+            content = board_message.embeds[0]
+            if content.footer.text != footer:
+                content.set_footer(text=footer)
+                await board_message.edit(embed=content)
 
-            if board_message is None:
-                # message is not on board yet, or it was deleted
-                content = discord.Embed(color=int("ffac33", 16))
-                content.set_author(name=f"{message.author}", icon_url=message.author.avatar_url)
-                jump = f"\n\n[context]({message.jump_url})"
-                content.description = message.content[: 2048 - len(jump)] + jump
-                content.timestamp = message.created_at
-                content.set_footer(
-                    text=f"{reaction_count} {emoji_display} #{message.channel.name}"
-                )
-                if len(message.attachments) > 0:
-                    content.set_image(url=message.attachments[0].url)
 
-                try:
-                    board_message = await board_channel.send(embed=content)
-                    await self.bot.db.execute(
-                        """
-                        INSERT INTO starboard_message (original_message_id, starboard_message_id)
-                            VALUES(%s, %s)
-                        ON DUPLICATE KEY UPDATE
-                            starboard_message_id = VALUES(starboard_message_id)
-                        """,
-                        payload.message_id,
-                        board_message.id,
-                    )
-                except discord.errors.Forbidden:
-                    pass
+def is_starboard_emoji(settings, emoji):
+    """:returns : True if the emoji of a reaction is the starboard emoji of given settings"""
+    if settings.starboard_emoji_type == "custom":
+        return (
+            settings.starboard_emoji_id is not None
+            and isinstance(emoji, (discord.Emoji, discord.PartialEmoji))
+            and emoji.id == settings.starboard_emoji_id
+        )
 
-            else:
-                # message is on board, update star count
-                content = board_message.embeds[0]
-                content.set_footer(
-                    text=f"{reaction_count} {emoji_display} #{message.channel.name}"
-                )
-                await board_message.edit(embed=content)
+    if isinstance(emoji, str):
+        name = emoji
+    elif emoji.id is None:
+        name = emoji.name
+    else:
+        return False
+    return emoji_literals.UNICODE_TO_NAME.get(name) == settings.starboard_emoji_name
 
 
 def setup(bot):
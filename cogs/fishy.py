@@ -140,6 +140,7 @@ class Fishy(commands.Cog):
                 amount,
                 amount,
             )
+            self.bot.leaderboards.add_fishy(receiver.id, amount)
             await self.bot.db.execute(
                 f"""
                 INSERT INTO fish_type (user_id, {catch})
@@ -5,7 +5,6 @@ import time
 import os
 import arrow
 import copy
-import aiohttp
 from discord.ext import commands
 from libraries import emoji_literals
 from modules import util, exceptions
@@ -133,7 +132,7 @@ class Information(commands.Cog):
         content.add_field(name="Github", value="https://github.com/joinemm/miso-bot", inline=False)
         content.add_field(name="Discord", value="https://discord.gg/RzDW3Ne", inline=False)
 
-        data = await get_commits("joinemm", "miso-bot")
+        data = await get_commits(self.bot.session, "joinemm", "miso-bot")
         last_update = data[0]["commit"]["author"].get("date")
         content.set_footer(text=f"Latest update: {arrow.get(last_update).humanize()}")
 
@@ -193,7 +192,7 @@ class Information(commands.Cog):
     @commands.command()
     async def changelog(self, ctx, author="joinemm", repo="miso-bot"):
         """Github commit history."""
-        data = await get_commits(author, repo)
+        data = await get_commits(self.bot.session, author, repo)
         content = discord.Embed(color=discord.Color.from_rgb(46, 188, 79))
         content.set_author(
             name="Github commit history",
@@ -480,8 +479,10 @@ class Information(commands.Cog):
         content = discord.Embed()
         content.set_author(name=str(guild), url=guild.icon_url)
         content.set_image(url=guild.icon_url_as(static_format="png"))
-        stats = await util.image_info_from_url(guild.icon_url)
-        color = await util.color_from_image_url(str(guild.icon_url_as(size=128, format="png")))
+        stats = await util.image_info_from_url(self.bot, guild.icon_url)
+        color = await util.color_from_image_url(
+            self.bot, str(guild.icon_url_as(size=128, format="png"))
+        )
         content.colour = await util.get_color(ctx, color)
         if stats is not None:
             content.set_footer(
@@ -495,10 +496,9 @@ def setup(bot):
     bot.add_cog(Information(bot))
 
 
-async def get_commits(author, repository):
+async def get_commits(session, author, repository):
     url = f"https://api.github.com/repos/{author}/{repository}/commits"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            data = await response.json()
+    async with session.get(url) as response:
+        data = await response.json()
 
     return data
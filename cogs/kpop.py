@@ -1,6 +1,5 @@
 import discord
 import random
-import aiohttp
 import os
 import arrow
 import asyncio
@@ -196,11 +195,10 @@ class Kpop(commands.Cog):
             return artists
 
         tasks = []
-        async with aiohttp.ClientSession() as session:
-            for url in urls_to_scrape:
-                tasks.append(scrape(session, url))
+        for url in urls_to_scrape:
+            tasks.append(scrape(self.bot.session, url))
 
-            artist_list_new = list(set(sum(await asyncio.gather(*tasks), [])))
+        artist_list_new = list(set(sum(await asyncio.gather(*tasks), [])))
 
         with open("data/data.json", "w") as f:
             json.dump({"artists": artist_list_new}, f, indent=4)
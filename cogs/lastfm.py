@@ -1,20 +1,31 @@
 import discord
 import random
-import kdtree
 import os
 import asyncio
 import arrow
-import aiohttp
 import re
 import html
 import math
-import io
-import colorgram
+import json
 import urllib.parse
 from bs4 import BeautifulSoup
-from discord.ext import commands
-from PIL import Image
-from modules import exceptions, emojis, util
+from discord.ext import commands, tasks
+from modules import (
+    exceptions,
+    emojis,
+    util,
+    log,
+    ttlcache,
+    ratelimit,
+    scrobbles,
+    colorindex,
+    imagecolor,
+    chart,
+    artistimage,
+)
+
+
+logger = log.get_logger(__name__)
 
 
 LASTFM_APPID = os.environ.get("LASTFM_APIKEY")
@@ -24,23 +35,33 @@ AUDDIO_TOKEN = os.environ.get("AUDDIO_TOKEN")
 
 MISSING_IMAGE_HASH = "2a96cbd8b46e442fc41c2b86b821562f"
 
+LASTFM_API_URL = "http://ws.audioscrobbler.com/2.0/"
 
-class AlbumColorNode(object):
-    def __init__(self, rgb, image_url):
-        self.rgb = rgb
-        self.data = image_url
+# colour space used to measure album colour distances in colorchart, rgb or lab
+COLOR_INDEX_SPACE = os.environ.get("COLOR_INDEX_SPACE", "rgb")
 
-    def __len__(self):
-        return len(self.rgb)
+# how many top items of each member are counted in the server top commands
+SERVER_TOP_LIMIT = 100
 
-    def __getitem__(self, i):
-        return self.rgb[i]
+# how image charts are drawn, pillow or html (headless browser)
+CHART_RENDERER = os.environ.get("CHART_RENDERER", "pillow")
 
-    def __str__(self):
-        return f"rgb{self.rgb}"
-
-    def __repr__(self):
-        return f"AlbumColorNode({self.rgb}, {self.data})"
+# how long api responses are cached for, in seconds
+METHOD_CACHE_TTL = {
+    "user.getrecenttracks": 15,
+    "user.getinfo": 300,
+    "artist.getinfo": 120,
+    "album.getinfo": 120,
+    "track.getinfo": 120,
+}
+PERIOD_CACHE_TTL = {
+    "7day": 15 * 60,
+    "1month": 30 * 60,
+    "3month": 60 * 60,
+    "6month": 2 * 60 * 60,
+    "12month": 3 * 60 * 60,
+    "overall": 6 * 60 * 60,
+}
 
 
 class LastFm(commands.Cog):
@@ -58,10 +79,39 @@ class LastFm(commands.Cog):
         ]
         with open("html/fm_chart.min.html", "r", encoding="utf-8") as file:
             self.chart_html = file.read().replace("\n", "")
+        self.api_cache = ttlcache.TTLCache(maxsize=int(os.environ.get("LASTFM_CACHE_SIZE", 5000)))
+        self.api_scheduler = ratelimit.RequestScheduler(
+            rate=float(os.environ.get("LASTFM_RATE_LIMIT", 5)),
+            burst=int(os.environ.get("LASTFM_RATE_BURST", 10)),
+            concurrency=int(os.environ.get("LASTFM_CONCURRENCY", 16)),
+        )
+        self.scrobbles = scrobbles.ScrobbleMirror(bot, self.api_request)
+        self.color_indexes = colorindex.ColorIndexStore(bot, space=COLOR_INDEX_SPACE)
+        self.chart_compositor = chart.ChartCompositor(bot)
+        self.artist_images = artistimage.ArtistImageResolver(bot)
+        self.scrobble_sync_loop.start()
+
+    def cog_unload(self):
+        self.scrobble_sync_loop.cancel()
+        self.scrobbles.close()
+
+    @tasks.loop(minutes=10.0)
+    async def scrobble_sync_loop(self):
+        try:
+            await self.scrobbles.sync_all()
+        except Exception as e:
+            logger.error(f"Scrobble sync loop error: {e}")
+
+    @scrobble_sync_loop.before_loop
+    async def before_scrobble_sync_loop(self):
+        await self.bot.wait_until_ready()
+        logger.info("Starting scrobble sync loop")
 
     @commands.group(case_insensitive=True)
     async def fm(self, ctx):
         await username_to_ctx(ctx)
+        if ctx.username:
+            self.scrobbles.mark_active(ctx.username)
 
         if ctx.invoked_subcommand is None:
             await util.command_group_help(ctx)
@@ -76,7 +126,10 @@ class LastFm(commands.Cog):
         if content is None:
             raise exceptions.Warning(f"Last.fm profile `{username}` was not found")
 
-        await self.bot.db.execute(
+        await self.bot.cache.set_value(
+            "lastfm_users",
+            ctx.author.id,
+            username,
             """
             INSERT INTO user_settings (user_id, lastfm_username)
                 VALUES (%s, %s)
@@ -89,6 +142,7 @@ class LastFm(commands.Cog):
         await ctx.send(
             f"{ctx.author.mention} Last.fm username saved as `{username}`", embed=content
         )
+        self.scrobbles.sync_later(username)
 
     @fm.command()
     async def unset(self, ctx):
@@ -96,7 +150,9 @@ class LastFm(commands.Cog):
         if ctx.foreign_target:
             raise exceptions.Warning("You cannot unset someone else's LastFm username!")
 
-        await self.bot.db.execute(
+        await self.bot.cache.delete_value(
+            "lastfm_users",
+            ctx.author.id,
             """
             INSERT INTO user_settings (user_id, lastfm_username)
                 VALUES (%s, %s)
@@ -116,7 +172,7 @@ class LastFm(commands.Cog):
     @fm.command(aliases=["yt"])
     async def youtube(self, ctx):
         """See your current song on youtube."""
-        data = await api_request(
+        data = await self.api_request(
             {"user": ctx.username, "method": "user.getrecenttracks", "limit": 1}
         )
 
@@ -143,9 +199,8 @@ class LastFm(commands.Cog):
             "key": GOOGLE_API_KEY,
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                data = await response.json()
+        async with self.bot.session.get(url, params=params) as response:
+            data = await response.json()
 
         video_id = data["items"][0]["id"]["videoId"]
         video_url = f"https://youtube.com/watch?v={video_id}"
@@ -155,7 +210,7 @@ class LastFm(commands.Cog):
     @fm.command(aliases=["np"])
     async def nowplaying(self, ctx):
         """Show your currently playing song."""
-        data = await api_request(
+        data = await self.api_request(
             {"user": ctx.username, "method": "user.getrecenttracks", "limit": 1}
         )
 
@@ -176,7 +231,7 @@ class LastFm(commands.Cog):
         content.set_thumbnail(url=image_url)
 
         # tags and playcount
-        trackdata = await api_request(
+        trackdata = await self.api_request(
             {"user": ctx.username, "method": "track.getInfo", "artist": artist, "track": track},
             ignore_errors=True,
         )
@@ -216,9 +271,9 @@ class LastFm(commands.Cog):
         """
         arguments = parse_arguments(args)
         if arguments["period"] == "today":
-            data = await custom_period(ctx.username, "artist")
+            data = await self.custom_period(ctx.username, "artist")
         else:
-            data = await api_request(
+            data = await self.api_request(
                 {
                     "user": ctx.username,
                     "method": "user.gettopartists",
@@ -238,7 +293,7 @@ class LastFm(commands.Cog):
             plays = artist["playcount"]
             rows.append(f"`#{i:2}` **{plays}** {format_plays(plays)} : **{name}**")
 
-        image_url = await scrape_artist_image(artists[0]["name"])
+        image_url = await self.artist_images.get(artists[0]["name"])
         formatted_timeframe = humanized_period(arguments["period"]).capitalize()
 
         content = discord.Embed()
@@ -262,9 +317,9 @@ class LastFm(commands.Cog):
         """
         arguments = parse_arguments(args)
         if arguments["period"] == "today":
-            data = await custom_period(ctx.username, "album")
+            data = await self.custom_period(ctx.username, "album")
         else:
-            data = await api_request(
+            data = await self.api_request(
                 {
                     "user": ctx.username,
                     "method": "user.gettopalbums",
@@ -311,9 +366,9 @@ class LastFm(commands.Cog):
         """
         arguments = parse_arguments(args)
         if arguments["period"] == "today":
-            data = await custom_period(ctx.username, "track")
+            data = await self.custom_period(ctx.username, "track")
         else:
-            data = await api_request(
+            data = await self.api_request(
                 {
                     "user": ctx.username,
                     "method": "user.gettoptracks",
@@ -330,7 +385,7 @@ class LastFm(commands.Cog):
         rows = []
         for i, track in enumerate(tracks, start=1):
             if i == 1:
-                image_url = await scrape_artist_image(tracks[0]["artist"]["name"])
+                image_url = await self.artist_images.get(tracks[0]["artist"]["name"])
 
             name = util.escape_md(track["name"])
             artist_name = util.escape_md(track["artist"]["name"])
@@ -360,7 +415,7 @@ class LastFm(commands.Cog):
         except ValueError:
             size = 15
 
-        data = await api_request(
+        data = await self.api_request(
             {"user": ctx.username, "method": "user.getrecenttracks", "limit": size}
         )
         user_attr = data["recenttracks"]["@attr"]
@@ -427,7 +482,7 @@ class LastFm(commands.Cog):
 
         artistname = remove_mentions(artistname)
         if artistname.lower() == "np":
-            artistname = (await getnowplaying(ctx))["artist"]
+            artistname = (await self.getnowplaying(ctx))["artist"]
             if artistname is None:
                 raise exceptions.Warning("Could not get currently playing artist!")
 
@@ -486,7 +541,7 @@ class LastFm(commands.Cog):
 
         album = remove_mentions(album)
         if album.lower() == "np":
-            npd = await getnowplaying(ctx)
+            npd = await self.getnowplaying(ctx)
             albumname = npd["album"]
             artistname = npd["artist"]
             if None in [albumname, artistname]:
@@ -543,134 +598,129 @@ class LastFm(commands.Cog):
         """Scrape either top tracks or top albums from lastfm library page."""
         artistname = urllib.parse.quote_plus(artistname)
         albumname = urllib.parse.quote_plus(albumname)
-        async with aiohttp.ClientSession() as session:
-            url = (
-                f"https://last.fm/user/{ctx.username}/library/music/{artistname}/"
-                f"{albumname}?date_preset={period_http_format(period)}"
-            )
-            data = await fetch(session, url, handling="text")
-            if data is None:
-                raise exceptions.LastFMError(404, "Album page not found")
+        url = (
+            f"https://last.fm/user/{ctx.username}/library/music/{artistname}/"
+            f"{albumname}?date_preset={period_http_format(period)}"
+        )
+        data = await fetch(self.bot.session, url, handling="text")
+        if data is None:
+            raise exceptions.LastFMError(404, "Album page not found")
 
-            soup = BeautifulSoup(data, "html.parser")
-            data = []
-            try:
-                chartlist = soup.find("tbody", {"data-playlisting-add-entries": ""})
-            except ValueError:
-                return None, []
-
-            album = {
-                "image_url": soup.find("header", {"class": "library-header"})
-                .find("img")
-                .get("src")
-                .replace("64s", "300s"),
-                "formatted_name": soup.find("h2", {"class": "library-header-title"}).text.strip(),
-                "artist": soup.find("header", {"class": "library-header"})
-                .find("a", {"class": "text-colour-link"})
-                .text.strip(),
-            }
+        soup = BeautifulSoup(data, "html.parser")
+        data = []
+        try:
+            chartlist = soup.find("tbody", {"data-playlisting-add-entries": ""})
+        except ValueError:
+            return None, []
 
-            items = chartlist.findAll("tr", {"class": "chartlist-row"})
-            for item in items:
-                name = item.find("td", {"class": "chartlist-name"}).find("a").get("title")
-                playcount = (
-                    item.find("span", {"class": "chartlist-count-bar-value"})
-                    .text.replace("scrobbles", "")
-                    .replace("scrobble", "")
-                    .strip()
-                )
-                data.append((name, int(playcount.replace(",", ""))))
+        album = {
+            "image_url": soup.find("header", {"class": "library-header"})
+            .find("img")
+            .get("src")
+            .replace("64s", "300s"),
+            "formatted_name": soup.find("h2", {"class": "library-header-title"}).text.strip(),
+            "artist": soup.find("header", {"class": "library-header"})
+            .find("a", {"class": "text-colour-link"})
+            .text.strip(),
+        }
+
+        items = chartlist.findAll("tr", {"class": "chartlist-row"})
+        for item in items:
+            name = item.find("td", {"class": "chartlist-name"}).find("a").get("title")
+            playcount = (
+                item.find("span", {"class": "chartlist-count-bar-value"})
+                .text.replace("scrobbles", "")
+                .replace("scrobble", "")
+                .strip()
+            )
+            data.append((name, int(playcount.replace(",", ""))))
 
-            return album, data
+        return album, data
 
     async def artist_top(self, ctx, period, artistname, datatype):
         """Scrape either top tracks or top albums from lastfm library page."""
         artistname = urllib.parse.quote_plus(artistname)
-        async with aiohttp.ClientSession() as session:
-            url = (
-                f"https://last.fm/user/{ctx.username}/library/music/{artistname}/"
-                f"+{datatype}?date_preset={period_http_format(period)}"
-            )
-            data = await fetch(session, url, handling="text")
-            if data is None:
-                raise exceptions.LastFMError(404, "Artist page not found")
+        url = (
+            f"https://last.fm/user/{ctx.username}/library/music/{artistname}/"
+            f"+{datatype}?date_preset={period_http_format(period)}"
+        )
+        data = await fetch(self.bot.session, url, handling="text")
+        if data is None:
+            raise exceptions.LastFMError(404, "Artist page not found")
 
-            soup = BeautifulSoup(data, "html.parser")
-            data = []
-            try:
-                chartlist = soup.find("tbody", {"data-playlisting-add-entries": ""})
-            except ValueError:
-                return None, []
-
-            artist = {
-                "image_url": soup.find("span", {"class": "library-header-image"})
-                .find("img")
-                .get("src")
-                .replace("avatar70s", "avatar300s"),
-                "formatted_name": soup.find("a", {"class": "library-header-crumb"}).text.strip(),
-            }
+        soup = BeautifulSoup(data, "html.parser")
+        data = []
+        try:
+            chartlist = soup.find("tbody", {"data-playlisting-add-entries": ""})
+        except ValueError:
+            return None, []
 
-            items = chartlist.findAll("tr", {"class": "chartlist-row"})
-            for item in items:
-                name = item.find("td", {"class": "chartlist-name"}).find("a").get("title")
-                playcount = (
-                    item.find("span", {"class": "chartlist-count-bar-value"})
-                    .text.replace("scrobbles", "")
-                    .replace("scrobble", "")
-                    .strip()
-                )
-                data.append((name, int(playcount.replace(",", ""))))
+        artist = {
+            "image_url": soup.find("span", {"class": "library-header-image"})
+            .find("img")
+            .get("src")
+            .replace("avatar70s", "avatar300s"),
+            "formatted_name": soup.find("a", {"class": "library-header-crumb"}).text.strip(),
+        }
 
-            return artist, data
+        items = chartlist.findAll("tr", {"class": "chartlist-row"})
+        for item in items:
+            name = item.find("td", {"class": "chartlist-name"}).find("a").get("title")
+            playcount = (
+                item.find("span", {"class": "chartlist-count-bar-value"})
+                .text.replace("scrobbles", "")
+                .replace("scrobble", "")
+                .strip()
+            )
+            data.append((name, int(playcount.replace(",", ""))))
+
+        return artist, data
 
     async def artist_overview(self, ctx, period, artistname):
         """Overall artist view."""
         albums = []
         tracks = []
         metadata = [None, None, None]
-        artistinfo = await api_request({"method": "artist.getInfo", "artist": artistname})
-        async with aiohttp.ClientSession() as session:
-            url = (
-                f"https://last.fm/user/{ctx.username}/library/music/"
-                f"{urllib.parse.quote_plus(artistname)}"
-                f"?date_preset={period_http_format(period)}"
-            )
-            data = await fetch(session, url, handling="text")
-            if data is None:
-                raise exceptions.LastFMError(404, "Artist page not found")
+        artistinfo = await self.api_request({"method": "artist.getInfo", "artist": artistname})
+        url = (
+            f"https://last.fm/user/{ctx.username}/library/music/"
+            f"{urllib.parse.quote_plus(artistname)}"
+            f"?date_preset={period_http_format(period)}"
+        )
+        data = await fetch(self.bot.session, url, handling="text")
+        if data is None:
+            raise exceptions.LastFMError(404, "Artist page not found")
 
-            soup = BeautifulSoup(data, "html.parser")
-            try:
-                albumsdiv, tracksdiv, _ = soup.findAll(
-                    "tbody", {"data-playlisting-add-entries": ""}
-                )
+        soup = BeautifulSoup(data, "html.parser")
+        try:
+            albumsdiv, tracksdiv, _ = soup.findAll("tbody", {"data-playlisting-add-entries": ""})
 
-            except ValueError:
-                artistname = util.escape_md(artistname)
-                if period == "overall":
-                    return await ctx.send(f"You have never listened to **{artistname}**!")
-                else:
-                    return await ctx.send(
-                        f"You have not listened to **{artistname}** in the past {period}s!"
-                    )
+        except ValueError:
+            artistname = util.escape_md(artistname)
+            if period == "overall":
+                return await ctx.send(f"You have never listened to **{artistname}**!")
+            else:
+                return await ctx.send(
+                    f"You have not listened to **{artistname}** in the past {period}s!"
+                )
 
-            for container, destination in zip([albumsdiv, tracksdiv], [albums, tracks]):
-                items = container.findAll("tr", {"class": "chartlist-row"})
-                for item in items:
-                    name = item.find("td", {"class": "chartlist-name"}).find("a").get("title")
-                    playcount = (
-                        item.find("span", {"class": "chartlist-count-bar-value"})
-                        .text.replace("scrobbles", "")
-                        .replace("scrobble", "")
-                        .strip()
-                    )
-                    destination.append((name, int(playcount.replace(",", ""))))
+        for container, destination in zip([albumsdiv, tracksdiv], [albums, tracks]):
+            items = container.findAll("tr", {"class": "chartlist-row"})
+            for item in items:
+                name = item.find("td", {"class": "chartlist-name"}).find("a").get("title")
+                playcount = (
+                    item.find("span", {"class": "chartlist-count-bar-value"})
+                    .text.replace("scrobbles", "")
+                    .replace("scrobble", "")
+                    .strip()
+                )
+                destination.append((name, int(playcount.replace(",", ""))))
 
-            metadata_list = soup.find("ul", {"class": "metadata-list"})
-            for i, metadata_item in enumerate(
-                metadata_list.findAll("p", {"class": "metadata-display"})
-            ):
-                metadata[i] = int(metadata_item.text.replace(",", ""))
+        metadata_list = soup.find("ul", {"class": "metadata-list"})
+        for i, metadata_item in enumerate(
+            metadata_list.findAll("p", {"class": "metadata-display"})
+        ):
+            metadata[i] = int(metadata_item.text.replace(",", ""))
 
         artist = {
             "image_url": soup.find("span", {"class": "library-header-image"})
@@ -744,34 +794,6 @@ class LastFm(commands.Cog):
 
         await ctx.send(embed=content)
 
-    async def fetch_color(self, session, album_art_id):
-        async def get_image(url):
-            async with session.get(url) as response:
-                try:
-                    return Image.open(io.BytesIO(await response.read()))
-                except Exception:
-                    return None
-
-        image = None
-        for base_url in self.cover_base_urls:
-            image = await get_image(base_url.format(album_art_id))
-            if image is not None:
-                break
-
-        if image is None:
-            return None
-
-        colors = colorgram.extract(image, 1)
-        dominant_color = colors[0].rgb
-
-        return (
-            album_art_id,
-            dominant_color.r,
-            dominant_color.g,
-            dominant_color.b,
-            util.rgb_to_hex(dominant_color),
-        )
-
     async def get_all_albums(self, username):
         params = {
             "user": username,
@@ -779,13 +801,13 @@ class LastFm(commands.Cog):
             "period": "overall",
             "limit": 1000,
         }
-        data = await api_request(dict(params, **{"page": 1}))
+        data = await self.api_request(dict(params, **{"page": 1}))
         topalbums = data["topalbums"]["album"]
         # total_pages = int(data["topalbums"]["@attr"]["totalPages"])
         # if total_pages > 1:
         #     tasks = []
         #     for i in range(2, total_pages + 1):
-        #         tasks.append(api_request(dict(params, **{"page": i})))
+        #         tasks.append(self.api_request(dict(params, **{"page": i})))
 
         #     data = await asyncio.gather(*tasks)
         #     for page in data:
@@ -831,7 +853,6 @@ class LastFm(commands.Cog):
         topalbums = await self.get_all_albums(ctx.username)
 
         albums = set()
-        album_color_nodes = []
         for album in topalbums:
             album_art_id = album["image"][0]["#text"].split("/")[-1].split(".")[0]
             if album_art_id.strip() == "":
@@ -839,113 +860,74 @@ class LastFm(commands.Cog):
 
             albums.add(album_art_id)
 
+        albums = frozenset(albums)
         to_fetch = []
-        albumcolors = await self.bot.db.execute(
-            """
-            SELECT image_hash, r, g, b FROM image_color_cache WHERE image_hash IN %s
-            """,
-            tuple(albums),
-        )
-        albumcolors_dict = {}
-        for image_hash, r, g, b in albumcolors:
-            albumcolors_dict[image_hash] = (r, g, b)
         warn = None
+        color_index = await self.color_indexes.get(ctx.username, albums)
+        if color_index is None:
+            color_index, to_fetch, warn = await self.build_color_index(ctx, albums)
+            await self.color_indexes.put(ctx.username, color_index)
 
-        async with aiohttp.ClientSession() as session:
-            for image_id in albums:
-                color = albumcolors_dict.get(image_id)
-                if color is None:
-                    to_fetch.append(image_id)
-                else:
-                    album_color_nodes.append(AlbumColorNode(color, image_id))
-
-            if to_fetch:
-                to_cache = []
-                tasks = []
-                for image_id in to_fetch:
-                    tasks.append(self.fetch_color(session, image_id))
-
-                if len(tasks) > 500:
-                    warn = await ctx.send(
-                        ":exclamation:Your library includes over 500 uncached album colours, "
-                        f"this might take a while {emojis.LOADING}"
-                    )
-
-                colordata = await asyncio.gather(*tasks)
-                for colortuple in colordata:
-                    if colortuple is None:
-                        continue
-                    image_hash, r, g, b, hexcolor = colortuple
-                    to_cache.append((image_hash, r, g, b, hexcolor))
-                    album_color_nodes.append(AlbumColorNode((r, g, b), image_hash))
-
-                await self.bot.db.executemany(
-                    "INSERT IGNORE image_color_cache (image_hash, r, g, b, hex) VALUES (%s, %s, %s, %s, %s)",
-                    to_cache,
-                )
+        if rainbow:
+            if diagonal:
+                rainbow_colors = [
+                    (255, 79, 0),
+                    (255, 33, 0),
+                    (217, 29, 82),
+                    (151, 27, 147),
+                    (81, 35, 205),
+                    (0, 48, 255),
+                    (0, 147, 147),
+                    (0, 249, 0),
+                    (203, 250, 0),
+                    (255, 251, 0),
+                    (255, 200, 0),
+                    (255, 148, 0),
+                ]
+            else:
+                rainbow_colors = [
+                    (255, 0, 0),  # red
+                    (255, 127, 0),  # orange
+                    (255, 255, 0),  # yellow
+                    (0, 255, 0),  # green
+                    (0, 0, 255),  # blue
+                    (75, 0, 130),  # purple
+                    (148, 0, 211),  # violet
+                ]
 
-            if rainbow:
+            chunks = color_index.knn(rainbow_colors, width + height)
+            random_offset = random.randint(0, 6)
+            final_albums = []
+            for album_index in range(width * height):
                 if diagonal:
-                    rainbow_colors = [
-                        (255, 79, 0),
-                        (255, 33, 0),
-                        (217, 29, 82),
-                        (151, 27, 147),
-                        (81, 35, 205),
-                        (0, 48, 255),
-                        (0, 147, 147),
-                        (0, 249, 0),
-                        (203, 250, 0),
-                        (255, 251, 0),
-                        (255, 200, 0),
-                        (255, 148, 0),
-                    ]
+                    choice_index = (
+                        album_index % width + (album_index // height) + random_offset
+                    ) % len(chunks)
                 else:
-                    rainbow_colors = [
-                        (255, 0, 0),  # red
-                        (255, 127, 0),  # orange
-                        (255, 255, 0),  # yellow
-                        (0, 255, 0),  # green
-                        (0, 0, 255),  # blue
-                        (75, 0, 130),  # purple
-                        (148, 0, 211),  # violet
-                    ]
-
-                chunks = []
-                tree = kdtree.create(album_color_nodes)
-                for rgb in rainbow_colors:
-                    chunks.append(list(tree.search_knn(rgb, width + height)))
-
-                random_offset = random.randint(0, 6)
-                final_albums = []
-                for album_index in range(width * height):
-                    if diagonal:
-                        choice_index = (
-                            album_index % width + (album_index // height) + random_offset
-                        ) % len(chunks)
-                    else:
-                        choice_index = album_index % width
-
-                    choose_from = chunks[choice_index]
-                    choice = choose_from[album_index // height]
-                    final_albums.append(
-                        (
-                            self.cover_base_urls[3].format(choice[0].data.data),
-                            f"rgb{choice[0].data.rgb}, dist {choice[1]:.2f}",
-                        )
-                    )
+                    choice_index = album_index % width
 
-            else:
-                tree = kdtree.create(album_color_nodes)
-                nearest = tree.search_knn(query_color, width * height)
-
-                final_albums = [
+                choose_from = chunks[choice_index]
+                if album_index // height >= len(choose_from):
+                    # not enough albums, leave the tile blank to keep the rest in place
+                    final_albums.append(("", ""))
+                    continue
+                image_id, rgb, distance = choose_from[album_index // height]
+                final_albums.append(
                     (
-                        self.cover_base_urls[3].format(alb[0].data.data),
-                        f"rgb{alb[0].data.rgb}, dist {alb[1]:.2f}",
+                        self.cover_base_urls[3].format(image_id),
+                        f"rgb{rgb}, dist {distance:.2f}",
                     )
-                    for alb in nearest
-                ]
+                )
+
+        else:
+            nearest = color_index.knn([query_color], width * height)[0]
+            final_albums = [
+                (
+                    self.cover_base_urls[3].format(image_id),
+                    f"rgb{rgb}, dist {distance:.2f}",
+                )
+                for image_id, rgb, distance in nearest
+            ]
 
         buffer = await self.chart_factory(final_albums, width, height, show_labels=False)
 
@@ -964,6 +946,70 @@ class LastFm(commands.Cog):
         if warn is not None:
             await warn.delete()
 
+    async def build_color_index(self, ctx, albums):
+        """
+        Get the dominant colours of given album covers, from the database or by downloading them.
+
+        :param albums : Set of album art ids
+        :returns      : (ColorIndex, list of newly fetched album art ids, warning message or None)
+        """
+        image_ids = []
+        colors = []
+        to_fetch = []
+        albumcolors = await self.bot.db.execute(
+            """
+            SELECT image_hash, r, g, b FROM image_color_cache WHERE image_hash IN %s
+            """,
+            tuple(albums),
+        )
+        albumcolors_dict = {}
+        for image_hash, r, g, b in albumcolors:
+            albumcolors_dict[image_hash] = (r, g, b)
+        warn = None
+
+        for image_id in albums:
+            color = albumcolors_dict.get(image_id)
+            if color is None:
+                to_fetch.append(image_id)
+            else:
+                image_ids.append(image_id)
+                colors.append(color)
+
+        if to_fetch:
+            if len(to_fetch) > 500:
+                warn = await ctx.send(
+                    ":exclamation:Your library includes over 500 uncached album colours, "
+                    f"this might take a while {emojis.LOADING}"
+                )
+
+            async def store_batch(batch):
+                await self.bot.db.executemany(
+                    "INSERT IGNORE image_color_cache (image_hash, r, g, b, hex) VALUES (%s, %s, %s, %s, %s)",
+                    [
+                        (image_hash, r, g, b, util.rgb_to_hex((r, g, b)))
+                        for image_hash, (r, g, b) in batch
+                    ],
+                )
+
+            pipeline = imagecolor.ColorExtractionPipeline(self.bot, store_batch)
+            try:
+                colordata = await pipeline.run(
+                    {
+                        image_id: [base_url.format(image_id) for base_url in self.cover_base_urls]
+                        for image_id in to_fetch
+                    }
+                )
+            except asyncio.CancelledError:
+                if warn is not None:
+                    self.bot.loop.create_task(warn.delete())
+                raise
+
+            for image_hash, color in colordata:
+                image_ids.append(image_hash)
+                colors.append(color)
+
+        return colorindex.ColorIndex(image_ids, colors, space=COLOR_INDEX_SPACE), to_fetch, warn
+
     @fm.command()
     async def chart(self, ctx, *args):
         """
@@ -979,9 +1025,9 @@ class LastFm(commands.Cog):
             )
 
         if arguments["period"] == "today":
-            data = await custom_period(ctx.username, arguments["method"])
+            data = await self.custom_period(ctx.username, arguments["method"])
         else:
-            data = await api_request(
+            data = await self.api_request(
                 {
                     "user": ctx.username,
                     "method": arguments["method"],
@@ -1008,7 +1054,7 @@ class LastFm(commands.Cog):
         elif arguments["method"] == "user.gettopartists":
             chart_type = "top artist"
             artists = data["topartists"]["artist"]
-            scraped_images = await scrape_artists_for_chart(
+            scraped_images = await self.scrape_artists_for_chart(
                 ctx.username, arguments["period"], arguments["amount"]
             )
             for i, artist in enumerate(artists):
@@ -1037,6 +1083,14 @@ class LastFm(commands.Cog):
         )
 
     async def chart_factory(self, chart_items, width, height, show_labels=True):
+        if CHART_RENDERER == "pillow" and self.chart_compositor.can_render(show_labels):
+            try:
+                return await self.chart_compositor.render(
+                    chart_items, width, height, show_labels=show_labels
+                )
+            except Exception as e:
+                logger.error(f"Chart compositor failed, falling back to the HTML renderer: {e}")
+
         if show_labels:
             img_div_template = '<div class="art"><img src="{0}"><p class="label">{1}</p></div>'
         else:
@@ -1057,23 +1111,68 @@ class LastFm(commands.Cog):
             "imageFormat": "jpeg",
         }
 
-        return await util.render_html(payload)
+        return await util.render_html(self.bot, payload)
 
-    async def server_lastfm_usernames(self, ctx, filter_cheaters=False):
-        guild_user_ids = [user.id for user in ctx.guild.members]
-        data = await self.bot.db.execute(
-            """
-            SELECT user_id, lastfm_username FROM user_settings WHERE user_id IN %s
-            AND lastfm_username IS NOT NULL
-            """
-            + (
-                " AND lastfm_username not in (SELECT lastfm_username FROM lastfm_cheater)"
-                if filter_cheaters
-                else ""
-            ),
-            guild_user_ids,
+    async def split_server_users(self, ctx):
+        """
+        Linked members of this server, split by whether they are synced to the scrobble mirror.
+        The invoking user is synced first, so their latest scrobbles are always included.
+
+        :returns : ([(lastfm_username, member)] of synced users, [(lastfm_username, member)] of the rest)
+        """
+        users = [
+            (lastfm_username, member)
+            for member, lastfm_username in self.bot.cache.guild_lastfm_users(
+                ctx.guild, filter_cheaters=True
+            )
+        ]
+
+        synced_usernames = await self.scrobbles.synced_usernames(
+            [lastfm_username for lastfm_username, _ in users]
         )
-        return data
+        own_username = self.bot.cache.lastfm_users.get(ctx.author.id)
+        if own_username is not None and own_username.lower() in synced_usernames:
+            if not await self.scrobbles.sync_user(own_username):
+                synced_usernames.discard(own_username.lower())
+
+        synced = []
+        unsynced = []
+        for lastfm_username, member in users:
+            if lastfm_username.lower() in synced_usernames:
+                synced.append((lastfm_username, member))
+            else:
+                unsynced.append((lastfm_username, member))
+
+        return synced, unsynced
+
+    async def server_top(self, ctx, datatype):
+        """
+        Top items of every linked member of this server, in the format of the user.gettop* methods.
+        Synced members are combined with one local query, the rest are requested from the api.
+        Both only count the SERVER_TOP_LIMIT top items of each member.
+
+        :returns : (list of item lists, amount of members included)
+        """
+        synced, unsynced = await self.split_server_users(ctx)
+        data = await asyncio.gather(
+            *(
+                self.get_server_top(lastfm_username, datatype, bulk_group=ctx.guild.id)
+                for lastfm_username, _ in unsynced
+            )
+        )
+        data = [user_data for user_data in data if user_data is not None]
+        total_users = len(data)
+        if synced:
+            data.append(
+                await self.scrobbles.combined_top(
+                    datatype,
+                    [lastfm_username for lastfm_username, _ in synced],
+                    per_user=SERVER_TOP_LIMIT,
+                )
+            )
+            total_users += len(synced)
+
+        return data, total_users
 
     @fm.group(aliases=["s", "guild"])
     @commands.guild_only()
@@ -1087,12 +1186,8 @@ class LastFm(commands.Cog):
         """What people on this server are listening to."""
         listeners = []
         tasks = []
-        for user_id, lastfm_username in await self.server_lastfm_usernames(ctx):
-            member = ctx.guild.get_member(user_id)
-            if member is None:
-                continue
-
-            tasks.append(get_np(lastfm_username, member))
+        for member, lastfm_username in self.bot.cache.guild_lastfm_users(ctx.guild):
+            tasks.append(self.get_np(lastfm_username, member, bulk_group=ctx.guild.id))
 
         total_linked = len(tasks)
         if tasks:
@@ -1125,7 +1220,8 @@ class LastFm(commands.Cog):
             icon_url=ctx.guild.icon_url_as(size=64),
         )
         content.colour = int(
-            await util.color_from_image_url(str(ctx.guild.icon_url_as(size=64))), 16
+            await util.color_from_image_url(self.bot, str(ctx.guild.icon_url_as(size=64))),
+            16,
         )
         content.set_footer(
             text=f"{total_listening} / {total_linked} Members are listening to music"
@@ -1137,12 +1233,8 @@ class LastFm(commands.Cog):
         """What people on this server have recently listened."""
         listeners = []
         tasks = []
-        for user_id, lastfm_username in await self.server_lastfm_usernames(ctx):
-            member = ctx.guild.get_member(user_id)
-            if member is None:
-                continue
-
-            tasks.append(get_lastplayed(lastfm_username, member))
+        for member, lastfm_username in self.bot.cache.guild_lastfm_users(ctx.guild):
+            tasks.append(self.get_lastplayed(lastfm_username, member, bulk_group=ctx.guild.id))
 
         total_linked = len(tasks)
         total_listening = 0
@@ -1178,7 +1270,8 @@ class LastFm(commands.Cog):
             icon_url=ctx.guild.icon_url_as(size=64),
         )
         content.colour = int(
-            await util.color_from_image_url(str(ctx.guild.icon_url_as(size=64))), 16
+            await util.color_from_image_url(self.bot, str(ctx.guild.icon_url_as(size=64))),
+            16,
         )
         content.set_footer(
             text=f"{total_listening} / {total_linked} Members are listening to music right now"
@@ -1189,24 +1282,10 @@ class LastFm(commands.Cog):
     async def server_topartists(self, ctx):
         """Combined top artists of this server's members."""
         artist_map = {}
-        tasks = []
-        total_users = 0
         total_plays = 0
-        for user_id, lastfm_username in await self.server_lastfm_usernames(
-            ctx, filter_cheaters=True
-        ):
-            member = ctx.guild.get_member(user_id)
-            if member is None:
-                continue
-
-            tasks.append(self.get_server_top(lastfm_username, "artist"))
-
-        if tasks:
-            data = await asyncio.gather(*tasks)
+        data, total_users = await self.server_top(ctx, "artist")
+        if total_users > 0:
             for user_data in data:
-                if user_data is None:
-                    continue
-                total_users += 1
                 for data_block in user_data:
                     name = data_block["name"]
                     plays = int(data_block["playcount"])
@@ -1220,12 +1299,12 @@ class LastFm(commands.Cog):
 
         rows = []
         content = discord.Embed(title=f"Most listened to artists in {ctx.guild}")
-        content.set_footer(text=f"Taking into account top 100 artists of {total_users} members")
+        content.set_footer(text=f"Taking into account {total_users} members")
         for i, (artistname, playcount) in enumerate(
             sorted(artist_map.items(), key=lambda x: x[1], reverse=True), start=1
         ):
             if i == 1:
-                image_url = await scrape_artist_image(artistname)
+                image_url = await self.artist_images.get(artistname)
                 content.colour = await self.cached_image_color(image_url)
                 content.set_thumbnail(url=image_url)
 
@@ -1239,24 +1318,10 @@ class LastFm(commands.Cog):
     async def server_topalbums(self, ctx):
         """Combined top albums of this server's members."""
         album_map = {}
-        tasks = []
-        total_users = 0
         total_plays = 0
-        for user_id, lastfm_username in await self.server_lastfm_usernames(
-            ctx, filter_cheaters=True
-        ):
-            member = ctx.guild.get_member(user_id)
-            if member is None:
-                continue
-
-            tasks.append(self.get_server_top(lastfm_username, "album"))
-
-        if tasks:
-            data = await asyncio.gather(*tasks)
+        data, total_users = await self.server_top(ctx, "album")
+        if total_users > 0:
             for user_data in data:
-                if user_data is None:
-                    continue
-                total_users += 1
                 for data_block in user_data:
                     name = f'{util.escape_md(data_block["artist"]["name"])} — *{util.escape_md(data_block["name"])}*'
                     plays = int(data_block["playcount"])
@@ -1271,7 +1336,7 @@ class LastFm(commands.Cog):
 
         rows = []
         content = discord.Embed(title=f"Most listened to albums in {ctx.guild}")
-        content.set_footer(text=f"Taking into account top 100 albums of {total_users} members")
+        content.set_footer(text=f"Taking into account {total_users} members")
         for i, (albumname, albumdata) in enumerate(
             sorted(album_map.items(), key=lambda x: x[1]["plays"], reverse=True), start=1
         ):
@@ -1289,24 +1354,10 @@ class LastFm(commands.Cog):
     async def server_toptracks(self, ctx):
         """Combined top tracks of this server's members."""
         track_map = {}
-        tasks = []
-        total_users = 0
         total_plays = 0
-        for user_id, lastfm_username in await self.server_lastfm_usernames(
-            ctx, filter_cheaters=True
-        ):
-            member = ctx.guild.get_member(user_id)
-            if member is None:
-                continue
-
-            tasks.append(self.get_server_top(lastfm_username, "track"))
-
-        if tasks:
-            data = await asyncio.gather(*tasks)
+        data, total_users = await self.server_top(ctx, "track")
+        if total_users > 0:
             for user_data in data:
-                if user_data is None:
-                    continue
-                total_users += 1
                 for data_block in user_data:
                     name = f'{util.escape_md(data_block["artist"]["name"])} — *{util.escape_md(data_block["name"])}*'
                     plays = int(data_block["playcount"])
@@ -1321,12 +1372,12 @@ class LastFm(commands.Cog):
 
         rows = []
         content = discord.Embed(title=f"Most listened to tracks in {ctx.guild}")
-        content.set_footer(text=f"Taking into account top 100 tracks of {total_users} members")
+        content.set_footer(text=f"Taking into account {total_users} members")
         for i, (trackname, trackdata) in enumerate(
             sorted(track_map.items(), key=lambda x: x[1]["plays"], reverse=True), start=1
         ):
             if i == 1:
-                image_url = await scrape_artist_image(trackdata["artist"])
+                image_url = await self.artist_images.get(trackdata["artist"])
                 content.colour = await self.cached_image_color(image_url)
                 content.set_thumbnail(url=image_url)
 
@@ -1335,36 +1386,39 @@ class LastFm(commands.Cog):
 
         await util.send_as_pages(ctx, content, rows, 15)
 
-    async def get_server_top(self, username, datatype):
-        limit = 100
+    async def get_server_top(self, username, datatype, bulk_group=None):
+        limit = SERVER_TOP_LIMIT
         if datatype == "artist":
-            data = await api_request(
+            data = await self.api_request(
                 {
                     "user": username,
                     "method": "user.gettopartists",
                     "limit": limit,
                 },
                 ignore_errors=True,
+                bulk_group=bulk_group,
             )
             return data["topartists"]["artist"] if data is not None else None
         elif datatype == "album":
-            data = await api_request(
+            data = await self.api_request(
                 {
                     "user": username,
                     "method": "user.gettopalbums",
                     "limit": limit,
                 },
                 ignore_errors=True,
+                bulk_group=bulk_group,
             )
             return data["topalbums"]["album"] if data is not None else None
         elif datatype == "track":
-            data = await api_request(
+            data = await self.api_request(
                 {
                     "user": username,
                     "method": "user.gettoptracks",
                     "limit": limit,
                 },
                 ignore_errors=True,
+                bulk_group=bulk_group,
             )
             return data["toptracks"]["track"] if data is not None else None
 
@@ -1384,29 +1438,38 @@ class LastFm(commands.Cog):
 
         artistname = remove_mentions(artistname)
         if artistname.lower() == "np":
-            artistname = (await getnowplaying(ctx))["artist"]
+            artistname = (await self.getnowplaying(ctx))["artist"]
             if artistname is None:
                 raise exceptions.Warning("Could not get currently playing artist!")
 
+        synced, unsynced = await self.split_server_users(ctx)
+        if not synced and not unsynced:
+            return await ctx.send("Nobody on this server has connected their last.fm account yet!")
+
         listeners = []
-        tasks = []
-        for user_id, lastfm_username in await self.server_lastfm_usernames(
-            ctx, filter_cheaters=True
-        ):
-            member = ctx.guild.get_member(user_id)
-            if member is None:
-                continue
+        if synced:
+            data = await self.api_request(
+                {"method": "artist.getinfo", "artist": artistname, "autocorrect": 1},
+                ignore_errors=True,
+            )
+            if data is not None:
+                artistname = data["artist"]["name"]
 
-            tasks.append(get_playcount(artistname, lastfm_username, member))
+            playcounts = await self.scrobbles.artist_playcounts(
+                artistname, [lastfm_username for lastfm_username, _ in synced]
+            )
+            listeners += match_playcounts(synced, playcounts)
 
-        if tasks:
-            data = await asyncio.gather(*tasks)
-            for playcount, member, name in data:
-                artistname = name
-                if playcount > 0:
-                    listeners.append((playcount, member))
-        else:
-            return await ctx.send("Nobody on this server has connected their last.fm account yet!")
+        data = await asyncio.gather(
+            *(
+                self.get_playcount(artistname, lastfm_username, member, bulk_group=ctx.guild.id)
+                for lastfm_username, member in unsynced
+            )
+        )
+        for playcount, member, name in data:
+            artistname = name
+            if playcount > 0:
+                listeners.append((playcount, member))
 
         artistname = util.escape_md(artistname)
 
@@ -1418,6 +1481,7 @@ class LastFm(commands.Cog):
             sorted(listeners, key=lambda p: p[0], reverse=True), start=1
         ):
             if i == 1:
+                # mirror playcounts are at most scrobbles.max_age old, see split_server_users
                 rank = ":crown:"
                 old_king = await self.bot.db.execute(
                     "SELECT user_id FROM artist_crown WHERE artist_name = %s AND guild_id = %s",
@@ -1438,6 +1502,7 @@ class LastFm(commands.Cog):
                     artistname,
                     playcount,
                 )
+                self.bot.leaderboards.move_crown(ctx.guild.id, old_king or None, member.id)
                 if old_king:
                     old_king = ctx.guild.get_member(old_king)
                 new_king = member
@@ -1452,7 +1517,7 @@ class LastFm(commands.Cog):
             return await ctx.send(f"Nobody on this server has listened to **{artistname}**")
 
         content = discord.Embed(title=f"Who knows **{artistname}**?")
-        image_url = await scrape_artist_image(artistname)
+        image_url = await self.artist_images.get(artistname)
         content.set_thumbnail(url=image_url)
         content.set_footer(text=f"Collective plays: {total}")
 
@@ -1482,7 +1547,7 @@ class LastFm(commands.Cog):
 
         track = remove_mentions(track)
         if track.lower() == "np":
-            npd = await getnowplaying(ctx)
+            npd = await self.getnowplaying(ctx)
             trackname = npd["track"]
             artistname = npd["artist"]
             if None in [trackname, artistname]:
@@ -1495,25 +1560,47 @@ class LastFm(commands.Cog):
             except ValueError:
                 raise exceptions.Warning("Incorrect format! use `track | artist`")
 
+        synced, unsynced = await self.split_server_users(ctx)
+        if not synced and not unsynced:
+            return await ctx.send("Nobody on this server has connected their last.fm account yet!")
+
         listeners = []
-        tasks = []
-        for user_id, lastfm_username in await self.server_lastfm_usernames(
-            ctx, filter_cheaters=True
-        ):
-            member = ctx.guild.get_member(user_id)
-            if member is None:
-                continue
+        image_url = None
+        if synced:
+            data = await self.api_request(
+                {
+                    "method": "track.getinfo",
+                    "track": trackname,
+                    "artist": artistname,
+                    "autocorrect": 1,
+                },
+                ignore_errors=True,
+            )
+            if data is not None:
+                artistname = data["track"]["artist"]["name"]
+                trackname = data["track"]["name"]
+                try:
+                    image_url = data["track"]["album"]["image"][-1]["#text"]
+                except KeyError:
+                    pass
 
-            tasks.append(get_playcount_track(artistname, trackname, lastfm_username, member))
+            playcounts = await self.scrobbles.track_playcounts(
+                artistname, trackname, [lastfm_username for lastfm_username, _ in synced]
+            )
+            listeners += match_playcounts(synced, playcounts)
 
-        if tasks:
-            data = await asyncio.gather(*tasks)
-            for playcount, user, metadata in data:
-                artistname, trackname, image_url = metadata
-                if playcount > 0:
-                    listeners.append((playcount, user))
-        else:
-            return await ctx.send("Nobody on this server has connected their last.fm account yet!")
+        data = await asyncio.gather(
+            *(
+                self.get_playcount_track(
+                    artistname, trackname, lastfm_username, member, bulk_group=ctx.guild.id
+                )
+                for lastfm_username, member in unsynced
+            )
+        )
+        for playcount, user, metadata in data:
+            artistname, trackname, image_url = metadata
+            if playcount > 0:
+                listeners.append((playcount, user))
 
         artistname = util.escape_md(artistname)
         trackname = util.escape_md(trackname)
@@ -1534,7 +1621,7 @@ class LastFm(commands.Cog):
             )
 
         if image_url is None:
-            image_url = await scrape_artist_image(artistname)
+            image_url = await self.artist_images.get(artistname)
 
         content = discord.Embed(title=f"Who knows **{trackname}**\n— by {artistname}")
         content.set_thumbnail(url=image_url)
@@ -1560,7 +1647,7 @@ class LastFm(commands.Cog):
 
         album = remove_mentions(album)
         if album.lower() == "np":
-            npd = await getnowplaying(ctx)
+            npd = await self.getnowplaying(ctx)
             albumname = npd["album"]
             artistname = npd["artist"]
             if None in [albumname, artistname]:
@@ -1573,25 +1660,47 @@ class LastFm(commands.Cog):
             except ValueError:
                 raise exceptions.Warning("Incorrect format! use `album | artist`")
 
+        synced, unsynced = await self.split_server_users(ctx)
+        if not synced and not unsynced:
+            return await ctx.send("Nobody on this server has connected their last.fm account yet!")
+
         listeners = []
-        tasks = []
-        for user_id, lastfm_username in await self.server_lastfm_usernames(
-            ctx, filter_cheaters=True
-        ):
-            member = ctx.guild.get_member(user_id)
-            if member is None:
-                continue
+        image_url = None
+        if synced:
+            data = await self.api_request(
+                {
+                    "method": "album.getinfo",
+                    "album": albumname,
+                    "artist": artistname,
+                    "autocorrect": 1,
+                },
+                ignore_errors=True,
+            )
+            if data is not None:
+                artistname = data["album"]["artist"]
+                albumname = data["album"]["name"]
+                try:
+                    image_url = data["album"]["image"][-1]["#text"]
+                except KeyError:
+                    pass
 
-            tasks.append(get_playcount_album(artistname, albumname, lastfm_username, member))
+            playcounts = await self.scrobbles.album_playcounts(
+                artistname, albumname, [lastfm_username for lastfm_username, _ in synced]
+            )
+            listeners += match_playcounts(synced, playcounts)
 
-        if tasks:
-            data = await asyncio.gather(*tasks)
-            for playcount, user, metadata in data:
-                artistname, albumname, image_url = metadata
-                if playcount > 0:
-                    listeners.append((playcount, user))
-        else:
-            return await ctx.send("Nobody on this server has connected their last.fm account yet!")
+        data = await asyncio.gather(
+            *(
+                self.get_playcount_album(
+                    artistname, albumname, lastfm_username, member, bulk_group=ctx.guild.id
+                )
+                for lastfm_username, member in unsynced
+            )
+        )
+        for playcount, user, metadata in data:
+            artistname, albumname, image_url = metadata
+            if playcount > 0:
+                listeners.append((playcount, user))
 
         artistname = util.escape_md(artistname)
         albumname = util.escape_md(albumname)
@@ -1612,7 +1721,7 @@ class LastFm(commands.Cog):
             )
 
         if image_url is None:
-            image_url = await scrape_artist_image(artistname)
+            image_url = await self.artist_images.get(artistname)
 
         content = discord.Embed(title=f"Who knows **{albumname}**\n— by {artistname}")
         content.set_thumbnail(url=image_url)
@@ -1631,9 +1740,20 @@ class LastFm(commands.Cog):
 
         crownartists = await self.bot.db.execute(
             """
-            SELECT artist_name, cached_playcount FROM artist_crown
-            WHERE guild_id = %s AND user_id = %s ORDER BY cached_playcount DESC
+            SELECT artist_crown.artist_name,
+                COALESCE(lastfm_artist_playcount.playcount, artist_crown.cached_playcount) AS plays
+            FROM artist_crown
+            LEFT JOIN user_settings
+                ON user_settings.user_id = artist_crown.user_id
+            LEFT JOIN lastfm_artist_playcount
+                ON lastfm_artist_playcount.lastfm_username = user_settings.lastfm_username
+                AND lastfm_artist_playcount.artist_name = artist_crown.artist_name
+                AND lastfm_artist_playcount.lastfm_username IN (
+                    SELECT lastfm_username FROM lastfm_sync_state WHERE synced_on >= %s
+                )
+            WHERE artist_crown.guild_id = %s AND artist_crown.user_id = %s ORDER BY plays DESC
             """,
+            self.scrobbles.fresh_since(),
             ctx.guild.id,
             user.id,
         )
@@ -1662,7 +1782,7 @@ class LastFm(commands.Cog):
         """Report lastfm account."""
         lastfm_username = lastfm_username.strip("/").split("/")[-1].lower()
         url = f"https://www.last.fm/user/{lastfm_username}"
-        data = await api_request(
+        data = await self.api_request(
             {"user": lastfm_username, "method": "user.getinfo"}, ignore_errors=True
         )
         if data is None:
@@ -1723,9 +1843,13 @@ class LastFm(commands.Cog):
         msg = await reports_channel.send(embed=content)
 
         async def confirm_ban():
-            await self.bot.db.execute(
+            await self.bot.cache.set_value(
+                "lastfm_cheaters",
+                lastfm_username.lower(),
+                reason,
                 """
                 INSERT IGNORE lastfm_cheater (lastfm_username, flagged_on, reason)
+                    VALUES (%s, %s, %s)
                 """,
                 lastfm_username.lower(),
                 arrow.now().datetime,
@@ -1751,7 +1875,7 @@ class LastFm(commands.Cog):
     async def lyrics(self, ctx, *, query):
         """Search for song lyrics."""
         if query.lower() == "np":
-            npd = await getnowplaying(ctx)
+            npd = await self.getnowplaying(ctx)
             trackname = npd["track"]
             artistname = npd["artist"]
             if None in [trackname, artistname]:
@@ -1763,9 +1887,8 @@ class LastFm(commands.Cog):
             "api_token": AUDDIO_TOKEN,
             "q": query,
         }
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url=url, data=request_data) as response:
-                data = await response.json()
+        async with self.bot.session.post(url=url, data=request_data) as response:
+            data = await response.json()
 
         if data["status"] != "success":
             raise exceptions.Warning(
@@ -1813,36 +1936,17 @@ class LastFm(commands.Cog):
         await util.send_as_pages(ctx, content, rows, maxrows=20)
 
     async def cached_image_color(self, image_url):
-        """Get image color, cache if new."""
-        image_hash = image_url.split("/")[-1].split(".")[0]
-        cached_color = await self.bot.db.execute(
-            "SELECT hex FROM image_color_cache WHERE image_hash = %s",
-            image_hash,
-            one_value=True,
-        )
-        if cached_color:
-            return int(cached_color, 16)
-        else:
-            color = await util.color_from_image_url(
-                image_url, fallback=None, return_color_object=True
-            )
-            if color is None:
-                return int(self.lastfm_red, 16)
-
-            hex_color = util.rgb_to_hex(color)
-            await self.bot.db.execute(
-                "INSERT IGNORE image_color_cache (image_hash, r, g, b, hex) VALUES (%s, %s, %s, %s, %s)",
-                image_hash,
-                color.r,
-                color.g,
-                color.b,
-                hex_color,
-            )
+        """Get image color as an integer, falling back to last.fm red."""
+        color = await self.bot.image_colors.get(image_url)
+        if color is None:
+            return int(self.lastfm_red, 16)
 
-            return int(hex_color, 16)
+        return int(util.rgb_to_hex(color), 16)
 
     async def get_userinfo_embed(self, username):
-        data = await api_request({"user": username, "method": "user.getinfo"}, ignore_errors=True)
+        data = await self.api_request(
+            {"user": username, "method": "user.getinfo"}, ignore_errors=True
+        )
         if data is None:
             return None
 
@@ -1895,7 +1999,7 @@ class LastFm(commands.Cog):
             "to": current_day_floor.shift(minutes=-1).timestamp,
             "limit": 1000,
         }
-        content = await api_request(params)
+        content = await self.api_request(params)
         tracks = content["recenttracks"]["track"]
 
         # get rid of nowplaying track if user is currently scrobbling.
@@ -1933,166 +2037,358 @@ class LastFm(commands.Cog):
         # content.add_field(name="Listening time", value=listening_time)
         await ctx.send(embed=content)
 
+    async def getnowplaying(self, ctx):
+        await username_to_ctx(ctx)
+        playing = {"artist": None, "album": None, "track": None}
 
-# class ends here
+        data = await self.api_request(
+            {"user": ctx.username, "method": "user.getrecenttracks", "limit": 1}
+        )
 
+        try:
+            tracks = data["recenttracks"]["track"]
+            if tracks:
+                playing["artist"] = tracks[0]["artist"]["#text"]
+                playing["album"] = tracks[0]["album"]["#text"]
+                playing["track"] = tracks[0]["name"]
+        except KeyError:
+            pass
 
-def setup(bot):
-    bot.add_cog(LastFm(bot))
+        return playing
+
+    async def get_playcount_track(self, artist, track, username, reference=None, bulk_group=None):
+        data = await self.api_request(
+            {
+                "method": "track.getinfo",
+                "user": username,
+                "track": track,
+                "artist": artist,
+                "autocorrect": 1,
+            },
+            bulk_group=bulk_group,
+        )
+        try:
+            count = int(data["track"]["userplaycount"])
+        except (KeyError, TypeError):
+            count = 0
 
+        artistname = data["track"]["artist"]["name"]
+        trackname = data["track"]["name"]
 
-def format_plays(amount):
-    if amount == 1:
-        return "play"
-    else:
-        return "plays"
+        try:
+            image_url = data["track"]["album"]["image"][-1]["#text"]
+        except KeyError:
+            image_url = None
 
+        if reference is None:
+            return count
+        else:
+            return count, reference, (artistname, trackname, image_url)
+
+    async def get_playcount_album(self, artist, album, username, reference=None, bulk_group=None):
+        data = await self.api_request(
+            {
+                "method": "album.getinfo",
+                "user": username,
+                "album": album,
+                "artist": artist,
+                "autocorrect": 1,
+            },
+            bulk_group=bulk_group,
+        )
+        try:
+            count = int(data["album"]["userplaycount"])
+        except (KeyError, TypeError):
+            count = 0
 
-async def getnowplaying(ctx):
-    await username_to_ctx(ctx)
-    playing = {"artist": None, "album": None, "track": None}
+        artistname = data["album"]["artist"]
+        albumname = data["album"]["name"]
 
-    data = await api_request({"user": ctx.username, "method": "user.getrecenttracks", "limit": 1})
+        try:
+            image_url = data["album"]["image"][-1]["#text"]
+        except KeyError:
+            image_url = None
 
-    try:
-        tracks = data["recenttracks"]["track"]
-        if tracks:
-            playing["artist"] = tracks[0]["artist"]["#text"]
-            playing["album"] = tracks[0]["album"]["#text"]
-            playing["track"] = tracks[0]["name"]
-    except KeyError:
-        pass
+        if reference is None:
+            return count
+        else:
+            return count, reference, (artistname, albumname, image_url)
 
-    return playing
+    async def get_playcount(self, artist, username, reference=None, bulk_group=None):
+        data = await self.api_request(
+            {"method": "artist.getinfo", "user": username, "artist": artist, "autocorrect": 1},
+            bulk_group=bulk_group,
+        )
+        try:
+            count = int(data["artist"]["stats"]["userplaycount"])
+        except (KeyError, TypeError):
+            count = 0
 
+        name = data["artist"]["name"]
 
-async def get_playcount_track(artist, track, username, reference=None):
-    data = await api_request(
-        {
-            "method": "track.getinfo",
-            "user": username,
-            "track": track,
-            "artist": artist,
-            "autocorrect": 1,
-        }
-    )
-    try:
-        count = int(data["track"]["userplaycount"])
-    except (KeyError, TypeError):
-        count = 0
+        if reference is None:
+            return count
+        else:
+            return count, reference, name
 
-    artistname = data["track"]["artist"]["name"]
-    trackname = data["track"]["name"]
+    async def get_np(self, username, ref, bulk_group=None):
+        data = await self.api_request(
+            {"method": "user.getrecenttracks", "user": username, "limit": 1},
+            ignore_errors=True,
+            bulk_group=bulk_group,
+        )
+        song = None
+        if data is not None:
+            try:
+                tracks = data["recenttracks"]["track"]
+                if tracks:
+                    if "@attr" in tracks[0]:
+                        if "nowplaying" in tracks[0]["@attr"]:
+                            song = {
+                                "artist": tracks[0]["artist"]["#text"],
+                                "name": tracks[0]["name"],
+                            }
+            except KeyError:
+                pass
 
-    try:
-        image_url = data["track"]["album"]["image"][-1]["#text"]
-    except KeyError:
-        image_url = None
+        return song, ref
 
-    if reference is None:
-        return count
-    else:
-        return count, reference, (artistname, trackname, image_url)
+    async def get_lastplayed(self, username, ref, bulk_group=None):
+        data = await self.api_request(
+            {"method": "user.getrecenttracks", "user": username, "limit": 1},
+            ignore_errors=True,
+            bulk_group=bulk_group,
+        )
+        song = None
+        if data is not None:
+            try:
+                tracks = data["recenttracks"]["track"]
+                if tracks:
+                    nowplaying = False
+                    if tracks[0].get("@attr"):
+                        if tracks[0]["@attr"].get("nowplaying"):
+                            nowplaying = True
+
+                    if tracks[0].get("date"):
+                        date = tracks[0]["date"]["uts"]
+                    else:
+                        date = arrow.now().timestamp
+
+                    song = {
+                        "artist": tracks[0]["artist"]["#text"],
+                        "name": tracks[0]["name"],
+                        "nowplaying": nowplaying,
+                        "date": int(date),
+                    }
+            except KeyError:
+                pass
 
+        return song, ref
 
-async def get_playcount_album(artist, album, username, reference=None):
-    data = await api_request(
-        {
-            "method": "album.getinfo",
-            "user": username,
-            "album": album,
-            "artist": artist,
-            "autocorrect": 1,
-        }
-    )
-    try:
-        count = int(data["album"]["userplaycount"])
-    except (KeyError, TypeError):
-        count = 0
+    async def api_request(self, params, ignore_errors=False, bulk_group=None):
+        """
+        Get json data from the lastfm api.
+
+        :param bulk_group : Schedule as a low priority bulk request, fair shared with other
+                            requests of the same group (eg. guild id) instead of served first
+        """
+        params["api_key"] = LASTFM_APPID
+        params["format"] = "json"
+        key = cache_key(params)
+        ttl = cache_ttl(params)
+        priority = ratelimit.INTERACTIVE if bulk_group is None else ratelimit.BULK
+        tries = 0
+        max_tries = 2
+        while True:
+            if ttl:
+                cached = self.api_cache.get(key)
+                if cached is not None:
+                    return json.loads(cached)
+
+            status, text = await self.api_cache.coalesce(
+                key, self.fetch_api_response, params, priority, bulk_group
+            )
+            try:
+                content = json.loads(text)
+            except ValueError:
+                if ignore_errors:
+                    return None
+                else:
+                    raise exceptions.LastFMError(error_code=status, message=text)
 
-    artistname = data["album"]["artist"]
-    albumname = data["album"]["name"]
+            if content is None:
+                raise exceptions.LastFMError(
+                    error_code=408,
+                    message="Could not connect to LastFM",
+                )
+            if status == 200 and content.get("error") is None:
+                if ttl:
+                    self.api_cache.set(key, text, ttl)
+                return content
+            else:
+                error_code = int(content.get("error"))
+                if error_code == 29:
+                    # rate limit exceeded, stop sending anything until the bucket refills
+                    self.api_scheduler.bucket.drain()
+                if error_code in [8, 29]:
+                    tries += 1
+                    if tries < max_tries:
+                        continue
 
-    try:
-        image_url = data["album"]["image"][-1]["#text"]
-    except KeyError:
-        image_url = None
+                if ignore_errors:
+                    return None
+                else:
+                    raise exceptions.LastFMError(
+                        error_code=content.get("error"),
+                        message=content.get("message"),
+                    )
 
-    if reference is None:
-        return count
-    else:
-        return count, reference, (artistname, albumname, image_url)
+    async def fetch_api_response(self, params, priority, group):
+        """Make the actual http request to the lastfm api, once the scheduler lets us."""
+        async with self.api_scheduler.slot(priority, group):
+            async with self.bot.session.get(LASTFM_API_URL, params=params) as response:
+                return response.status, await response.text()
+
+    async def custom_period(self, user, group_by, shift_hours=24):
+        """Parse recent tracks to get custom duration data (24 hour)."""
+        limit_timestamp = arrow.utcnow().shift(hours=-shift_hours)
+        if await self.scrobbles.synced_usernames([user]) and await self.scrobbles.sync_user(user):
+            data = await self.scrobbles.recent_tracks(user, limit_timestamp.timestamp)
+            loops = 1
+        else:
+            data = await self.api_request(
+                {
+                    "user": user,
+                    "method": "user.getrecenttracks",
+                    "from": limit_timestamp.timestamp,
+                    "limit": 200,
+                }
+            )
+            loops = int(data["recenttracks"]["@attr"]["totalPages"])
+
+        if loops > 1:
+            for i in range(2, loops + 1):
+                newdata = await self.api_request(
+                    {
+                        "user": user,
+                        "method": "user.getrecenttracks",
+                        "from": limit_timestamp.timestamp,
+                        "limit": 200,
+                        "page": i,
+                    }
+                )
+                data["recenttracks"]["track"] += newdata["recenttracks"]["track"]
+
+        formatted_data = {}
+        if group_by in ["album", "user.gettopalbums"]:
+            for track in data["recenttracks"]["track"]:
+                album_name = track["album"]["#text"]
+                artist_name = track["artist"]["#text"]
+                if (artist_name, album_name) in formatted_data:
+                    formatted_data[(artist_name, album_name)]["playcount"] += 1
+                else:
+                    formatted_data[(artist_name, album_name)] = {
+                        "playcount": 1,
+                        "artist": {"name": artist_name},
+                        "name": album_name,
+                        "image": track["image"],
+                    }
+
+            albumsdata = sorted(formatted_data.values(), key=lambda x: x["playcount"], reverse=True)
+            return {
+                "topalbums": {
+                    "album": albumsdata,
+                    "@attr": {
+                        "user": data["recenttracks"]["@attr"]["user"],
+                        "total": len(formatted_data.values()),
+                    },
+                }
+            }
 
+        elif group_by in ["track", "user.gettoptracks"]:
+            for track in data["recenttracks"]["track"]:
+                track_name = track["name"]
+                artist_name = track["artist"]["#text"]
+                if (track_name, artist_name) in formatted_data:
+                    formatted_data[(track_name, artist_name)]["playcount"] += 1
+                else:
+                    formatted_data[(track_name, artist_name)] = {
+                        "playcount": 1,
+                        "artist": {"name": artist_name},
+                        "name": track_name,
+                        "image": track["image"],
+                    }
+
+            tracksdata = sorted(formatted_data.values(), key=lambda x: x["playcount"], reverse=True)
+            return {
+                "toptracks": {
+                    "track": tracksdata,
+                    "@attr": {
+                        "user": data["recenttracks"]["@attr"]["user"],
+                        "total": len(formatted_data.values()),
+                    },
+                }
+            }
 
-async def get_playcount(artist, username, reference=None):
-    data = await api_request(
-        {"method": "artist.getinfo", "user": username, "artist": artist, "autocorrect": 1}
-    )
-    try:
-        count = int(data["artist"]["stats"]["userplaycount"])
-    except (KeyError, TypeError):
-        count = 0
+        elif group_by in ["artist", "user.gettopartists"]:
+            for track in data["recenttracks"]["track"]:
+                artist_name = track["artist"]["#text"]
+                if artist_name in formatted_data:
+                    formatted_data[artist_name]["playcount"] += 1
+                else:
+                    formatted_data[artist_name] = {
+                        "playcount": 1,
+                        "name": artist_name,
+                        "image": track["image"],
+                    }
+
+            artistdata = sorted(formatted_data.values(), key=lambda x: x["playcount"], reverse=True)
+            return {
+                "topartists": {
+                    "artist": artistdata,
+                    "@attr": {
+                        "user": data["recenttracks"]["@attr"]["user"],
+                        "total": len(formatted_data.values()),
+                    },
+                }
+            }
 
-    name = data["artist"]["name"]
+    async def scrape_artists_for_chart(self, username, period, amount):
+        tasks = []
+        url = f"https://www.last.fm/user/{username}/library/artists"
+        for i in range(1, math.ceil(amount / 50) + 1):
+            params = {"date_preset": period_http_format(period), "page": i}
+            task = asyncio.ensure_future(fetch(self.bot.session, url, params, handling="text"))
+            tasks.append(task)
 
-    if reference is None:
-        return count
-    else:
-        return count, reference, name
+        responses = await asyncio.gather(*tasks)
 
+        images = []
+        for data in responses:
+            if len(images) >= amount:
+                break
 
-async def get_np(username, ref):
-    data = await api_request(
-        {"method": "user.getrecenttracks", "user": username, "limit": 1},
-        ignore_errors=True,
-    )
-    song = None
-    if data is not None:
-        try:
-            tracks = data["recenttracks"]["track"]
-            if tracks:
-                if "@attr" in tracks[0]:
-                    if "nowplaying" in tracks[0]["@attr"]:
-                        song = {
-                            "artist": tracks[0]["artist"]["#text"],
-                            "name": tracks[0]["name"],
-                        }
-        except KeyError:
-            pass
+            soup = BeautifulSoup(data, "html.parser")
+            imagedivs = soup.findAll("td", {"class": "chartlist-image"})
+            images += [
+                div.find("img")["src"].replace("/avatar70s/", "/300x300/") for div in imagedivs
+            ]
 
-    return song, ref
+        return images
 
 
-async def get_lastplayed(username, ref):
-    data = await api_request(
-        {"method": "user.getrecenttracks", "user": username, "limit": 1},
-        ignore_errors=True,
-    )
-    song = None
-    if data is not None:
-        try:
-            tracks = data["recenttracks"]["track"]
-            if tracks:
-                nowplaying = False
-                if tracks[0].get("@attr"):
-                    if tracks[0]["@attr"].get("nowplaying"):
-                        nowplaying = True
+# class ends here
 
-                if tracks[0].get("date"):
-                    date = tracks[0]["date"]["uts"]
-                else:
-                    date = arrow.now().timestamp
 
-                song = {
-                    "artist": tracks[0]["artist"]["#text"],
-                    "name": tracks[0]["name"],
-                    "nowplaying": nowplaying,
-                    "date": int(date),
-                }
-        except KeyError:
-            pass
+def setup(bot):
+    bot.add_cog(LastFm(bot))
 
-    return song, ref
+
+def format_plays(amount):
+    if amount == 1:
+        return "play"
+    else:
+        return "plays"
 
 
 def get_period(timeframe, allow_custom=True):
@@ -2210,165 +2506,6 @@ def parse_chart_arguments(args):
     return parsed
 
 
-async def api_request(params, ignore_errors=False):
-    """Get json data from the lastfm api."""
-    url = "http://ws.audioscrobbler.com/2.0/"
-    params["api_key"] = LASTFM_APPID
-    params["format"] = "json"
-    tries = 0
-    max_tries = 2
-    while True:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                try:
-                    content = await response.json()
-                except aiohttp.client_exceptions.ContentTypeError:
-                    if ignore_errors:
-                        return None
-                    else:
-                        text = await response.text()
-                        raise exceptions.LastFMError(error_code=response.status, message=text)
-
-                if content is None:
-                    raise exceptions.LastFMError(
-                        error_code=408,
-                        message="Could not connect to LastFM",
-                    )
-                if response.status == 200 and content.get("error") is None:
-                    return content
-                else:
-                    if int(content.get("error")) == 8:
-                        tries += 1
-                        if tries < max_tries:
-                            continue
-
-                    if ignore_errors:
-                        return None
-                    else:
-                        raise exceptions.LastFMError(
-                            error_code=content.get("error"),
-                            message=content.get("message"),
-                        )
-
-
-async def custom_period(user, group_by, shift_hours=24):
-    """Parse recent tracks to get custom duration data (24 hour)."""
-    limit_timestamp = arrow.utcnow().shift(hours=-shift_hours)
-    data = await api_request(
-        {
-            "user": user,
-            "method": "user.getrecenttracks",
-            "from": limit_timestamp.timestamp,
-            "limit": 200,
-        }
-    )
-    loops = int(data["recenttracks"]["@attr"]["totalPages"])
-    if loops > 1:
-        for i in range(2, loops + 1):
-            newdata = await api_request(
-                {
-                    "user": user,
-                    "method": "user.getrecenttracks",
-                    "from": limit_timestamp.timestamp,
-                    "limit": 200,
-                    "page": i,
-                }
-            )
-            data["recenttracks"]["track"] += newdata["recenttracks"]["track"]
-
-    formatted_data = {}
-    if group_by in ["album", "user.gettopalbums"]:
-        for track in data["recenttracks"]["track"]:
-            album_name = track["album"]["#text"]
-            artist_name = track["artist"]["#text"]
-            if (artist_name, album_name) in formatted_data:
-                formatted_data[(artist_name, album_name)]["playcount"] += 1
-            else:
-                formatted_data[(artist_name, album_name)] = {
-                    "playcount": 1,
-                    "artist": {"name": artist_name},
-                    "name": album_name,
-                    "image": track["image"],
-                }
-
-        albumsdata = sorted(formatted_data.values(), key=lambda x: x["playcount"], reverse=True)
-        return {
-            "topalbums": {
-                "album": albumsdata,
-                "@attr": {
-                    "user": data["recenttracks"]["@attr"]["user"],
-                    "total": len(formatted_data.values()),
-                },
-            }
-        }
-
-    elif group_by in ["track", "user.gettoptracks"]:
-        for track in data["recenttracks"]["track"]:
-            track_name = track["name"]
-            artist_name = track["artist"]["#text"]
-            if (track_name, artist_name) in formatted_data:
-                formatted_data[(track_name, artist_name)]["playcount"] += 1
-            else:
-                formatted_data[(track_name, artist_name)] = {
-                    "playcount": 1,
-                    "artist": {"name": artist_name},
-                    "name": track_name,
-                    "image": track["image"],
-                }
-
-        tracksdata = sorted(formatted_data.values(), key=lambda x: x["playcount"], reverse=True)
-        return {
-            "toptracks": {
-                "track": tracksdata,
-                "@attr": {
-                    "user": data["recenttracks"]["@attr"]["user"],
-                    "total": len(formatted_data.values()),
-                },
-            }
-        }
-
-    elif group_by in ["artist", "user.gettopartists"]:
-        for track in data["recenttracks"]["track"]:
-            artist_name = track["artist"]["#text"]
-            if artist_name in formatted_data:
-                formatted_data[artist_name]["playcount"] += 1
-            else:
-                formatted_data[artist_name] = {
-                    "playcount": 1,
-                    "name": artist_name,
-                    "image": track["image"],
-                }
-
-        artistdata = sorted(formatted_data.values(), key=lambda x: x["playcount"], reverse=True)
-        return {
-            "topartists": {
-                "artist": artistdata,
-                "@attr": {
-                    "user": data["recenttracks"]["@attr"]["user"],
-                    "total": len(formatted_data.values()),
-                },
-            }
-        }
-
-
-async def scrape_artist_image(artist):
-    url = f"https://www.last.fm/music/{urllib.parse.quote_plus(str(artist))}/+images"
-    async with aiohttp.ClientSession() as session:
-        data = await fetch(session, url, handling="text")
-    if data is None:
-        return ""
-
-    soup = BeautifulSoup(data, "html.parser")
-    image = soup.find("img", {"class": "image-list-image"})
-    if image is None:
-        try:
-            image = soup.find("li", {"class": "image-list-item-wrapper"}).find("a").find("img")
-        except AttributeError:
-            return ""
-
-    return image["src"].replace("/avatar170s/", "/300x300/") if image else ""
-
-
 async def fetch(session, url, params=None, handling="json"):
     async with session.get(url, params=params) as response:
         if response.status != 200:
@@ -2381,6 +2518,30 @@ async def fetch(session, url, params=None, handling="json"):
             return await response
 
 
+def cache_key(params):
+    """Normalize api request parameters into a hashable cache key."""
+    key = []
+    for name, value in params.items():
+        name = name.lower()
+        if name in ["api_key", "format"]:
+            continue
+        value = str(value).strip()
+        if name in ["method", "user"]:
+            value = value.lower()
+        key.append((name, value))
+
+    return tuple(sorted(key))
+
+
+def cache_ttl(params):
+    """How long the response to this api request can be cached for."""
+    method = params.get("method", "").lower()
+    if method.startswith("user.gettop"):
+        return PERIOD_CACHE_TTL.get(params.get("period", "overall"), 0)
+
+    return METHOD_CACHE_TTL.get(method, 0)
+
+
 def period_http_format(period):
     period_format_map = {
         "7day": "LAST_7_DAYS",
@@ -2393,29 +2554,6 @@ def period_http_format(period):
     return period_format_map.get(period)
 
 
-async def scrape_artists_for_chart(username, period, amount):
-    tasks = []
-    url = f"https://www.last.fm/user/{username}/library/artists"
-    async with aiohttp.ClientSession() as session:
-        for i in range(1, math.ceil(amount / 50) + 1):
-            params = {"date_preset": period_http_format(period), "page": i}
-            task = asyncio.ensure_future(fetch(session, url, params, handling="text"))
-            tasks.append(task)
-
-        responses = await asyncio.gather(*tasks)
-
-    images = []
-    for data in responses:
-        if len(images) >= amount:
-            break
-
-        soup = BeautifulSoup(data, "html.parser")
-        imagedivs = soup.findAll("td", {"class": "chartlist-image"})
-        images += [div.find("img")["src"].replace("/avatar70s/", "/300x300/") for div in imagedivs]
-
-    return images
-
-
 async def username_to_ctx(ctx):
     if ctx.message.mentions:
         ctx.foreign_target = True
@@ -2438,6 +2576,20 @@ async def username_to_ctx(ctx):
         raise exceptions.Warning(msg)
 
 
+def match_playcounts(users, playcounts):
+    """
+    :param users      : List of (lastfm_username, member)
+    :param playcounts : Dictionary of {lastfm_username (lowercased) : playcount}
+    :returns          : List of (playcount, member) for members who have listened
+    """
+    listeners = []
+    for lastfm_username, member in users:
+        playcount = playcounts.get(lastfm_username.lower(), 0)
+        if playcount > 0:
+            listeners.append((playcount, member))
+    return listeners
+
+
 def remove_mentions(text):
     """Remove mentions from string."""
     return (re.sub(r"<@\!?[0-9]+>", "", text)).strip()
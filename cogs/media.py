@@ -76,7 +76,7 @@ class Media(commands.Cog):
         region = parsed_region
 
         ggsoup = GGSoup()
-        await ggsoup.create(region, summoner_name)
+        await ggsoup.create(self.bot.session, region, summoner_name)
 
         content = discord.Embed()
         content.set_author(
@@ -144,7 +144,7 @@ class Media(commands.Cog):
         content = discord.Embed(title=f"{summoner_name} current game")
 
         ggsoup = GGSoup()
-        await ggsoup.create(region, summoner_name, sub_url="spectator/")
+        await ggsoup.create(self.bot.session, region, summoner_name, sub_url="spectator/")
 
         blue_team = ggsoup.soup.find("table", {"class": "Team-100"})
         red_team = ggsoup.soup.find("table", {"class": "Team-200"})
@@ -178,12 +178,11 @@ class Media(commands.Cog):
             "maxResults": 25,
             "q": query,
         }
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 403:
-                    raise exceptions.Error("Daily youtube api quota reached.")
+        async with self.bot.session.get(url, params=params) as response:
+            if response.status == 403:
+                raise exceptions.Error("Daily youtube api quota reached.")
 
-                data = await response.json()
+            data = await response.json()
 
         if not data.get("items"):
             return await ctx.send("No results found!")
@@ -199,94 +198,93 @@ class Media(commands.Cog):
     @flags.command(aliases=["ig", "insta"])
     async def instagram(self, ctx, **options):
         """Get all the images from one or more instagram posts."""
-        async with aiohttp.ClientSession() as session:
-            for url in options["urls"]:
-                result = regex.findall("/p/(.*?)(/|\\Z)", url)
-                if result:
-                    url = f"https://www.instagram.com/p/{result[0][0]}"
-                else:
-                    url = f"https://www.instagram.com/p/{url.strip('/').split('/')[0]}"
-
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:67.0) Gecko/20100101 Firefox/67.0",
-                }
-                post_id = url.split("/")[-1]
-                newurl = "https://www.instagram.com/graphql/query/"
-                params = {
-                    "query_hash": "505f2f2dfcfce5b99cb7ac4155cbf299",
-                    "variables": '{"shortcode":"'
-                    + post_id
-                    + '","include_reel":false,"include_logged_out":true}',
-                }
-
-                async with session.get(
-                    newurl, params=params, headers=headers, proxy=ROTATING_PROXY_URL
-                ) as response:
-                    try:
-                        data = await response.json()
-                    except aiohttp.ContentTypeError:
-                        raise exceptions.Error(
-                            "This proxy IP address has been banned by Instagram. Try again later."
-                        )
-                    data = data["data"]["shortcode_media"]
-
-                if data is None:
-                    await ctx.send(f":warning: Invalid instagram URL `{url}`")
-                    continue
-
-                medias = []
+        session = self.bot.session
+        for url in options["urls"]:
+            result = regex.findall("/p/(.*?)(/|\\Z)", url)
+            if result:
+                url = f"https://www.instagram.com/p/{result[0][0]}"
+            else:
+                url = f"https://www.instagram.com/p/{url.strip('/').split('/')[0]}"
+
+            headers = {
+                "User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:67.0) Gecko/20100101 Firefox/67.0",
+            }
+            post_id = url.split("/")[-1]
+            newurl = "https://www.instagram.com/graphql/query/"
+            params = {
+                "query_hash": "505f2f2dfcfce5b99cb7ac4155cbf299",
+                "variables": '{"shortcode":"'
+                + post_id
+                + '","include_reel":false,"include_logged_out":true}',
+            }
+
+            async with session.get(
+                newurl, params=params, headers=headers, proxy=ROTATING_PROXY_URL
+            ) as response:
                 try:
-                    for x in data["edge_sidecar_to_children"]["edges"]:
-                        medias.append(x["node"])
-                except KeyError:
-                    medias.append(data)
-
-                avatar_url = data["owner"]["profile_pic_url"]
-                username = data["owner"]["username"]
-                content = discord.Embed(color=random.choice(self.ig_colors))
-                content.set_author(name=f"@{username}", icon_url=avatar_url, url=url)
-
-                if not medias:
-                    await ctx.send(f":warning: Could not find any media from `{url}`")
-                    continue
-
-                if options["download"]:
-                    # send as files
-                    async with aiohttp.ClientSession() as session:
-                        await ctx.send(f"<{url}>")
-                        timestamp = arrow.get(data["taken_at_timestamp"]).format("YYMMDD")
-                        for n, file in enumerate(medias, start=1):
-                            if file.get("is_video"):
-                                media_url = file.get("video_url")
-                                extension = "mp4"
-                            else:
-                                media_url = file.get("display_url")
-                                extension = "jpg"
-
-                            filename = f"{timestamp}-@{username}-{post_id}-{n}.{extension}"
-                            async with session.get(media_url) as response:
-                                with open(filename, "wb") as f:
-                                    while True:
-                                        block = await response.content.read(1024)
-                                        if not block:
-                                            break
-                                        f.write(block)
-
-                            with open(filename, "rb") as f:
-                                await ctx.send(file=discord.File(f))
-
-                            os.remove(filename)
-                else:
-                    # send as embeds
-                    for medianode in medias:
-                        if medianode.get("is_video"):
-                            await ctx.send(embed=content)
-                            await ctx.send(medianode.get("video_url"))
-                        else:
-                            content.set_image(url=medianode.get("display_url"))
-                            await ctx.send(embed=content)
-                        content.description = None
-                        content._author = None
+                    data = await response.json()
+                except aiohttp.ContentTypeError:
+                    raise exceptions.Error(
+                        "This proxy IP address has been banned by Instagram. Try again later."
+                    )
+                data = data["data"]["shortcode_media"]
+
+            if data is None:
+                await ctx.send(f":warning: Invalid instagram URL `{url}`")
+                continue
+
+            medias = []
+            try:
+                for x in data["edge_sidecar_to_children"]["edges"]:
+                    medias.append(x["node"])
+            except KeyError:
+                medias.append(data)
+
+            avatar_url = data["owner"]["profile_pic_url"]
+            username = data["owner"]["username"]
+            content = discord.Embed(color=random.choice(self.ig_colors))
+            content.set_author(name=f"@{username}", icon_url=avatar_url, url=url)
+
+            if not medias:
+                await ctx.send(f":warning: Could not find any media from `{url}`")
+                continue
+
+            if options["download"]:
+                # send as files
+                await ctx.send(f"<{url}>")
+                timestamp = arrow.get(data["taken_at_timestamp"]).format("YYMMDD")
+                for n, file in enumerate(medias, start=1):
+                    if file.get("is_video"):
+                        media_url = file.get("video_url")
+                        extension = "mp4"
+                    else:
+                        media_url = file.get("display_url")
+                        extension = "jpg"
+
+                    filename = f"{timestamp}-@{username}-{post_id}-{n}.{extension}"
+                    async with session.get(media_url) as response:
+                        with open(filename, "wb") as f:
+                            while True:
+                                block = await response.content.read(1024)
+                                if not block:
+                                    break
+                                f.write(block)
+
+                    with open(filename, "rb") as f:
+                        await ctx.send(file=discord.File(f))
+
+                    os.remove(filename)
+            else:
+                # send as embeds
+                for medianode in medias:
+                    if medianode.get("is_video"):
+                        await ctx.send(embed=content)
+                        await ctx.send(medianode.get("video_url"))
+                    else:
+                        content.set_image(url=medianode.get("display_url"))
+                        await ctx.send(embed=content)
+                    content.description = None
+                    content._author = None
 
         try:
             # delete discord automatic embed
@@ -351,32 +349,30 @@ class Media(commands.Cog):
 
             if options["download"]:
                 # download file and rename, upload to discord
-                async with aiohttp.ClientSession() as session:
-                    await ctx.send(f"<{tweet.full_text.split(' ')[-1]}>")
-                    timestamp = arrow.get(tweet.created_at).format("YYMMDD")
-                    for n, file in enumerate(media_files, start=1):
-                        # is image not video
-                        if file[2] is None:
-                            extension = "jpeg"
-                        else:
-                            extension = "mp4"
-
-                        filename = (
-                            f"{timestamp}-@{tweet.user.screen_name}-{tweet.id}-{n}.{extension}"
-                        )
-                        url = file[1].replace(".jpg", "?format=jpg&name=orig")
-                        async with session.get(url) as response:
-                            with open(filename, "wb") as f:
-                                while True:
-                                    block = await response.content.read(1024)
-                                    if not block:
-                                        break
-                                    f.write(block)
-
-                        with open(filename, "rb") as f:
-                            await ctx.send(file=discord.File(f))
-
-                        os.remove(filename)
+                session = self.bot.session
+                await ctx.send(f"<{tweet.full_text.split(' ')[-1]}>")
+                timestamp = arrow.get(tweet.created_at).format("YYMMDD")
+                for n, file in enumerate(media_files, start=1):
+                    # is image not video
+                    if file[2] is None:
+                        extension = "jpeg"
+                    else:
+                        extension = "mp4"
+
+                    filename = f"{timestamp}-@{tweet.user.screen_name}-{tweet.id}-{n}.{extension}"
+                    url = file[1].replace(".jpg", "?format=jpg&name=orig")
+                    async with session.get(url) as response:
+                        with open(filename, "wb") as f:
+                            while True:
+                                block = await response.content.read(1024)
+                                if not block:
+                                    break
+                                f.write(block)
+
+                    with open(filename, "rb") as f:
+                        await ctx.send(file=discord.File(f))
+
+                    os.remove(filename)
 
             else:
                 # just send link in embed
@@ -402,13 +398,13 @@ class Media(commands.Cog):
         """Search for a random gif."""
 
         scripts = []
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            if len(query.split(" ")) == 1:
-                tasks.append(extract_scripts(session, f"https://gfycat.com/gifs/tag/{query}"))
+        session = self.bot.session
+        tasks = []
+        if len(query.split(" ")) == 1:
+            tasks.append(extract_scripts(session, f"https://gfycat.com/gifs/tag/{query}"))
 
-            tasks.append(extract_scripts(session, f"https://gfycat.com/gifs/search/{query}"))
-            scripts = sum(await asyncio.gather(*tasks), [])
+        tasks.append(extract_scripts(session, f"https://gfycat.com/gifs/search/{query}"))
+        scripts = sum(await asyncio.gather(*tasks), [])
 
         urls = []
         for script in scripts:
@@ -448,13 +444,13 @@ class Media(commands.Cog):
                 )
 
         url = f"https://www.melon.com/chart/{timeframe}/index.htm"
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:65.0) Gecko/20100101 Firefox/65.0",
-            }
-            async with session.get(url, headers=headers) as response:
-                soup = BeautifulSoup(await response.text(), "html.parser")
+        session = self.bot.session
+        headers = {
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:65.0) Gecko/20100101 Firefox/65.0",
+        }
+        async with session.get(url, headers=headers) as response:
+            soup = BeautifulSoup(await response.text(), "html.parser")
 
         song_titles = [
             util.escape_md(x.find("span").find("a").text)
@@ -490,16 +486,16 @@ class Media(commands.Cog):
     async def xkcd(self, ctx, comic_id=None):
         """Get a random xkcd comic"""
         if comic_id is None:
-            async with aiohttp.ClientSession() as session:
-                url = "https://c.xkcd.com/random/comic"
-                headers = {
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                    "Connection": "keep-alive",
-                    "Referer": "https://xkcd.com/",
-                    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:66.0) Gecko/20100101 Firefox/66.0",
-                }
-                async with session.get(url, headers=headers) as response:
-                    location = response.url
+            session = self.bot.session
+            url = "https://c.xkcd.com/random/comic"
+            headers = {
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Connection": "keep-alive",
+                "Referer": "https://xkcd.com/",
+                "User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:66.0) Gecko/20100101 Firefox/66.0",
+            }
+            async with session.get(url, headers=headers) as response:
+                location = response.url
         else:
             location = f"https://xkcd.com/{comic_id}/"
         await ctx.send(location)
@@ -540,13 +536,12 @@ class GGSoup:
     def __init__(self):
         self.soup = None
 
-    async def create(self, region, summoner_name, sub_url=""):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"https://{region}.op.gg/summoner/{sub_url}userName={summoner_name}"
-            ) as response:
-                data = await response.text()
-                self.soup = BeautifulSoup(data, "html.parser")
+    async def create(self, session, region, summoner_name, sub_url=""):
+        async with session.get(
+            f"https://{region}.op.gg/summoner/{sub_url}userName={summoner_name}"
+        ) as response:
+            data = await response.text()
+            self.soup = BeautifulSoup(data, "html.parser")
 
     def text(self, obj, classname, source=None):
         if source is None:
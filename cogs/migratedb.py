@@ -275,6 +275,8 @@ class Migrate(commands.Cog):
                 return None
 
             new_row = row[:2] + [user.bot] + row[2:]
+            # total xp from the hourly columns
+            new_row.append(sum(new_row[4:28]))
             return tuple(new_row)
 
         for row in query("SELECT * FROM activity"):
@@ -301,28 +303,46 @@ class Migrate(commands.Cog):
 
         await self.bot.db.executemany(
             """INSERT IGNORE user_activity VALUES
-            (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+            (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
             total_values,
         )
 
         await self.bot.db.executemany(
             """INSERT IGNORE user_activity_day VALUES
-            (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+            (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
             day_values,
         )
 
         await self.bot.db.executemany(
             """INSERT IGNORE user_activity_week VALUES
-            (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+            (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
             week_values,
         )
 
         await self.bot.db.executemany(
             """INSERT IGNORE user_activity_month VALUES
-            (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+            (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
             month_values,
         )
 
+        for table in [
+            "user_activity",
+            "user_activity_day",
+            "user_activity_week",
+            "user_activity_month",
+        ]:
+            await self.bot.db.execute(
+                f"""
+                INSERT INTO user_xp_global (activity_table, user_id, is_bot, xp, message_count)
+                    SELECT %s, user_id, MAX(is_bot), SUM(xp), SUM(message_count)
+                    FROM {table} GROUP BY user_id
+                ON DUPLICATE KEY UPDATE
+                    xp = VALUES(xp),
+                    message_count = VALUES(message_count)
+                """,
+                table,
+            )
+
         await ctx.send(f":ok_hand: skipped {skipped} unknown users")
 
     @commands.command()
@@ -1,7 +1,6 @@
 import discord
 import random
 import arrow
-import aiohttp
 from libraries import minestat
 from discord.ext import commands
 from libraries import emoji_literals
@@ -101,11 +100,10 @@ class Miscellaneous(commands.Cog):
     async def ascii(self, ctx, *, text):
         """Turn text into fancy ascii art."""
         font = "small"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"https://artii.herokuapp.com/make?text={text}&font={font}"
-            ) as response:
-                content = await response.text()
+        async with self.bot.session.get(
+            f"https://artii.herokuapp.com/make?text={text}&font={font}"
+        ) as response:
+            content = await response.text()
 
         await ctx.send(f"```\n{content}\n```")
 
@@ -330,11 +328,10 @@ class Miscellaneous(commands.Cog):
                 "Use `>horoscope list` if you don't know which one you are."
             )
         params = {"sign": sunsign, "day": day}
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "https://aztro.sameerkumar.website/", params=params
-            ) as response:
-                data = await response.json()
+        async with self.bot.session.post(
+            "https://aztro.sameerkumar.website/", params=params
+        ) as response:
+            data = await response.json()
 
         sign = self.hs.get(sunsign)
         content = discord.Embed(
@@ -428,7 +425,7 @@ class Miscellaneous(commands.Cog):
                 continue
 
             if source.startswith("http") or source.startswith("https"):
-                url_color = await util.color_from_image_url(source)
+                url_color = await util.color_from_image_url(self.bot, source)
                 if url_color is not None:
                     colors.append(url_color)
                     continue
@@ -451,9 +448,8 @@ class Miscellaneous(commands.Cog):
 
         colors = [x.strip("#") for x in colors]
         url = "https://api.color.pizza/v1/" + ",".join(colors)
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                colordata = (await response.json()).get("colors")
+        async with self.bot.session.get(url) as response:
+            colordata = (await response.json()).get("colors")
 
         if len(colors) == 1:
             discord_color = await util.get_color(ctx, colors[0])
@@ -513,7 +509,7 @@ class Miscellaneous(commands.Cog):
 
         content = discord.Embed(title=f"`:{emoji_name}:`")
         content.set_image(url=emoji_url)
-        stats = await util.image_info_from_url(emoji_url)
+        stats = await util.image_info_from_url(self.bot, emoji_url)
         content.set_footer(text=f"Type: {stats['filetype']}")
 
         if isinstance(emoji, discord.Emoji):
@@ -1,8 +1,8 @@
 import discord
 import arrow
 import asyncio
-from discord.ext import commands, tasks
-from modules import queries, exceptions, util, log
+from discord.ext import commands
+from modules import queries, exceptions, util, log, timers
 
 
 logger = log.get_logger(__name__)
@@ -14,42 +14,27 @@ class Mod(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.icon = "🔨"
-        self.unmute_list = []
-        self.cache_needs_refreshing = True
-        self.unmute_loop.start()
+        self.unmutes = timers.TimerQueue(bot, self.unmute_members)
+        bot.loop.create_task(self.load_mutes())
 
     def cog_unload(self):
-        self.unmute_loop.cancel()
+        self.unmutes.stop()
 
-    @tasks.loop(seconds=10.0)
-    async def unmute_loop(self):
-        try:
-            await self.check_mutes()
-        except Exception as e:
-            logger.error(f"unmute loop error: {e}")
-
-    @unmute_loop.before_loop
-    async def before_unmute_loop(self):
-        await self.bot.wait_until_ready()
-        logger.info("Starting unmuting loop")
-
-    async def check_mutes(self):
-        """Check all current mutes"""
-        if self.cache_needs_refreshing:
-            self.cache_needs_refreshing = False
-            self.unmute_list = await self.bot.db.execute(
-                "SELECT user_id, guild_id, channel_id, unmute_on FROM muted_user WHERE unmute_on IS NOT NULL"
+    async def load_mutes(self):
+        data = await self.bot.db.execute(
+            "SELECT user_id, guild_id, channel_id, unmute_on FROM muted_user WHERE unmute_on IS NOT NULL"
+        )
+        for user_id, guild_id, channel_id, unmute_on in data:
+            self.unmutes.add(
+                unmute_on.timestamp(), (guild_id, user_id), (user_id, guild_id, channel_id)
             )
 
-        if not self.unmute_list:
-            return
-
-        now_ts = arrow.utcnow().timestamp
-        for (user_id, guild_id, channel_id, unmute_on) in self.unmute_list:
-            unmute_ts = unmute_on.timestamp()
-            if unmute_ts > now_ts:
-                continue
+        logger.info(f"Loaded {len(self.unmutes)} mutes")
+        self.unmutes.start()
 
+    async def unmute_members(self, mutes):
+        """Unmute everyone whose mute duration has passed and delete the mutes."""
+        for (user_id, guild_id, channel_id) in mutes:
             guild = self.bot.get_guild(guild_id)
             if guild is not None:
                 user = guild.get_member(user_id)
@@ -65,7 +50,8 @@ class Mod(commands.Cog):
                 )
                 mute_role = guild.get_role(mute_role_id)
                 if not mute_role:
-                    return logger.warning("Mute role not set in unmuting loop")
+                    logger.warning("Mute role not set in unmuting loop")
+                    continue
                 channel = guild.get_channel(channel_id)
                 if channel is not None:
                     try:
@@ -88,15 +74,13 @@ class Mod(commands.Cog):
                     f"Deleted expired mute of unknown user {user_id} or unknown guild {guild_id}"
                 )
 
-            await self.bot.db.execute(
-                """
-                DELETE FROM muted_user
-                    WHERE user_id = %s AND guild_id = %s
-                """,
-                user_id,
-                guild_id,
-            )
-            self.cache_needs_refreshing = True
+        await self.bot.db.execute(
+            """
+            DELETE FROM muted_user
+                WHERE (user_id, guild_id) IN %s
+            """,
+            [(user_id, guild_id) for user_id, guild_id, _ in mutes],
+        )
 
     @commands.command(aliases=["clean"])
     @commands.guild_only()
@@ -196,7 +180,14 @@ class Mod(commands.Cog):
             ctx.channel.id,
             unmute_on,
         )
-        self.cache_needs_refreshing = True
+        key = (ctx.guild.id, member.id)
+        if unmute_on is None:
+            self.unmutes.discard(key)
+        else:
+            existing = self.unmutes.entries.get(key)
+            # the channel of an existing mute is not changed by muting again
+            channel_id = existing[3][2] if existing is not None else ctx.channel.id
+            self.unmutes.add(unmute_on.timestamp(), key, (member.id, ctx.guild.id, channel_id))
 
     @commands.command()
     @commands.guild_only()
@@ -229,7 +220,7 @@ class Mod(commands.Cog):
             ctx.guild.id,
             member.id,
         )
-        self.cache_needs_refreshing = True
+        self.unmutes.discard((ctx.guild.id, member.id))
 
     @commands.command()
     @commands.has_permissions(ban_members=True)
@@ -377,25 +368,27 @@ class Mod(commands.Cog):
     @blacklist.command(name="channel")
     async def blacklist_channel(self, ctx, *, channel: discord.TextChannel):
         """Blacklist a channel."""
-        await self.bot.db.execute(
-            "INSERT IGNORE blacklisted_channel VALUES (%s, %s)", channel.id, ctx.guild.id
+        await self.bot.cache.add_item(
+            "blacklist",
+            "channel",
+            channel.id,
+            "INSERT IGNORE blacklisted_channel VALUES (%s, %s)",
+            channel.id,
+            ctx.guild.id,
         )
-        self.bot.cache.blacklist["global"]["channel"].add(channel.id)
         await util.send_success(ctx, f"{channel.mention} is now blacklisted from command usage.")
 
     @blacklist.command(name="member")
     async def blacklist_member(self, ctx, *, member: discord.Member):
         """Blacklist member of this server."""
-        await self.bot.db.execute(
-            "INSERT IGNORE blacklisted_member VALUES (%s, %s)", member.id, ctx.guild.id
+        await self.bot.cache.add_item(
+            "blacklist",
+            "member",
+            (ctx.guild.id, member.id),
+            "INSERT IGNORE blacklisted_member VALUES (%s, %s)",
+            member.id,
+            ctx.guild.id,
         )
-        try:
-            self.bot.cache.blacklist[str(ctx.guild.id)]["member"].add(member.id)
-        except KeyError:
-            self.bot.cache.blacklist[str(ctx.guild.id)] = {
-                "member": set([member.id]),
-                "command": set(),
-            }
         await util.send_success(
             ctx, f"**{member}** is now blacklisted from using commands on this server."
         )
@@ -407,16 +400,14 @@ class Mod(commands.Cog):
         if cmd is None:
             raise exceptions.Warning(f"Command `{ctx.prefix}{command}` not found.")
 
-        await self.bot.db.execute(
-            "INSERT IGNORE blacklisted_command VALUES (%s, %s)", cmd.qualified_name, ctx.guild.id
+        await self.bot.cache.add_item(
+            "blacklist",
+            "command",
+            (ctx.guild.id, cmd.qualified_name.lower()),
+            "INSERT IGNORE blacklisted_command VALUES (%s, %s)",
+            cmd.qualified_name,
+            ctx.guild.id,
         )
-        try:
-            self.bot.cache.blacklist[str(ctx.guild.id)]["command"].add(cmd.qualified_name.lower())
-        except KeyError:
-            self.bot.cache.blacklist[str(ctx.guild.id)] = {
-                "member": set(),
-                "command": set([cmd.qualified_name.lower()]),
-            }
         await util.send_success(
             ctx, f"`{ctx.prefix}{cmd}` is now a blacklisted command on this server."
         )
@@ -425,10 +416,14 @@ class Mod(commands.Cog):
     @commands.is_owner()
     async def blacklist_global(self, ctx, user: discord.User, *, reason):
         """Blacklist someone globally from Miso Bot."""
-        await self.bot.db.execute(
-            "INSERT IGNORE blacklisted_user VALUES (%s, %s)", user.id, reason
+        await self.bot.cache.add_item(
+            "blacklist",
+            "user",
+            user.id,
+            "INSERT IGNORE blacklisted_user VALUES (%s, %s)",
+            user.id,
+            reason,
         )
-        self.bot.cache.blacklist["global"]["user"].add(user.id)
         await util.send_success(ctx, f"**{user}** can no longer use Miso Bot!")
 
     @blacklist.command(name="guild")
@@ -439,10 +434,14 @@ class Mod(commands.Cog):
         if guild is None:
             raise exceptions.Warning(f"Cannot find guild with id `{guild_id}`")
 
-        await self.bot.db.execute(
-            "INSERT IGNORE blacklisted_guild VALUES (%s, %s)", guild.id, reason
+        await self.bot.cache.add_item(
+            "blacklist",
+            "guild",
+            guild.id,
+            "INSERT IGNORE blacklisted_guild VALUES (%s, %s)",
+            guild.id,
+            reason,
         )
-        self.bot.cache.blacklist["global"]["guild"].add(guild_id)
         await guild.leave()
         await util.send_success(ctx, f"**{guild}** can no longer use Miso Bot!")
 
@@ -455,23 +454,27 @@ class Mod(commands.Cog):
     @whitelist.command(name="channel")
     async def whitelist_channel(self, ctx, *, channel: discord.TextChannel):
         """Whitelist a channel."""
-        await self.bot.db.execute(
+        await self.bot.cache.discard_item(
+            "blacklist",
+            "channel",
+            channel.id,
             "DELETE FROM blacklisted_channel WHERE guild_id = %s AND channel_id = %s",
             ctx.guild.id,
             channel.id,
         )
-        self.bot.cache.blacklist["global"]["channel"].discard(channel.id)
         await util.send_success(ctx, f"{channel.mention} is no longer blacklisted.")
 
     @whitelist.command(name="user")
     async def whitelist_user(self, ctx, *, member: discord.Member):
         """Whitelist a member of this server."""
-        await self.bot.db.execute(
+        await self.bot.cache.discard_item(
+            "blacklist",
+            "member",
+            (ctx.guild.id, member.id),
             "DELETE FROM blacklisted_member WHERE guild_id = %s AND user_id = %s",
             ctx.guild.id,
             member.id,
         )
-        self.bot.cache.blacklist[str(ctx.guild.id)]["member"].discard(member.id)
         await util.send_success(ctx, f"**{member}** is no longer blacklisted.")
 
     @whitelist.command(name="command")
@@ -481,28 +484,40 @@ class Mod(commands.Cog):
         if cmd is None:
             raise exceptions.Warning(f"Command `{ctx.prefix}{command}` not found.")
 
-        await self.bot.db.execute(
+        await self.bot.cache.discard_item(
+            "blacklist",
+            "command",
+            (ctx.guild.id, cmd.qualified_name.lower()),
             "DELETE FROM blacklisted_command WHERE guild_id = %s AND command_name = %s",
             ctx.guild.id,
             cmd.qualified_name,
         )
-        self.bot.cache.blacklist[str(ctx.guild.id)]["command"].discard(cmd.qualified_name.lower())
         await util.send_success(ctx, f"`{ctx.prefix}{cmd}` is no longer blacklisted.")
 
     @whitelist.command(name="global")
     @commands.is_owner()
     async def whitelist_global(self, ctx, *, user: discord.User):
         """Whitelist someone globally."""
-        await self.bot.db.execute("DELETE FROM blacklisted_user WHERE user_id = %s", user.id)
-        self.bot.cache.blacklist["global"]["user"].discard(user.id)
+        await self.bot.cache.discard_item(
+            "blacklist",
+            "user",
+            user.id,
+            "DELETE FROM blacklisted_user WHERE user_id = %s",
+            user.id,
+        )
         await util.send_success(ctx, f"**{user}** can now use Miso Bot again!")
 
     @whitelist.command(name="guild")
     @commands.is_owner()
     async def whitelist_guild(self, ctx, guild_id: int):
         """Whitelist a guild."""
-        await self.bot.db.execute("DELETE FROM blacklisted_guild WHERE guild_id = %s", guild_id)
-        self.bot.cache.blacklist["global"]["guild"].discard(guild_id)
+        await self.bot.cache.discard_item(
+            "blacklist",
+            "guild",
+            guild_id,
+            "DELETE FROM blacklisted_guild WHERE guild_id = %s",
+            guild_id,
+        )
         await util.send_success(ctx, f"Guild with id `{guild_id}` can use Miso Bot again!")
 
 
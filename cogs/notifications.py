@@ -1,7 +1,6 @@
 import discord
-import re
 from discord.ext import commands
-from modules import exceptions, util, emojis
+from modules import exceptions, util, emojis, keywords, delivery
 
 
 class Notifications(commands.Cog):
@@ -10,37 +9,42 @@ class Notifications(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.icon = "📨"
-        self.notifications_cache = {}
-        self.global_notifications_cache = {}
+        # guild_id : KeywordMatcher, global notifications are under guild_id 0
+        self.keyword_matchers = {}
+        self.delivery = delivery.NotificationQueue(bot, self.send_notification)
         bot.loop.create_task(self.create_cache())
 
+    def cog_unload(self):
+        self.bot.loop.create_task(self.delivery.close())
+
     async def create_cache(self):
-        self.notifications_cache = {}
-        self.global_notifications_cache = {}
-        keywords = await self.bot.db.execute(
+        matchers = {}
+        data = await self.bot.db.execute(
             "SELECT guild_id, user_id, keyword FROM notification",
         )
-        for guild_id, user_id, keyword in keywords:
-            if guild_id == 0:
-                try:
-                    self.global_notifications_cache[keyword].append(user_id)
-                except KeyError:
-                    self.global_notifications_cache[keyword] = [user_id]
-            else:
-                if self.notifications_cache.get(str(guild_id)) is None:
-                    self.notifications_cache[str(guild_id)] = {}
-                try:
-                    self.notifications_cache[str(guild_id)][keyword].append(user_id)
-                except KeyError:
-                    self.notifications_cache[str(guild_id)][keyword] = [user_id]
-
-    async def send_notification(self, user, message, pattern=None):
+        for guild_id, user_id, keyword in data:
+            matcher = matchers.get(guild_id)
+            if matcher is None:
+                matcher = keywords.KeywordMatcher()
+                matchers[guild_id] = matcher
+            matcher.add(keyword, user_id)
+
+        self.keyword_matchers = matchers
+
+    def matcher_for(self, guild_id):
+        matcher = self.keyword_matchers.get(guild_id)
+        if matcher is None:
+            matcher = keywords.KeywordMatcher()
+            self.keyword_matchers[guild_id] = matcher
+        return matcher
+
+    async def send_notification(self, user, message, highlights=None):
         content = discord.Embed(color=message.author.color)
         content.set_author(name=f"{message.author}", icon_url=message.author.avatar_url)
-        if pattern is None:
+        if highlights is None:
             highlighted_text = message.content
         else:
-            highlighted_text = re.sub(pattern, lambda x: f"**{x.group(0)}**", message.content)
+            highlighted_text = highlight(message.content, highlights)
 
         content.description = highlighted_text
         content.add_field(
@@ -72,43 +76,27 @@ class Notifications(commands.Cog):
         if message.author.bot:
             return
 
-        # select all keywords applicable to this server, and also global keywords (guild_id=0)
-        # keywords = [(0, k, v) for k, v in self.global_notifications_cache.items()]
-        keywords = []
-        for kw in self.global_notifications_cache:
-            for v in self.global_notifications_cache[kw]:
-                keywords.append((0, kw, v))
-        guild_keywords = self.notifications_cache.get(str(message.guild.id))
-        if guild_keywords is not None:
-            for kw in guild_keywords.keys():
-                for v in guild_keywords[kw]:
-                    keywords.append((message.guild.id, kw, v))
-
-        if not keywords:
-            return
-
-        for guild_id, keyword, user_id in keywords:
-            if user_id == message.author.id:
-                return
-            member = message.guild.get_member(user_id)
-            if member is None or member not in message.channel.members:
+        highlights = {}
+        # global keywords (guild_id=0) and keywords of this server
+        for guild_id in [0, message.guild.id]:
+            matcher = self.keyword_matchers.get(guild_id)
+            if matcher is None:
                 continue
 
-            pattern = re.compile(
-                r"(?:^|\s|[~*`_\/]){0}(?:$|\W)".format(re.escape(keyword)), flags=re.IGNORECASE
-            )
-            if pattern.findall(message.content):
-                await self.send_notification(member, message, pattern)
-                await self.bot.db.execute(
-                    """
-                    UPDATE notification
-                        SET times_triggered = times_triggered + 1
-                    WHERE guild_id = %s AND user_id = %s AND keyword = %s
-                    """,
-                    guild_id,
-                    user_id,
-                    keyword,
-                )
+            for key, spans in matcher.match(message.content).items():
+                for keyword, user_id in matcher.subscribers.get(key, ()):
+                    if user_id == message.author.id:
+                        continue
+                    member = message.guild.get_member(user_id)
+                    if member is None or not message.channel.permissions_for(member).read_messages:
+                        continue
+
+                    # one notification per user no matter how many of their keywords matched
+                    highlights.setdefault(member, []).extend(spans)
+                    self.delivery.count(guild_id, user_id, keyword)
+
+        for member, spans in highlights.items():
+            self.delivery.add(member, message, spans)
 
     @commands.group(case_insensitive=True, aliases=["noti", "notif"])
     async def notification(self, ctx):
@@ -157,18 +145,7 @@ class Notifications(commands.Cog):
             ctx.author.id,
             keyword,
         )
-        if guild_id == 0:
-            try:
-                self.global_notifications_cache[keyword].append(ctx.author.id)
-            except KeyError:
-                self.global_notifications_cache[keyword] = [ctx.author.id]
-        else:
-            if self.notifications_cache.get(str(guild_id)) is None:
-                self.notifications_cache[str(guild_id)] = {}
-            try:
-                self.notifications_cache[str(guild_id)][keyword].append(ctx.author.id)
-            except KeyError:
-                self.notifications_cache[str(guild_id)][keyword] = [ctx.author.id]
+        self.matcher_for(guild_id).add(keyword, ctx.author.id)
 
         if not dm:
             await util.send_success(
@@ -216,7 +193,7 @@ class Notifications(commands.Cog):
             ctx.author.id,
             keyword,
         )
-        await self.create_cache()
+        self.matcher_for(guild_id).remove(keyword, ctx.author.id)
 
         if not dm:
             await util.send_success(
@@ -267,5 +244,21 @@ class Notifications(commands.Cog):
             raise exceptions.Warning("I was unable to send you a DM. Please change your settings.")
 
 
+def highlight(text, spans):
+    """Bold the given (start, end) spans of text."""
+    result = []
+    position = 0
+    for start, end in sorted(spans):
+        start = max(start, position)
+        if start >= end:
+            continue
+        result.append(text[position:start])
+        result.append(f"**{text[start:end]}**")
+        position = end
+
+    result.append(text[position:])
+    return "".join(result)
+
+
 def setup(bot):
     bot.add_cog(Notifications(bot))
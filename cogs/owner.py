@@ -2,7 +2,7 @@ import discord
 import arrow
 import asyncio
 from discord.ext import commands
-from modules import log, util
+from modules import log, util, exceptions, ratelimit
 
 
 logger = log.get_logger(__name__)
@@ -183,10 +183,151 @@ class Owner(commands.Cog):
             functions = {"⬅": previous_page, "➡": next_page}
             asyncio.ensure_future(util.reaction_buttons(ctx, msg, functions))
 
+    @commands.group(case_insensitive=True)
+    async def perf(self, ctx):
+        """Internal performance statistics."""
+        await util.command_group_help(ctx)
+
+    @perf.command(name="http")
+    async def perf_http(self, ctx):
+        """Per host latency and connection pool usage of the HTTP client."""
+        client = self.bot.session
+        rows = []
+        for host, stats in sorted(client.stats.items(), key=lambda x: x[1].requests, reverse=True):
+            limit = stats.limit if stats.limit is not None else client.pool_size_per_host
+            rows.append(
+                f"`{host}` **{stats.requests}** req, {stats.errors} err | "
+                f"p50 `{stats.latency(50):.0f}ms` p95 `{stats.latency(95):.0f}ms` | "
+                f"{stats.in_flight}/{limit} active (peak {stats.peak_in_flight}) | "
+                f"{stats.reuse_ratio()*100:.0f}% reused"
+            )
+
+        if not rows:
+            return await ctx.send("No HTTP requests made yet.")
+
+        content = discord.Embed(title="HTTP client")
+        content.set_footer(
+            text=f"Pool size {client.pool_size} | DNS cache TTL {client.dns_cache_ttl}s"
+        )
+        await util.send_as_pages(ctx, content, rows)
+
+    @perf.command(name="lastfm", aliases=["fm"])
+    async def perf_lastfm(self, ctx):
+        """Last.fm api response cache and request scheduler statistics."""
+        lastfm = self.bot.get_cog("LastFm")
+        if lastfm is None:
+            raise exceptions.Warning("LastFm cog is not loaded.")
+
+        cache = lastfm.api_cache
+        content = discord.Embed(title="Last.fm api cache")
+        content.add_field(name="Hits", value=cache.hits)
+        content.add_field(name="Misses", value=cache.misses)
+        content.add_field(name="Hit ratio", value=f"{cache.hit_ratio()*100:.1f}%")
+        content.add_field(name="Coalesced", value=cache.coalesced)
+        content.add_field(name="In flight", value=len(cache.pending))
+        content.add_field(name="Size", value=f"{len(cache)}/{cache.maxsize}")
+
+        scheduler = lastfm.api_scheduler
+        for name, priority in [("Interactive", ratelimit.INTERACTIVE), ("Bulk", ratelimit.BULK)]:
+            content.add_field(
+                name=f"{name} queue",
+                value=f"{scheduler.queued(priority)} waiting\n"
+                f"p50 `{scheduler.wait_time(priority, 50):.0f}ms` "
+                f"p95 `{scheduler.wait_time(priority, 95):.0f}ms`",
+            )
+        content.add_field(
+            name="Scheduler",
+            value=f"{scheduler.active}/{scheduler.concurrency} active\n"
+            f"{scheduler.completed} completed",
+        )
+        images = lastfm.artist_images
+        content.add_field(
+            name="Artist images",
+            value=f"{images.memory.hits} hits, {images.memory.misses} misses\n"
+            f"{images.memory.coalesced} coalesced\n"
+            f"{images.scraped} scraped, {images.refreshed} refreshed, {images.failed} failed\n"
+            f"Size {len(images.memory)}/{images.memory.maxsize}",
+            inline=False,
+        )
+        await ctx.send(embed=content)
+
+    @perf.command(name="colors", aliases=["colours"])
+    async def perf_colors(self, ctx):
+        """Image colour cache statistics."""
+        colors = self.bot.image_colors
+        content = discord.Embed(title="Image colour cache")
+        content.add_field(name="Hits", value=colors.memory.hits)
+        content.add_field(name="Misses", value=colors.memory.misses)
+        content.add_field(name="Hit ratio", value=f"{colors.memory.hit_ratio()*100:.1f}%")
+        content.add_field(name="Extracted", value=colors.extracted)
+        content.add_field(name="Failed", value=colors.failed)
+        content.add_field(name="Size", value=f"{len(colors.memory)}/{colors.memory.maxsize}")
+        await ctx.send(embed=content)
+
+    @perf.command(name="images")
+    async def perf_images(self, ctx):
+        """On-disk image store statistics."""
+        store = self.bot.image_store
+        content = discord.Embed(title="Image store")
+        content.add_field(name="Hits", value=store.hits)
+        content.add_field(name="Misses", value=store.misses)
+        content.add_field(name="Evictions", value=store.evictions)
+        content.add_field(name="Files", value=len(store.index))
+        content.add_field(
+            name="Size",
+            value=f"{store.size/1024/1024:.1f}/{store.max_bytes/1024/1024:.0f}MB",
+        )
+        content.add_field(name="Downloading", value=len(store.pending))
+        await ctx.send(embed=content)
+
+    @perf.command(name="renderer", aliases=["render"])
+    async def perf_renderer(self, ctx):
+        """HTML renderer queue, cache and per server render times."""
+        renderer = self.bot.renderer
+        content = discord.Embed(title="HTML renderer")
+        content.add_field(
+            name="Queue",
+            value=f"{renderer.queue.qsize()}/{renderer.queue.maxsize} waiting "
+            f"(peak {renderer.peak_queue})\n"
+            f"p50 `{renderer.queue_time(50):.0f}ms` p95 `{renderer.queue_time(95):.0f}ms`\n"
+            f"{renderer.rejected} rejected",
+        )
+        content.add_field(
+            name="Cache",
+            value=f"{renderer.cache.hits} hits, {renderer.cache.misses} misses\n"
+            f"{renderer.cache.coalesced} coalesced\n"
+            f"Size {len(renderer.cache)}/{renderer.cache.maxsize}",
+        )
+        for backend in renderer.backends:
+            content.add_field(
+                name=backend.url,
+                value=f"{'Healthy' if backend.healthy else 'Down'}\n"
+                f"{backend.renders} renders, {backend.errors} err\n"
+                f"{backend.in_flight}/{renderer.concurrency} active\n"
+                f"p50 `{backend.render_time(50):.0f}ms` p95 `{backend.render_time(95):.0f}ms`",
+                inline=False,
+            )
+        await ctx.send(embed=content)
+
+    @perf.command(name="settings")
+    async def perf_settings(self, ctx):
+        """Guild settings cache statistics."""
+        cache = self.bot.cache.guild_settings
+        content = discord.Embed(title="Guild settings cache")
+        content.add_field(name="Hits", value=cache.hits)
+        content.add_field(name="Misses", value=cache.misses)
+        content.add_field(name="Hit ratio", value=f"{cache.hit_ratio()*100:.1f}%")
+        content.add_field(name="Coalesced", value=cache.coalesced)
+        content.add_field(name="Size", value=f"{len(cache)}/{cache.maxsize}")
+        await ctx.send(embed=content)
+
     @commands.command(aliases=["fmban"])
     async def fmflag(self, ctx, lastfm_username, *, reason):
         """Flag LastFM account as a cheater."""
-        await self.bot.db.execute(
+        await self.bot.cache.set_value(
+            "lastfm_cheaters",
+            lastfm_username.lower(),
+            reason,
             "INSERT INTO lastfm_cheater VALUES(%s, %s, %s)",
             lastfm_username.lower(),
             arrow.utcnow().datetime,
@@ -197,8 +338,11 @@ class Owner(commands.Cog):
     @commands.command()
     async def fmunflag(self, ctx, lastfm_username):
         """Remove cheater flag from an LastFM account."""
-        await self.bot.db.execute(
-            "DELETE FROM lastfm_cheater WHERE lastfm_username = %s", lastfm_username.lower()
+        await self.bot.cache.delete_value(
+            "lastfm_cheaters",
+            lastfm_username.lower(),
+            "DELETE FROM lastfm_cheater WHERE lastfm_username = %s",
+            lastfm_username.lower(),
         )
         await util.send_success(ctx, f"`{lastfm_username}` is no longer flagged as a cheater.")
 
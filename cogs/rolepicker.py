@@ -1,7 +1,7 @@
 import discord
 import asyncio
 from discord.ext import commands
-from modules import util, exceptions, queries
+from modules import util, exceptions
 
 
 class Rolepicker(commands.Cog):
@@ -21,7 +21,12 @@ class Rolepicker(commands.Cog):
     @rolepicker.command()
     async def add(self, ctx, role: discord.Role, *, name):
         """Add a role to the rolepicker."""
-        await self.bot.db.execute(
+
+        def update(data):
+            data.setdefault(ctx.guild.id, {})[name.lower()] = role.id
+
+        await self.bot.cache.write(
+            "rolepicker_roles",
             """
             INSERT INTO rolepicker_role (guild_id, role_name, role_id)
                 VALUES (%s, %s, %s)
@@ -31,6 +36,8 @@ class Rolepicker(commands.Cog):
             ctx.guild.id,
             name.lower(),
             role.id,
+            key=ctx.guild.id,
+            update=update,
         )
         await util.send_success(
             ctx,
@@ -40,23 +47,22 @@ class Rolepicker(commands.Cog):
     @rolepicker.command()
     async def remove(self, ctx, *, name):
         """Remove a role from the picker."""
-        role_id = await self.bot.db.execute(
-            """
-            SELECT role_id FROM rolepicker_role WHERE guild_id = %s AND role_name = %s
-            """,
-            ctx.guild.id,
-            name.lower(),
-            one_value=True,
-        )
+        role_id = self.bot.cache.rolepicker_roles.get(ctx.guild.id, {}).get(name.lower())
         if not role_id:
             raise exceptions.Warning(f"Could not find role with the name `{name}` in the picker.")
 
-        await self.bot.db.execute(
+        def update(data):
+            data.get(ctx.guild.id, {}).pop(name.lower(), None)
+
+        await self.bot.cache.write(
+            "rolepicker_roles",
             """
             DELETE FROM rolepicker_role WHERE guild_id = %s AND role_name = %s
             """,
             ctx.guild.id,
             name.lower(),
+            key=ctx.guild.id,
+            update=update,
         )
         await util.send_success(
             ctx,
@@ -66,8 +72,18 @@ class Rolepicker(commands.Cog):
     @rolepicker.command()
     async def channel(self, ctx, channel: discord.TextChannel):
         """Set the channel you can add roles in."""
-        await queries.update_setting(ctx, "rolepicker_settings", "channel_id", channel.id)
-        self.bot.cache.rolepickers.add(channel.id)
+        # reloads the rolepicker channels, so the previous channel of this server is dropped
+        await self.bot.cache.write(
+            "rolepickers",
+            """
+            INSERT INTO rolepicker_settings (guild_id, channel_id)
+                VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE
+                channel_id = VALUES(channel_id)
+            """,
+            ctx.guild.id,
+            channel.id,
+        )
         await util.send_success(
             ctx,
             f"Rolepicker channel set to {channel.mention}\n"
@@ -77,13 +93,7 @@ class Rolepicker(commands.Cog):
     @rolepicker.command()
     async def list(self, ctx):
         """List all the roles currently available for picking."""
-        data = await self.bot.db.execute(
-            """
-            SELECT role_name, role_id FROM rolepicker_role
-            WHERE guild_id = %s
-            """,
-            ctx.guild.id,
-        )
+        data = self.bot.cache.rolepicker_roles.get(ctx.guild.id, {}).items()
         content = discord.Embed(
             title=f":scroll: Available roles in {ctx.guild.name}", color=int("ffd983", 16)
         )
@@ -100,7 +110,17 @@ class Rolepicker(commands.Cog):
     @rolepicker.command()
     async def enabled(self, ctx, value: bool):
         """Enable the rolepicker. (if disabled)"""
-        await queries.update_setting(ctx, "rolepicker_settings", "is_enabled", value)
+        await self.bot.cache.write(
+            "rolepickers",
+            """
+            INSERT INTO rolepicker_settings (guild_id, is_enabled)
+                VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE
+                is_enabled = VALUES(is_enabled)
+            """,
+            ctx.guild.id,
+            value,
+        )
         await util.send_success(ctx, f"Rolepicker is now **{'enabled' if value else 'disabled'}**")
 
     @commands.Cog.listener()
@@ -108,22 +128,12 @@ class Rolepicker(commands.Cog):
         """Rolechannel message handler."""
         if not self.bot.is_ready():
             return
-            
+
         if message.guild is None:
             return
 
-        if message.channel.id not in self.bot.cache.rolepickers:
-            return
-
-        is_enabled = await self.bot.db.execute(
-            """
-            SELECT is_enabled FROM rolepicker_settings WHERE guild_id = %s AND channel_id = %s
-            """,
-            message.guild.id,
-            message.channel.id,
-            one_value=True,
-        )
-        if not is_enabled:
+        # channel is not a rolepicker, or the rolepicker is disabled
+        if not self.bot.cache.rolepickers.get(message.channel.id):
             return
 
         # delete all bot messages in rolepicker channel
@@ -139,18 +149,14 @@ class Rolepicker(commands.Cog):
         rolename = message.content[1:].strip()
         errorhandler = self.bot.get_cog("ErrorHander")
         if command in ["+", "-"]:
-            role_id = await self.bot.db.execute(
-                """
-                SELECT role_id FROM rolepicker_role WHERE guild_id = %s AND role_name = %s
-                """,
-                message.guild.id,
-                rolename.lower(),
-                one_value=True,
-            )
+            role_id, closest = self.bot.cache.find_rolepicker_role(message.guild.id, rolename)
             role = message.guild.get_role(role_id)
             if role is None:
                 await errorhandler.send(
-                    message.channel, "warning", f'Role `"{rolename}"` not found!'
+                    message.channel,
+                    "warning",
+                    f'Role `"{rolename}"` not found!'
+                    + (f" Did you mean `{command}{closest}`?" if closest is not None else ""),
                 )
 
             elif command == "+":
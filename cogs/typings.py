@@ -306,6 +306,7 @@ class Typings(commands.Cog):
 
         async def confirm():
             await self.bot.db.execute("DELETE FROM typing_stats WHERE user_id = %s", ctx.author.id)
+            self.bot.leaderboards.clear_wpm(ctx.author.id)
             await self.bot.db.execute("DELETE FROM typing_race WHERE user_id = %s", ctx.author.id)
             content.title = ":white_check_mark: Cleared your data"
             content.description = ""
@@ -365,6 +366,7 @@ class Typings(commands.Cog):
         if wpm == 0:
             return
 
+        test_date = arrow.utcnow().datetime
         await self.bot.db.execute(
             """
             INSERT INTO typing_stats (
@@ -375,13 +377,14 @@ class Typings(commands.Cog):
             """,
             user.id,
             guild.id if guild is not None else None,
-            arrow.utcnow().datetime,
+            test_date,
             int(wpm),
             accuracy,
             wordcount,
             language,
             was_race,
         )
+        self.bot.leaderboards.add_wpm(user.id, int(wpm), test_date, wordcount)
 
 
 def setup(bot):
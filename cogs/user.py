@@ -20,53 +20,12 @@ class User(commands.Cog):
 
     async def get_rank(self, user, table="user_activity", guild=None):
         """Get user's xp ranking from given table."""
-        if guild is None:
-            total, pos = (
-                await self.bot.db.execute(
-                    f"""
-                    SELECT (SELECT COUNT(DISTINCT(user_id)) FROM {table} WHERE not is_bot),
-                    ranking FROM (
-                        SELECT RANK() OVER(ORDER BY xp DESC) AS ranking, user_id,
-                            SUM(h0+h1+h2+h3+h4+h5+h6+h7+h8+h9+h10+h11+h12+h13+h14+h15+h16+h17+h18+h19+h20+h21+h22+h23) as xp
-                        FROM {table}
-                        WHERE not is_bot
-                        GROUP BY user_id
-                    ) as sub
-                    WHERE user_id = %s
-                    """,
-                    user.id,
-                    one_row=True,
-                )
-                or (None, None)
-            )
-
-        else:
-            total, pos = (
-                await self.bot.db.execute(
-                    f"""
-                    SELECT (SELECT COUNT(user_id) FROM {table} WHERE not is_bot AND guild_id = %s),
-                    ranking FROM (
-                        SELECT RANK() OVER(ORDER BY xp DESC) AS ranking, user_id,
-                            SUM(h0+h1+h2+h3+h4+h5+h6+h7+h8+h9+h10+h11+h12+h13+h14+h15+h16+h17+h18+h19+h20+h21+h22+h23) as xp
-                        FROM {table}
-                        WHERE not is_bot
-                        AND guild_id = %s
-                        GROUP BY user_id
-                    ) as sub
-                    WHERE user_id = %s
-                    """,
-                    guild.id,
-                    guild.id,
-                    user.id,
-                    one_row=True,
-                )
-                or (None, None)
-            )
-
-        if pos is None or total is None:
+        ranking = await self.bot.leaderboards.rank(table, 0 if guild is None else guild.id, user.id)
+        if ranking is None:
             return "N/A"
         else:
-            return f"#{int(pos)} / {total}"
+            pos, total = ranking
+            return f"#{pos} / {total}"
 
     @commands.command(aliases=["dp", "av", "pfp"])
     async def avatar(self, ctx, *, user: discord.User = None):
@@ -77,8 +36,10 @@ class User(commands.Cog):
         content = discord.Embed()
         content.set_author(name=str(user), url=user.avatar_url)
         content.set_image(url=user.avatar_url_as(static_format="png"))
-        stats = await util.image_info_from_url(user.avatar_url)
-        color = await util.color_from_image_url(str(user.avatar_url_as(size=64, format="png")))
+        stats = await util.image_info_from_url(self.bot, user.avatar_url)
+        color = await util.color_from_image_url(
+            self.bot, str(user.avatar_url_as(size=64, format="png"))
+        )
         content.colour = await util.get_color(ctx, color)
         if stats is not None:
             content.set_footer(
@@ -114,7 +75,10 @@ class User(commands.Cog):
             activity_display = "Unavailable"
             status_display = "Unavailable"
             content.colour = int(
-                await util.color_from_image_url(str(user.avatar_url_as(size=64, format="png"))), 16
+                await util.color_from_image_url(
+                    self.bot, str(user.avatar_url_as(size=64, format="png"))
+                ),
+                16,
             )
 
         fishdata = await self.bot.db.execute(
@@ -203,7 +167,7 @@ class User(commands.Cog):
         image_small = str(guild.icon_url_as(format="png", size=64))
         content = discord.Embed(
             title=f"**{guild.name}** | #{guild.id}",
-            color=int(await util.color_from_image_url(image_small), 16),
+            color=int(await util.color_from_image_url(self.bot, image_small), 16),
         )
         content.set_thumbnail(url=guild.icon_url)
         content.add_field(name="Owner", value=str(guild.owner))
@@ -355,10 +319,8 @@ class User(commands.Cog):
         """See your top servers by XP."""
         data = await self.bot.db.execute(
             """
-            SELECT guild_id, SUM(h0+h1+h2+h3+h4+h5+h6+h7+h8+h9+h10+h11+h12+h13+h14+h15+h16+h17+h18+h19+h20+h21+h22+h23)
-                as xp FROM user_activity
+            SELECT guild_id, xp FROM user_activity
                 WHERE user_id = %s
-            GROUP BY guild_id
             ORDER BY xp DESC
             """,
             ctx.author.id,
@@ -394,14 +356,12 @@ class User(commands.Cog):
     async def leaderboard_fishy(self, ctx, scope=""):
         """Fishy leaderboard."""
         global_data = scope.lower() == "global"
-        data = await self.bot.db.execute(
-            "SELECT user_id, fishy_count FROM fishy ORDER BY fishy_count DESC"
-        )
+        data = await self.bot.leaderboards.get("fishy")
 
         rows = []
         medal_emoji = [":first_place:", ":second_place:", ":third_place:"]
         i = 1
-        for user_id, fishy_count in data:
+        for user_id, fishy_count, _ in data:
             if global_data:
                 user = self.bot.get_user(user_id)
             else:
@@ -435,25 +395,7 @@ class User(commands.Cog):
             timeframe = scope
 
         time, table = get_activity_table(timeframe)
-        if _global_:
-            data = await self.bot.db.execute(
-                f"""
-                SELECT user_id, SUM(h0+h1+h2+h3+h4+h5+h6+h7+h8+h9+h10+h11+h12+h13+h14+h15+h16+h17+h18+h19+h20+h21+h22+h23) as xp,
-                    SUM(message_count) FROM {table}
-                WHERE NOT is_bot
-                GROUP BY user_id ORDER BY xp DESC
-                """
-            )
-        else:
-            data = await self.bot.db.execute(
-                f"""
-                SELECT user_id, SUM(h0+h1+h2+h3+h4+h5+h6+h7+h8+h9+h10+h11+h12+h13+h14+h15+h16+h17+h18+h19+h20+h21+h22+h23) as xp,
-                    message_count FROM {table}
-                WHERE guild_id = %s AND NOT is_bot
-                GROUP BY user_id ORDER BY xp DESC
-                """,
-                ctx.guild.id,
-            )
+        data = await self.bot.leaderboards.get(table, 0 if _global_ else ctx.guild.id)
 
         rows = []
         for i, (user_id, xp, message_count) in enumerate(data, start=1):
@@ -491,16 +433,11 @@ class User(commands.Cog):
         """Best typing speed high scores leaderboard."""
         _global_ = scope == "global"
 
-        data = await self.bot.db.execute(
-            """
-            SELECT user_id, MAX(wpm) as wpm, test_date, word_count FROM typing_stats
-            GROUP BY user_id ORDER BY wpm DESC
-            """
-        )
+        data = await self.bot.leaderboards.get("wpm")
 
         rows = []
         i = 1
-        for userid, wpm, test_date, word_count in data:
+        for userid, wpm, (test_date, word_count) in data:
             if _global_:
                 user = self.bot.get_user(userid)
             else:
@@ -530,15 +467,9 @@ class User(commands.Cog):
     @leaderboard.command(name="crowns")
     async def leaderboard_crowns(self, ctx):
         """Last.fm artist crowns leaderboard."""
-        data = await self.bot.db.execute(
-            """
-            SELECT user_id, COUNT(1) as amount FROM artist_crown
-            WHERE guild_id = %s GROUP BY user_id ORDER BY amount DESC
-            """,
-            ctx.guild.id,
-        )
+        data = await self.bot.leaderboards.get("crowns", ctx.guild.id)
         rows = []
-        for i, (user_id, amount) in enumerate(data, start=1):
+        for i, (user_id, amount, _) in enumerate(data, start=1):
             user = ctx.guild.get_member(user_id)
             if user is None:
                 continue
@@ -610,17 +541,18 @@ class User(commands.Cog):
             if user_settings[2] is not None:
                 badges.append(make_badge(badge_classes["location"]))
 
-        server_activity = await self.bot.db.execute(
-            """
-            SELECT h0,h1,h2,h3,h4,h5,h6,h7,h8,h9,h10,h11,h12,h13,h14,h15,h16,h17,h18,h19,h20,h21,h22,h23 as xp
-                FROM user_activity
-            WHERE user_id = %s AND guild_id = %s
-            """,
-            user.id,
-            ctx.guild.id,
-            one_row=True,
+        server_xp = (
+            await self.bot.db.execute(
+                """
+                SELECT xp FROM user_activity
+                WHERE user_id = %s AND guild_id = %s
+                """,
+                user.id,
+                ctx.guild.id,
+                one_value=True,
+            )
+            or 0
         )
-        server_xp = sum(server_activity) if server_activity else 0
 
         global_activity = await self.bot.db.execute(
             """
@@ -715,7 +647,7 @@ class User(commands.Cog):
             "height": 400,
             "imageFormat": "png",
         }
-        buffer = await util.render_html(payload)
+        buffer = await util.render_html(self.bot, payload)
         await ctx.send(file=discord.File(fp=buffer, filename=f"profile_{user.name}.png"))
 
     @commands.group()
@@ -7,8 +7,8 @@ import arrow
 import asyncio
 from time import time
 from bs4 import BeautifulSoup
-from discord.ext import commands, tasks
-from modules import queries, log, emojis, util, exceptions
+from discord.ext import commands
+from modules import log, emojis, util, exceptions, timers
 
 GOOGLE_API_KEY = os.environ.get("GOOGLE_KEY")
 DARKSKY_API_KEY = os.environ.get("DARK_SKY_KEY")
@@ -84,94 +84,96 @@ class Utility(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.icon = "🔧"
-        self.reminder_list = []
-        self.cache_needs_refreshing = True
-        self.reminder_loop.start()
+        self.reminders = timers.TimerQueue(bot, self.send_reminders)
+        bot.loop.create_task(self.load_reminders())
 
     def cog_unload(self):
-        self.reminder_loop.cancel()
+        self.reminders.stop()
 
-    @tasks.loop(seconds=5.0)
-    async def reminder_loop(self):
+    async def load_reminders(self):
+        data = await self.bot.db.execute(
+            """
+            SELECT user_id, guild_id, created_on, reminder_date, content, original_message_url
+            FROM reminder
+            """
+        )
+        for reminder in data:
+            self.schedule_reminder(*reminder)
+
+        logger.info(f"Loaded {len(self.reminders)} reminders")
+        self.reminders.start()
+
+    def schedule_reminder(
+        self, user_id, guild_id, created_on, reminder_date, content, original_message_url
+    ):
+        self.reminders.add(
+            reminder_date.timestamp(),
+            (user_id, guild_id, original_message_url),
+            (user_id, guild_id, created_on, reminder_date, content, original_message_url),
+        )
+
+    async def send_reminders(self, reminders):
+        """
+        Send all given due reminders and delete them.
+        If something unexpected fails midway, only the reminders handled so far are deleted,
+        and the ones not tried yet are queued again.
+        """
+        now_ts = time()
+        handled = []
         try:
-            await self.check_reminders()
-        except Exception as e:
-            logger.error(f"Reminder loop error: {e}")
-
-    @reminder_loop.before_loop
-    async def before_reminder_loop(self):
-        await self.bot.wait_until_ready()
-        logger.info("Starting reminder loop")
-
-    async def check_reminders(self):
-        """Check all current reminders"""
-        if self.cache_needs_refreshing:
-            self.cache_needs_refreshing = False
-            self.reminder_list = await self.bot.db.execute(
-                """
-                SELECT user_id, guild_id, created_on, reminder_date, content, original_message_url
-                FROM reminder
-                """
-            )
+            for reminder in reminders:
+                await self.send_reminder(reminder, now_ts)
+                handled.append(reminder)
+        finally:
+            for reminder in reminders[len(handled) + 1 :]:
+                self.schedule_reminder(*reminder)
+            if handled:
+                await self.bot.db.execute(
+                    """
+                    DELETE FROM reminder
+                        WHERE (user_id, guild_id, original_message_url) IN %s
+                    """,
+                    [(r[0], r[1], r[5]) for r in handled],
+                )
 
-        if not self.reminder_list:
+    async def send_reminder(self, reminder, now_ts):
+        user_id, guild_id, created_on, reminder_date, content, original_message_url = reminder
+        reminder_ts = reminder_date.timestamp()
+        user = self.bot.get_user(user_id)
+        if user is None:
+            logger.info(f"Deleted expired reminder by unknown user {user_id}")
             return
 
-        now_ts = arrow.utcnow().timestamp
-        for (
-            user_id,
-            guild_id,
-            created_on,
-            reminder_date,
-            content,
-            original_message_url,
-        ) in self.reminder_list:
-            reminder_ts = reminder_date.timestamp()
-            if reminder_ts > now_ts:
-                continue
-
-            user = self.bot.get_user(user_id)
-            if user is not None:
-                guild = self.bot.get_guild(guild_id)
-                if guild is None:
-                    guild = "Unknown guild"
-
-                date = arrow.get(created_on)
-                if now_ts - reminder_ts > 21600:
-                    logger.info(
-                        f"Deleting reminder set for {date.format('DD/MM/YYYY HH:mm:ss')} for being over 6 hours late"
-                    )
-                else:
-                    embed = discord.Embed(
-                        color=int("d3a940", 16),
-                        title=":alarm_clock: Reminder!",
-                        description=content,
-                    )
-                    embed.add_field(
-                        name="context",
-                        value=f"[Jump to message]({original_message_url})",
-                        inline=True,
-                    )
-                    embed.set_footer(text=f"{guild}")
-                    embed.timestamp = created_on
-                    try:
-                        await user.send(embed=embed)
-                        logger.info(f'Reminded {user} to "{content}"')
-                    except discord.errors.Forbidden:
-                        logger.warning(f"Unable to remind {user}, missing DM permissions!")
-            else:
-                logger.info(f"Deleted expired reminder by unknown user {user_id}")
-
-            await self.bot.db.execute(
-                """
-                DELETE FROM reminder
-                    WHERE user_id = %s AND guild_id = %s AND original_message_url = %s
-                """,
-                user_id,
-                guild_id,
-                original_message_url,
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            guild = "Unknown guild"
+
+        date = arrow.get(created_on)
+        if now_ts - reminder_ts > 21600:
+            logger.info(
+                f"Deleting reminder set for {date.format('DD/MM/YYYY HH:mm:ss')} for being over 6 hours late"
             )
-            self.cache_needs_refreshing = True
+            return
+
+        embed = discord.Embed(
+            color=int("d3a940", 16),
+            title=":alarm_clock: Reminder!",
+            description=content,
+        )
+        embed.add_field(
+            name="context",
+            value=f"[Jump to message]({original_message_url})",
+            inline=True,
+        )
+        embed.set_footer(text=f"{guild}")
+        embed.timestamp = created_on
+        try:
+            await user.send(embed=embed)
+            logger.info(f'Reminded {user} to "{content}"')
+        except discord.errors.Forbidden:
+            logger.warning(f"Unable to remind {user}, missing DM permissions!")
+        except discord.errors.HTTPException as e:
+            logger.error(f"Unable to remind {user}: {e}")
 
     @commands.Cog.listener()
     async def on_command_error(self, ctx, error):
@@ -185,21 +187,21 @@ class Utility(commands.Cog):
                 await ctx.command.callback(self, ctx)
 
     async def resolve_bang(self, ctx, bang, args):
-        async with aiohttp.ClientSession() as session:
-            params = {"q": "!" + bang + " " + args, "format": "json", "no_redirect": 1}
-            url = "https://api.duckduckgo.com"
-            async with session.get(url, params=params) as response:
-                data = await response.json(content_type=None)
-                location = data.get("Redirect")
-                if location == "":
-                    return await ctx.send(":warning: Unknown bang or found nothing!")
-
-                while location:
-                    async with session.get(url, params=params) as deeper_response:
-                        response = deeper_response
-                        location = response.headers.get("location")
-
-                content = response.url
+        session = self.bot.session
+        params = {"q": "!" + bang + " " + args, "format": "json", "no_redirect": 1}
+        url = "https://api.duckduckgo.com"
+        async with session.get(url, params=params) as response:
+            data = await response.json(content_type=None)
+            location = data.get("Redirect")
+            if location == "":
+                return await ctx.send(":warning: Unknown bang or found nothing!")
+
+            while location:
+                async with session.get(url, params=params) as deeper_response:
+                    response = deeper_response
+                    location = response.headers.get("location")
+
+            content = response.url
         await ctx.send(content)
 
     @commands.command(name="!")
@@ -223,7 +225,8 @@ class Utility(commands.Cog):
             pass
 
         command_logger.info(log.log_command(ctx))
-        await queries.save_command_usage(ctx)
+        if ctx.guild is not None:
+            self.bot.command_usage.add(ctx.guild.id, ctx.author.id, ctx.command.qualified_name)
         try:
             bang, args = ctx.message.content[len(ctx.prefix) + 1 :].split(" ", 1)
             if len(bang) != 0:
@@ -278,7 +281,14 @@ class Utility(commands.Cog):
             ctx.message.jump_url,
         )
 
-        self.cache_needs_refreshing = True
+        self.schedule_reminder(
+            ctx.author.id,
+            ctx.guild.id,
+            now.datetime,
+            date.datetime,
+            content,
+            ctx.message.jump_url,
+        )
         await ctx.send(
             embed=discord.Embed(
                 color=int("ccd6dd", 16),
@@ -332,30 +342,30 @@ class Utility(commands.Cog):
                 # use given string as temporary location
                 location = address
 
-        async with aiohttp.ClientSession() as session:
-            params = {"address": location, "key": GOOGLE_API_KEY}
-            async with session.get(
-                "https://maps.googleapis.com/maps/api/geocode/json", params=params
-            ) as response:
-                geocode_data = await response.json()
-            try:
-                geocode_data = geocode_data["results"][0]
-            except IndexError:
-                raise exceptions.Warning("Could not find that location!")
+        session = self.bot.session
+        params = {"address": location, "key": GOOGLE_API_KEY}
+        async with session.get(
+            "https://maps.googleapis.com/maps/api/geocode/json", params=params
+        ) as response:
+            geocode_data = await response.json()
+        try:
+            geocode_data = geocode_data["results"][0]
+        except IndexError:
+            raise exceptions.Warning("Could not find that location!")
 
-            formatted_name = geocode_data["formatted_address"]
-            lat = geocode_data["geometry"]["location"]["lat"]
-            lon = geocode_data["geometry"]["location"]["lng"]
+        formatted_name = geocode_data["formatted_address"]
+        lat = geocode_data["geometry"]["location"]["lat"]
+        lon = geocode_data["geometry"]["location"]["lng"]
 
-            # we have lat and lon now, plug them into dark sky
-            async with session.get(
-                url=f"https://api.darksky.net/forecast/{DARKSKY_API_KEY}/{lat},{lon}?units=si"
-            ) as response:
-                weather_data = await response.json()
-            current = weather_data["currently"]
-            hourly = weather_data["hourly"]
+        # we have lat and lon now, plug them into dark sky
+        async with session.get(
+            url=f"https://api.darksky.net/forecast/{DARKSKY_API_KEY}/{lat},{lon}?units=si"
+        ) as response:
+            weather_data = await response.json()
+        current = weather_data["currently"]
+        hourly = weather_data["hourly"]
 
-            localtime = await get_timezone(session, {"lat": lat, "lon": lon})
+        localtime = await get_timezone(session, {"lat": lat, "lon": lon})
 
         country = "N/A"
         for comp in geocode_data["address_components"]:
@@ -376,9 +386,7 @@ class Utility(commands.Cog):
             f":map: [See on map](https://www.google.com/maps/search/?api=1&query={lat},{lon})",
         ]
 
-        content = discord.Embed(
-            color=int("e1e8ed", 16), title=f":flag_{country}: {formatted_name}"
-        )
+        content = discord.Embed(color=int("e1e8ed", 16), title=f":flag_{country}: {formatted_name}")
         content.add_field(name=f"{weather_icon} {summary}", value="\n".join(information_rows))
         content.set_footer(text=f"🕐 Local time {localtime}")
         await ctx.send(embed=content)
@@ -388,9 +396,8 @@ class Utility(commands.Cog):
         """Get synonyms for a word."""
         url = f"https://www.dictionaryapi.com/api/v3/references/thesaurus/json/{word}"
         params = {"key": THESAURUS_KEY}
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url=url, params=params) as response:
-                data = await response.json()
+        async with self.bot.session.get(url=url, params=params) as response:
+            data = await response.json()
 
         if isinstance(data[0], dict):
             api_icon = "https://dictionaryapi.com/images/MWLogo_120x120_2x.png"
@@ -428,83 +435,82 @@ class Utility(commands.Cog):
             "app_key": OXFORD_TOKEN,
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"{api_url}lemmas/en/{word}", headers=headers) as response:
+        session = self.bot.session
+        async with session.get(f"{api_url}lemmas/en/{word}", headers=headers) as response:
+            data = await response.json()
+
+        # searched for word id, now use the word id to get definition
+        all_entries = []
+
+        if data.get("results"):
+            definitions_embed = discord.Embed(colour=discord.Colour.from_rgb(0, 189, 242))
+            definitions_embed.description = ""
+
+            found_word = data["results"][0]["id"]
+            url = f"{api_url}entries/en-gb/{found_word}"
+            params = {"strictMatch": "false"}
+            async with session.get(url, headers=headers, params=params) as response:
                 data = await response.json()
 
-            # searched for word id, now use the word id to get definition
-            all_entries = []
+            for entry in data["results"][0]["lexicalEntries"]:
+                definitions_value = ""
+                name = data["results"][0]["word"]
+
+                for i in range(len(entry["entries"][0]["senses"])):
+                    for definition in entry["entries"][0]["senses"][i].get("definitions", []):
+                        this_top_level_definition = f"\n**{i + 1}.** {definition}"
+                        if len(definitions_value + this_top_level_definition) > 1024:
+                            break
+                        definitions_value += this_top_level_definition
+                        try:
+                            for y in range(len(entry["entries"][0]["senses"][i]["subsenses"])):
+                                for subdef in entry["entries"][0]["senses"][i]["subsenses"][y][
+                                    "definitions"
+                                ]:
+                                    this_definition = f"\n**└ {i + 1}.{y + 1}.** {subdef}"
+                                    if len(definitions_value + this_definition) > 1024:
+                                        break
+                                    definitions_value += this_definition
+
+                            definitions_value += "\n"
+                        except KeyError:
+                            pass
+
+                    for reference in entry["entries"][0]["senses"][i].get(
+                        "crossReferenceMarkers", []
+                    ):
+                        definitions_value += reference
+
+                word_type = entry["lexicalCategory"]["text"]
+                this_entry = {
+                    "id": name,
+                    "definitions": definitions_value,
+                    "type": word_type,
+                }
+                all_entries.append(this_entry)
 
-            if data.get("results"):
-                definitions_embed = discord.Embed(colour=discord.Colour.from_rgb(0, 189, 242))
-                definitions_embed.description = ""
+            if not all_entries:
+                return await ctx.send(f"No definitions found for `{word}`")
 
-                found_word = data["results"][0]["id"]
-                url = f"{api_url}entries/en-gb/{found_word}"
-                params = {"strictMatch": "false"}
-                async with session.get(url, headers=headers, params=params) as response:
-                    data = await response.json()
+            definitions_embed.set_author(
+                name=all_entries[0]["id"], icon_url="https://i.imgur.com/vDvSmF3.png"
+            )
 
-                for entry in data["results"][0]["lexicalEntries"]:
-                    definitions_value = ""
-                    name = data["results"][0]["word"]
-
-                    for i in range(len(entry["entries"][0]["senses"])):
-                        for definition in entry["entries"][0]["senses"][i].get("definitions", []):
-                            this_top_level_definition = f"\n**{i + 1}.** {definition}"
-                            if len(definitions_value + this_top_level_definition) > 1024:
-                                break
-                            definitions_value += this_top_level_definition
-                            try:
-                                for y in range(len(entry["entries"][0]["senses"][i]["subsenses"])):
-                                    for subdef in entry["entries"][0]["senses"][i]["subsenses"][y][
-                                        "definitions"
-                                    ]:
-                                        this_definition = f"\n**└ {i + 1}.{y + 1}.** {subdef}"
-                                        if len(definitions_value + this_definition) > 1024:
-                                            break
-                                        definitions_value += this_definition
-
-                                definitions_value += "\n"
-                            except KeyError:
-                                pass
-
-                        for reference in entry["entries"][0]["senses"][i].get(
-                            "crossReferenceMarkers", []
-                        ):
-                            definitions_value += reference
-
-                    word_type = entry["lexicalCategory"]["text"]
-                    this_entry = {
-                        "id": name,
-                        "definitions": definitions_value,
-                        "type": word_type,
-                    }
-                    all_entries.append(this_entry)
-
-                if not all_entries:
-                    return await ctx.send(f"No definitions found for `{word}`")
-
-                definitions_embed.set_author(
-                    name=all_entries[0]["id"], icon_url="https://i.imgur.com/vDvSmF3.png"
+            for entry in all_entries:
+                definitions_embed.add_field(
+                    name=f"{entry['type']}", value=entry["definitions"], inline=False
                 )
 
-                for entry in all_entries:
-                    definitions_embed.add_field(
-                        name=f"{entry['type']}", value=entry["definitions"], inline=False
-                    )
-
-                await ctx.send(embed=definitions_embed)
-            else:
-                await ctx.send(f"```ERROR: {data['error']}```")
+            await ctx.send(embed=definitions_embed)
+        else:
+            await ctx.send(f"```ERROR: {data['error']}```")
 
     @commands.command()
     async def urban(self, ctx, *, word):
         """Search for a definition from urban dictionary."""
         url = "https://api.urbandictionary.com/v0/define"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params={"term": word}) as response:
-                data = await response.json()
+        async with self.bot.session.get(url, params={"term": word}) as response:
+            data = await response.json()
 
         pages = []
         if data["list"]:
@@ -554,58 +560,58 @@ class Utility(commands.Cog):
                 "Sorry, the maximum length of text i can translate is 1000 characters!"
             )
 
-        async with aiohttp.ClientSession() as session:
-            languages = text.partition(" ")[0]
-            if "/" in languages or "->" in languages:
-                if "/" in languages:
-                    source, target = languages.split("/")
-                elif "->" in languages:
-                    source, target = languages.split("->")
-                text = text.partition(" ")[2]
-                if source == "":
-                    source = await detect_language(session, text)
-                if target == "":
-                    target = "en"
-            else:
+        session = self.bot.session
+        languages = text.partition(" ")[0]
+        if "/" in languages or "->" in languages:
+            if "/" in languages:
+                source, target = languages.split("/")
+            elif "->" in languages:
+                source, target = languages.split("->")
+            text = text.partition(" ")[2]
+            if source == "":
                 source = await detect_language(session, text)
-                if source == "en":
-                    target = "ko"
-                else:
-                    target = "en"
-            language_pair = f"{source}/{target}"
-
-            # we have language and query, now choose the appropriate translator
-
-            if language_pair in papago_pairs:
-                # use papago
-                url = "https://openapi.naver.com/v1/papago/n2mt"
-                params = {"source": source, "target": target, "text": text}
-                headers = {
-                    "X-Naver-Client-Id": NAVER_APPID,
-                    "X-Naver-Client-Secret": NAVER_TOKEN,
-                }
+            if target == "":
+                target = "en"
+        else:
+            source = await detect_language(session, text)
+            if source == "en":
+                target = "ko"
+            else:
+                target = "en"
+        language_pair = f"{source}/{target}"
 
-                async with session.post(url, headers=headers, data=params) as response:
-                    translation = (await response.json())["message"]["result"]["translatedText"]
+        # we have language and query, now choose the appropriate translator
 
-            else:
-                # use google
-                url = "https://translation.googleapis.com/language/translate/v2"
-                params = {
-                    "key": GOOGLE_API_KEY,
-                    "model": "nmt",
-                    "target": target,
-                    "source": source,
-                    "q": text,
-                }
+        if language_pair in papago_pairs:
+            # use papago
+            url = "https://openapi.naver.com/v1/papago/n2mt"
+            params = {"source": source, "target": target, "text": text}
+            headers = {
+                "X-Naver-Client-Id": NAVER_APPID,
+                "X-Naver-Client-Secret": NAVER_TOKEN,
+            }
 
-                async with session.get(url, params=params) as response:
-                    data = await response.json()
+            async with session.post(url, headers=headers, data=params) as response:
+                translation = (await response.json())["message"]["result"]["translatedText"]
 
-                try:
-                    translation = html.unescape(data["data"]["translations"][0]["translatedText"])
-                except KeyError:
-                    return await ctx.send("Sorry, I could not translate this :(")
+        else:
+            # use google
+            url = "https://translation.googleapis.com/language/translate/v2"
+            params = {
+                "key": GOOGLE_API_KEY,
+                "model": "nmt",
+                "target": target,
+                "source": source,
+                "q": text,
+            }
+
+            async with session.get(url, params=params) as response:
+                data = await response.json()
+
+            try:
+                translation = html.unescape(data["data"]["translations"][0]["translatedText"])
+            except KeyError:
+                return await ctx.send("Sorry, I could not translate this :(")
 
         await ctx.send(f"`{source}->{target}` {translation}")
 
@@ -620,56 +626,55 @@ class Utility(commands.Cog):
             "units": "metric",
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    content = await response.text()
-                    await ctx.send(f":mag_right: {content}")
-                else:
-                    await ctx.send(":shrug:")
+        async with self.bot.session.get(url, params=params) as response:
+            if response.status == 200:
+                content = await response.text()
+                await ctx.send(f":mag_right: {content}")
+            else:
+                await ctx.send(":shrug:")
 
     @commands.command()
     async def creategif(self, ctx, media_url):
         """Create a gfycat gif from video url."""
         starttimer = time()
-        async with aiohttp.ClientSession() as session:
-            auth_headers = await gfycat_oauth(session)
-            url = "https://api.gfycat.com/v1/gfycats"
-            params = {"fetchUrl": media_url.strip("`")}
-            async with session.post(url, json=params, headers=auth_headers) as response:
-                data = await response.json()
+        session = self.bot.session
+        auth_headers = await gfycat_oauth(session)
+        url = "https://api.gfycat.com/v1/gfycats"
+        params = {"fetchUrl": media_url.strip("`")}
+        async with session.post(url, json=params, headers=auth_headers) as response:
+            data = await response.json()
 
-            try:
-                gfyname = data["gfyname"]
-            except KeyError:
-                raise exceptions.Warning("Unable to create gif from this link!")
+        try:
+            gfyname = data["gfyname"]
+        except KeyError:
+            raise exceptions.Warning("Unable to create gif from this link!")
 
-            message = await ctx.send(f"Encoding {emojis.LOADING}")
+        message = await ctx.send(f"Encoding {emojis.LOADING}")
 
-            i = 1
-            url = f"https://api.gfycat.com/v1/gfycats/fetch/status/{gfyname}"
-            await asyncio.sleep(5)
-            while True:
-                async with session.get(url, headers=auth_headers) as response:
-                    data = await response.json()
-                    task = data["task"]
+        i = 1
+        url = f"https://api.gfycat.com/v1/gfycats/fetch/status/{gfyname}"
+        await asyncio.sleep(5)
+        while True:
+            async with session.get(url, headers=auth_headers) as response:
+                data = await response.json()
+                task = data["task"]
 
-                if task == "encoding":
-                    pass
+            if task == "encoding":
+                pass
 
-                elif task == "complete":
-                    await message.edit(
-                        content=f"Gif created in **{util.stringfromtime(time() - starttimer, 2)}**"
-                        f"\nhttps://gfycat.com/{data['gfyname']}"
-                    )
-                    break
+            elif task == "complete":
+                await message.edit(
+                    content=f"Gif created in **{util.stringfromtime(time() - starttimer, 2)}**"
+                    f"\nhttps://gfycat.com/{data['gfyname']}"
+                )
+                break
 
-                else:
-                    await message.edit(content="There was an error while creating your gif :(")
-                    break
+            else:
+                await message.edit(content="There was an error while creating your gif :(")
+                break
 
-                await asyncio.sleep(i)
-                i += 1
+            await asyncio.sleep(i)
+            i += 1
 
     @commands.command()
     async def streamable(self, ctx, media_url):
@@ -680,48 +685,48 @@ class Utility(commands.Cog):
         params = {"url": media_url.strip("`")}
         auth = aiohttp.BasicAuth(STREAMABLE_USER, STREAMABLE_PASSWORD)
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params, auth=auth) as response:
-                if response.status != 200:
-                    try:
-                        data = await response.json()
-                        messages = []
-                        for category in data["messages"]:
-                            for msg in data["messages"][category]:
-                                messages.append(msg)
-                        messages = " | ".join(messages)
-                        errormsg = f"ERROR {response.status_code}: {messages}"
-                    except (aiohttp.ContentTypeError, KeyError):
-                        errormsg = await response.text()
-
-                    logger.error(errormsg)
-                    return await ctx.send(f"```{errormsg.split(';')[0]}```")
+        session = self.bot.session
+        async with session.get(url, params=params, auth=auth) as response:
+            if response.status != 200:
+                try:
+                    data = await response.json()
+                    messages = []
+                    for category in data["messages"]:
+                        for msg in data["messages"][category]:
+                            messages.append(msg)
+                    messages = " | ".join(messages)
+                    errormsg = f"ERROR {response.status_code}: {messages}"
+                except (aiohttp.ContentTypeError, KeyError):
+                    errormsg = await response.text()
+
+                logger.error(errormsg)
+                return await ctx.send(f"```{errormsg.split(';')[0]}```")
+
+            data = await response.json()
+            link = "https://streamable.com/" + data.get("shortcode")
+            message = await ctx.send(f"Processing Video {emojis.LOADING}")
+
+        i = 1
+        await asyncio.sleep(5)
+        while True:
+            async with session.get(link) as response:
+                soup = BeautifulSoup(await response.text(), "html.parser")
+                meta = soup.find("meta", {"property": "og:url"})
+
+                if meta:
+                    timestring = util.stringfromtime(time() - starttimer, 2)
+                    await message.edit(
+                        content=f"Streamable created in **{timestring}**\n{meta.get('content')}"
+                    )
+                    break
 
-                data = await response.json()
-                link = "https://streamable.com/" + data.get("shortcode")
-                message = await ctx.send(f"Processing Video {emojis.LOADING}")
-
-            i = 1
-            await asyncio.sleep(5)
-            while True:
-                async with session.get(link) as response:
-                    soup = BeautifulSoup(await response.text(), "html.parser")
-                    meta = soup.find("meta", {"property": "og:url"})
-
-                    if meta:
-                        timestring = util.stringfromtime(time() - starttimer, 2)
-                        await message.edit(
-                            content=f"Streamable created in **{timestring}**\n{meta.get('content')}"
-                        )
-                        break
-
-                    status = soup.find("h1").text
-                    if status != "Processing Video":
-                        await message.edit(content=f":warning: {status}")
-                        break
-
-                    await asyncio.sleep(i)
-                    i += 1
+                status = soup.find("h1").text
+                if status != "Processing Video":
+                    await message.edit(content=f":warning: {status}")
+                    break
+
+                await asyncio.sleep(i)
+                i += 1
 
     @commands.command()
     async def stock(self, ctx, *, symbol):
@@ -736,43 +741,43 @@ class Utility(commands.Cog):
             >stock $TSLA
             >stock Tesla
         """
-        async with aiohttp.ClientSession() as session:
-            if not symbol.startswith("$"):
-                # make search
-                url = "http://d.yimg.com/autoc.finance.yahoo.com/autoc"
-                yahoo_param = {
-                    "query": symbol,
-                    "region": 1,
-                    "lang": "en",
-                    "callback": "YAHOO.Finance.SymbolSuggest.ssCallback",
-                }
-
-                async with session.get(url, params=yahoo_param) as response:
-                    search_data = await response.text()
-                    search_data = search_data.replace(yahoo_param["callback"], "")
-                    search_data = json.loads(search_data.strip("();"))
-
-                companies = search_data["ResultSet"]["Result"]
-                if not companies:
-                    return await ctx.send("Found nothing!")
-                result = companies[0]
-
-                symbol = result["symbol"]
-
-            params = {"symbol": symbol.strip("$"), "token": FINNHUB_TOKEN}
-
-            url = "https://finnhub.io/api/v1/quote"
-            async with session.get(url, params=params) as response:
-                quote_data = await response.json()
-
-            error = quote_data.get("error")
-            if error is not None:
-                return await ctx.send(error)
-
-            url = "https://finnhub.io/api/v1/stock/profile2"
-            params["symbol"] = profile_ticker(params["symbol"])
-            async with session.get(url, params=params) as response:
-                company_profile = await response.json()
+        session = self.bot.session
+        if not symbol.startswith("$"):
+            # make search
+            url = "http://d.yimg.com/autoc.finance.yahoo.com/autoc"
+            yahoo_param = {
+                "query": symbol,
+                "region": 1,
+                "lang": "en",
+                "callback": "YAHOO.Finance.SymbolSuggest.ssCallback",
+            }
+
+            async with session.get(url, params=yahoo_param) as response:
+                search_data = await response.text()
+                search_data = search_data.replace(yahoo_param["callback"], "")
+                search_data = json.loads(search_data.strip("();"))
+
+            companies = search_data["ResultSet"]["Result"]
+            if not companies:
+                return await ctx.send("Found nothing!")
+            result = companies[0]
+
+            symbol = result["symbol"]
+
+        params = {"symbol": symbol.strip("$"), "token": FINNHUB_TOKEN}
+
+        url = "https://finnhub.io/api/v1/quote"
+        async with session.get(url, params=params) as response:
+            quote_data = await response.json()
+
+        error = quote_data.get("error")
+        if error is not None:
+            return await ctx.send(error)
+
+        url = "https://finnhub.io/api/v1/stock/profile2"
+        params["symbol"] = profile_ticker(params["symbol"])
+        async with session.get(url, params=params) as response:
+            company_profile = await response.json()
 
         change = float(quote_data["c"]) - float(quote_data["pc"])
         gains = change > 0
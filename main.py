@@ -3,9 +3,21 @@ import sys
 import uvloop
 import discord
 import traceback
+from concurrent.futures import ProcessPoolExecutor
 from discord.ext import commands
 from time import time
-from modules import log, util, maria, cache
+from modules import (
+    log,
+    util,
+    maria,
+    cache,
+    httpclient,
+    imagecolor,
+    usage,
+    leaderboard,
+    renderer,
+    blobstore,
+)
 from modules.help import EmbedHelpCommand
 from dotenv import load_dotenv
 
@@ -42,11 +54,28 @@ class MisoBot(commands.AutoShardedBot):
         self.start_time = time()
         self.global_cd = commands.CooldownMapping.from_cooldown(15, 60, commands.BucketType.member)
         self.db = maria.MariaDB(self)
+        self.session = httpclient.HttpClient(self)
+        self.process_pool = ProcessPoolExecutor(
+            max_workers=int(os.environ.get("PROCESS_POOL_SIZE", 2))
+        )
         self.cache = cache.Cache(self)
+        self.image_store = blobstore.BlobStore(self)
+        self.image_colors = imagecolor.ColorCache(self)
+        self.command_usage = usage.CommandUsageBuffer(self)
+        self.leaderboards = leaderboard.Leaderboards(self)
+        self.renderer = renderer.RenderClient(self)
         self.version = "4.0"
 
     async def close(self):
+        await self.command_usage.close()
+        # cogs are only unloaded after this, when the database is already closed
+        notifications = self.get_cog("Notifications")
+        if notifications is not None:
+            await notifications.delivery.close()
+        self.renderer.close()
         await self.db.cleanup()
+        await self.session.close()
+        self.process_pool.shutdown(wait=False)
         await super().close()
 
     async def on_message(self, message):
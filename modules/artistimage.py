@@ -0,0 +1,162 @@
+import os
+import asyncio
+import urllib.parse
+import aiohttp
+import arrow
+from bs4 import BeautifulSoup
+from time import time
+from yarl import URL
+from modules import log, ttlcache
+from modules.blobstore import IMAGE_HASH_PATTERN
+
+
+logger = log.get_logger(__name__)
+
+ARTIST_IMAGE_URL = "https://lastfm.freetls.fastly.net/i/u/300x300/{0}.jpg"
+NAME_MAX_LENGTH = 255
+
+
+def parse_image_hash(html):
+    """
+    Runs in a worker thread.
+
+    :param html : Content of an artist's +images page on last.fm
+    :returns    : Hash of the first image, or empty string if the artist has no images
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    image = soup.find("img", {"class": "image-list-image"})
+    if image is None:
+        try:
+            image = soup.find("li", {"class": "image-list-item-wrapper"}).find("a").find("img")
+        except AttributeError:
+            return ""
+
+    if image is None or not image.get("src"):
+        return ""
+
+    image_hash = URL(image["src"]).name.split(".")[0]
+    return image_hash if IMAGE_HASH_PATTERN.match(image_hash) else ""
+
+
+class ArtistImageResolver:
+    """
+    Artist images, which the Last.fm api doesn't have, scraped from last.fm.
+
+    Lookups read through memory, then artist_image_cache, and only scrape the artist's
+    +images page when neither has the artist. Concurrent lookups of the same artist share
+    one scrape. Entries older than ttl are still returned as is, and scraped again
+    in the background. A failed refresh keeps the old image and is retried after failure_ttl.
+    Artists without any images are cached as an empty hash.
+
+        image_url = await resolver.get(artist_name)
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.ttl = float(os.environ.get("ARTIST_IMAGE_TTL_DAYS", 7)) * 24 * 60 * 60
+        # how long a failed scrape is remembered for, so a dead page isn't requested every time
+        self.failure_ttl = 5 * 60
+        self.memory = ttlcache.TTLCache(
+            maxsize=int(os.environ.get("ARTIST_IMAGE_CACHE_SIZE", 10000))
+        )
+        self.refresh_semaphore = asyncio.Semaphore(
+            int(os.environ.get("ARTIST_IMAGE_REFRESH_CONCURRENCY", 2))
+        )
+        self.refreshing = set()
+        self.scraped = 0
+        self.refreshed = 0
+        self.failed = 0
+
+    async def get(self, artist):
+        """:returns : Url of the artist's image, or empty string if there is none"""
+        artist = str(artist)
+        key = artist.lower()
+        entry = self.memory.get(key)
+        if entry is None:
+            entry = await self.memory.coalesce(key, self.load, key, artist)
+
+        image_hash, scraped_on = entry
+        if scraped_on < time() - self.ttl:
+            self.refresh_later(key, artist, image_hash)
+
+        return ARTIST_IMAGE_URL.format(image_hash) if image_hash else ""
+
+    async def load(self, key, artist):
+        """:returns : (image hash, scraped on timestamp) from the database, or scraped if missing"""
+        row = await self.bot.db.execute(
+            "SELECT image_hash, scraped_on FROM artist_image_cache WHERE artist_name = %s",
+            artist[:NAME_MAX_LENGTH],
+            one_row=True,
+        )
+        if row:
+            image_hash, scraped_on = row
+            # rows from before scraped_on was tracked are refreshed on first use
+            entry = (image_hash or "", arrow.get(scraped_on).float_timestamp if scraped_on else 0)
+            self.memory.set(key, entry, self.ttl)
+            return entry
+
+        entry = await self.scrape(artist)
+        if entry is None:
+            entry = ("", time())
+            self.memory.set(key, entry, self.failure_ttl)
+        else:
+            self.memory.set(key, entry, self.ttl)
+        return entry
+
+    def refresh_later(self, key, artist, image_hash):
+        if key in self.refreshing:
+            return
+
+        self.refreshing.add(key)
+        asyncio.ensure_future(self.refresh(key, artist, image_hash))
+
+    async def refresh(self, key, artist, image_hash):
+        entry = None
+        try:
+            async with self.refresh_semaphore:
+                entry = await self.scrape(artist)
+            if entry is not None:
+                self.refreshed += 1
+        except Exception as e:
+            logger.warning(f"Failed to refresh the image of {artist} : {e}")
+        finally:
+            if entry is None:
+                # keep the old image, and make it stale again only after failure_ttl
+                entry = (image_hash, time() - self.ttl + self.failure_ttl)
+            self.memory.set(key, entry, self.ttl)
+            self.refreshing.discard(key)
+
+    async def scrape(self, artist):
+        """
+        Scrape the image of artist and save it to the database.
+
+        :returns : (image hash, scraped on timestamp), or None if the page couldn't be loaded
+        """
+        url = f"https://www.last.fm/music/{urllib.parse.quote_plus(artist)}/+images"
+        try:
+            async with self.bot.session.get(url) as response:
+                if response.status != 200:
+                    self.failed += 1
+                    return None
+                html = await response.text()
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            logger.warning(f"Failed to scrape the image of {artist} : {e}")
+            self.failed += 1
+            return None
+
+        image_hash = await self.bot.loop.run_in_executor(None, parse_image_hash, html)
+        self.scraped += 1
+        scraped_on = arrow.utcnow()
+        await self.bot.db.execute(
+            """
+            INSERT INTO artist_image_cache (artist_name, image_hash, scraped_on)
+                VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                image_hash = VALUES(image_hash),
+                scraped_on = VALUES(scraped_on)
+            """,
+            artist[:NAME_MAX_LENGTH],
+            image_hash,
+            scraped_on.datetime,
+        )
+        return image_hash, scraped_on.float_timestamp
@@ -0,0 +1,220 @@
+import os
+import re
+import mmap
+import uuid
+import hashlib
+import asyncio
+from collections import OrderedDict
+from time import time
+from yarl import URL
+from modules import log
+
+
+logger = log.get_logger(__name__)
+
+IMAGE_HASH_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+VARIANT_PATTERN = re.compile(r"^[0-9a-zA-Z]{1,16}$")
+SUFFIX_PATTERN = re.compile(r"^\.[0-9a-z]{1,5}$")
+# query parameters that don't change which image is served: discord's size,
+# and the expiry and signature of discord attachment urls
+IGNORED_QUERY_PARAMETERS = {"size", "ex", "is", "hm"}
+
+
+def content_addressed(url):
+    """:returns : True if the filename in url is the hash of the image, like on last.fm and discord"""
+    return IMAGE_HASH_PATTERN.match(URL(url).name.split(".")[0]) is not None
+
+
+def image_key(url):
+    """
+    Hash identifying the image at url, used as the key of image_color_cache and the image store.
+    Content addressed filenames are used as is, other urls are hashed with their query,
+    leaving out only the IGNORED_QUERY_PARAMETERS.
+    """
+    url = URL(url)
+    filename = url.name.split(".")[0]
+    if IMAGE_HASH_PATTERN.match(filename):
+        return filename
+    query = sorted(
+        (name, value)
+        for name, value in url.query.items()
+        if name.lower() not in IGNORED_QUERY_PARAMETERS
+    )
+    return hashlib.md5(str(url.with_query(query)).encode()).hexdigest()
+
+
+async def download(session, urls):
+    """:returns : Content of the first url that responds successfully, or None"""
+    for url in urls:
+        try:
+            async with session.get(url) as response:
+                if response.status == 200:
+                    return await response.read()
+        except asyncio.TimeoutError:
+            continue
+        except Exception as e:
+            logger.warning(f"Failed to download {url} : {e}")
+
+    return None
+
+
+def blob_key(url):
+    """
+    :returns : (image hash, size variant) of the image at url.
+               Last.fm keeps the size in the path (/i/u/300x300/hash.png)
+               and discord in the size parameter, so the same image in another size
+               is stored next to it instead of over it.
+    """
+    parsed = URL(url)
+    variant = parsed.query.get("size") or parsed.parent.name
+    if not VARIANT_PATTERN.match(variant or ""):
+        variant = "full"
+    return image_key(url), variant
+
+
+def read_blob(path):
+    """
+    Can be used in worker processes.
+
+    :returns : The file memory mapped, usable as a read only file object
+    """
+    with open(path, "rb") as file:
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class BlobStore:
+    """
+    Image files downloaded by the bot, kept on disk and shared by everything that needs them.
+
+    Files are stored under root/variant/ab/hash.ext, where hash is the image_key of the url,
+    so images served from one path with different query parameters are kept apart.
+    Writes go to a temporary file that is renamed into place, so a file is either complete
+    or missing. When the store is over max_bytes the least recently used files are removed.
+    Consumers get a path, and read it with read_blob() wherever the image is decoded.
+
+        path = await bot.image_store.fetch(url)
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.root = os.environ.get("IMAGE_STORE_PATH", "downloads/images")
+        self.max_bytes = int(float(os.environ.get("IMAGE_STORE_SIZE_MB", 1024)) * 1024 * 1024)
+        # relative path : file size, least recently used first
+        self.index = OrderedDict()
+        self.size = 0
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.loading = bot.loop.create_task(self.load_index())
+
+    def relative_path(self, url):
+        image_hash, variant = blob_key(url)
+        # discord serves the same avatar hash as png, webp and gif
+        suffix = URL(url).suffix.lower()
+        if not SUFFIX_PATTERN.match(suffix):
+            suffix = ""
+        return os.path.join(variant, image_hash[:2], image_hash + suffix)
+
+    async def load_index(self):
+        start = time()
+        files = await self.bot.loop.run_in_executor(None, self.scan)
+        for relative_path, size, _ in sorted(files, key=lambda f: f[2]):
+            self.index[relative_path] = size
+            self.size += size
+        logger.info(
+            f"Image store has {len(self.index)} files ({self.size/1024/1024:.1f}MB), "
+            f"indexed in {time()-start:.3f}s"
+        )
+        await self.evict()
+
+    def scan(self):
+        """:returns : List of (relative path, size, last used) of every stored file"""
+        files = []
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                if filename.endswith(".tmp"):
+                    # left over from an interrupted write
+                    os.remove(path)
+                    continue
+                stat = os.stat(path)
+                files.append((os.path.relpath(path, self.root), stat.st_size, stat.st_mtime))
+        return files
+
+    async def fetch(self, *urls):
+        """:returns : Path to the first of urls that could be downloaded, or None"""
+        await asyncio.shield(self.loading)
+        for url in urls:
+            if not url:
+                continue
+
+            relative_path = self.relative_path(str(url))
+            path = os.path.join(self.root, relative_path)
+            if relative_path in self.index:
+                try:
+                    # the modification time is the last use time when the index is rebuilt
+                    os.utime(path)
+                except FileNotFoundError:
+                    self.forget(relative_path)
+                else:
+                    self.index.move_to_end(relative_path)
+                    self.hits += 1
+                    return path
+
+            self.misses += 1
+            task = self.pending.get(relative_path)
+            if task is None:
+                task = asyncio.ensure_future(self.download(str(url), relative_path))
+                self.pending[relative_path] = task
+                task.add_done_callback(lambda _, key=relative_path: self.pending.pop(key, None))
+            if await asyncio.shield(task):
+                return path
+
+        return None
+
+    async def download(self, url, relative_path):
+        """:returns : True if the file was downloaded and stored"""
+        data = await download(self.bot.session, [url])
+        if not data:
+            return False
+
+        await self.bot.loop.run_in_executor(None, self.write, relative_path, data)
+        self.forget(relative_path)
+        self.index[relative_path] = len(data)
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            await self.evict()
+        return True
+
+    def write(self, relative_path, data):
+        path = os.path.join(self.root, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(data)
+        os.replace(temporary_path, path)
+
+    def forget(self, relative_path):
+        size = self.index.pop(relative_path, None)
+        if size is not None:
+            self.size -= size
+
+    async def evict(self):
+        removed = []
+        while self.size > self.max_bytes and self.index:
+            relative_path, size = self.index.popitem(last=False)
+            self.size -= size
+            removed.append(os.path.join(self.root, relative_path))
+
+        if removed:
+            self.evictions += len(removed)
+            await self.bot.loop.run_in_executor(None, remove_files, removed)
+
+
+def remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
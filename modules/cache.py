@@ -1,74 +1,546 @@
-from modules import log
+import os
+import difflib
+import asyncio
+from modules import log, ttlcache
 
 
 logger = log.get_logger(__name__)
 log.get_logger(__name__)
 
 
+class GuildSettings:
+    """Snapshot of the settings of one guild that are needed by the event handlers."""
+
+    __slots__ = (
+        "member_log_channel_id",
+        "ban_log_channel_id",
+        "message_log_channel_id",
+        "greeter_channel_id",
+        "greeter_enabled",
+        "greeter_format",
+        "goodbye_channel_id",
+        "goodbye_enabled",
+        "goodbye_format",
+        "autoroles",
+        "message_log_ignored",
+        "starboard_enabled",
+        "starboard_channel_id",
+        "starboard_reaction_count",
+        "starboard_emoji_name",
+        "starboard_emoji_id",
+        "starboard_emoji_type",
+    )
+
+    def __init__(self):
+        self.member_log_channel_id = None
+        self.ban_log_channel_id = None
+        self.message_log_channel_id = None
+        self.greeter_channel_id = None
+        self.greeter_enabled = False
+        self.greeter_format = None
+        self.goodbye_channel_id = None
+        self.goodbye_enabled = False
+        self.goodbye_format = None
+        self.autoroles = []
+        self.message_log_ignored = set()
+        self.starboard_enabled = False
+        self.starboard_channel_id = None
+        self.starboard_reaction_count = None
+        self.starboard_emoji_name = None
+        self.starboard_emoji_id = None
+        self.starboard_emoji_type = None
+
+
+class LocalBroker:
+    """
+    In-process stand-in for a pub/sub message broker.
+
+    Every Cache attached to the same broker is told about the changes the others make.
+    Messages are delivered on the next event loop iteration, like they would be over a network,
+    so a networked broker with the same subscribe/publish interface can be dropped in
+    to share invalidations between processes or shards.
+    """
+
+    def __init__(self):
+        self.subscribers = []
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def publish(self, message):
+        loop = asyncio.get_event_loop()
+        for callback in list(self.subscribers):
+            loop.call_soon(callback, message)
+
+
+default_broker = LocalBroker()
+
+
+class Region:
+    """
+    Named part of the cache that is loaded all at once.
+
+    :param loader : Coroutine function returning the data of the region
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.data = {}
+        self.loads = 0
+        self.loading = None
+
+    async def load(self):
+        # reloads requested while one is already running share it
+        if self.loading is None:
+            self.loading = asyncio.ensure_future(self.loader())
+        loading = self.loading
+        try:
+            data = await asyncio.shield(loading)
+        finally:
+            if self.loading is loading:
+                self.loading = None
+        self.data = data
+        self.loads += 1
+
+    async def invalidate(self, key=None):
+        await self.load()
+
+
+class LazyRegion:
+    """
+    Named part of the cache that is loaded one key at a time on first use.
+    Size is bounded and entries expire, see TTLCache.
+
+    :param loader : Coroutine function taking a key and returning its value
+    """
+
+    def __init__(self, name, loader, maxsize, ttl):
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+        self.data = ttlcache.TTLCache(maxsize=maxsize)
+        # key : times invalidated, so a load that raced with a change is not cached
+        self.versions = {}
+        self.loads = 0
+
+    async def get(self, key):
+        value = self.data.get(key)
+        if value is None:
+            value = await self.data.coalesce(key, self.load_key, key)
+        return value
+
+    async def load_key(self, key):
+        version = self.versions.get(key, 0)
+        value = await self.loader(key)
+        self.loads += 1
+        if self.versions.get(key, 0) == version:
+            self.data.set(key, value, self.ttl)
+        return value
+
+    async def load(self):
+        self.data.clear()
+
+    def discard(self, key):
+        self.versions[key] = self.versions.get(key, 0) + 1
+        self.data.delete(key)
+        # don't let waiters join a load that started before the change
+        self.data.pending.pop(key, None)
+
+    async def invalidate(self, key=None):
+        if key is None:
+            for pending_key in list(self.data.pending):
+                self.discard(pending_key)
+            self.data.clear()
+        else:
+            self.discard(key)
+
+
 class Cache:
-    def __init__(self, bot):
+    """
+    Settings that are needed on every message or command, kept in memory.
+
+    The cache is split into named regions with their own loaders. Changes should go through
+    the write helpers, which update the database and memory together, tell local listeners
+    and publish the change to the broker so other processes can invalidate their copy.
+
+        await bot.cache.set_value("prefixes", str(guild.id), prefix, "INSERT ...", ...)
+    """
+
+    def __init__(self, bot, broker=None):
         self.bot = bot
-        self.prefixes = {}
-        self.rolepickers = set()
-        self.votechannels = set()
-        self.autoresponse = {}
-        self.levelupmessage = {}
-        self.blacklist = {}
+        self.broker = broker or default_broker
+        self.origin = id(self)
+        self.regions = {}
+        # region name : [callbacks taking the changed key]
+        self.listeners = {}
+        for region in [
+            Region("prefixes", self.load_prefixes),
+            Region("rolepickers", self.load_rolepickers),
+            Region("rolepicker_roles", self.load_rolepicker_roles),
+            Region("votechannels", self.load_votechannels),
+            Region("autoresponse", self.load_autoresponse),
+            Region("levelupmessage", self.load_levelupmessage),
+            Region("blacklist", self.load_blacklist),
+            Region("lastfm_users", self.load_lastfm_users),
+            Region("lastfm_cheaters", self.load_lastfm_cheaters),
+            LazyRegion(
+                "guild_settings",
+                self.load_guild_settings,
+                maxsize=int(os.environ.get("GUILD_SETTINGS_CACHE_SIZE", 5000)),
+                ttl=60 * 60,
+            ),
+        ]:
+            self.add_region(region)
+
+        self.broker.subscribe(self.on_broker_message)
         bot.loop.create_task(self.initialize_settings_cache())
 
+    def add_region(self, region):
+        self.regions[region.name] = region
+        return region
+
+    async def loaded(self, name):
+        """
+        :returns : Data of the region, waiting for its first load if that isn't done yet.
+                   Raises if the region can't be loaded.
+        """
+        region = self.regions[name]
+        if region.loads == 0:
+            # joins the initial load if it's still running
+            await region.load()
+        return region.data
+
+    @property
+    def prefixes(self):
+        # guild_id (str) : prefix
+        return self.regions["prefixes"].data
+
+    @property
+    def rolepickers(self):
+        # channel_id : is_enabled
+        return self.regions["rolepickers"].data
+
+    @property
+    def rolepicker_roles(self):
+        # guild_id : {lowercase role name : role_id}
+        return self.regions["rolepicker_roles"].data
+
+    @property
+    def votechannels(self):
+        # channel_id : voting_type
+        return self.regions["votechannels"].data
+
+    @property
+    def autoresponse(self):
+        # guild_id (str) : bool
+        return self.regions["autoresponse"].data
+
+    @property
+    def levelupmessage(self):
+        # guild_id (str) : bool
+        return self.regions["levelupmessage"].data
+
+    @property
+    def blacklist(self):
+        # user, guild, channel : set of ids, member : set of (guild_id, user_id),
+        # command : set of (guild_id, lowercase command name)
+        return self.regions["blacklist"].data
+
+    @property
+    def lastfm_users(self):
+        # user_id : lastfm_username, only users who have linked their account
+        return self.regions["lastfm_users"].data
+
+    @property
+    def lastfm_cheaters(self):
+        # lowercase lastfm_username : reason
+        return self.regions["lastfm_cheaters"].data
+
+    @property
+    def guild_settings(self):
+        # TTLCache of guild_id : GuildSettings
+        return self.regions["guild_settings"].data
+
     async def initialize_settings_cache(self):
-        prefixes = await self.bot.db.execute("SELECT guild_id, prefix FROM guild_prefix")
-        for guild_id, prefix in prefixes:
-            self.prefixes[str(guild_id)] = prefix
+        for region in self.regions.values():
+            await region.load()
+
+    def subscribe(self, region, callback):
+        """Call callback(key) whenever region changes, locally or in another process."""
+        self.listeners.setdefault(region, []).append(callback)
+
+    def changed(self, region, key=None, publish=True):
+        for callback in self.listeners.get(region, []):
+            try:
+                callback(key)
+            except Exception as e:
+                logger.error(f"Cache listener error for {region}: {e}")
+
+        if publish:
+            self.broker.publish({"origin": self.origin, "region": region, "key": key})
+
+    def on_broker_message(self, message):
+        if message["origin"] == self.origin:
+            return
 
-        self.rolepickers = set(
-            await self.bot.db.execute("SELECT channel_id FROM rolepicker_settings", as_list=True)
+        region = self.regions.get(message["region"])
+        if region is not None:
+            self.bot.loop.create_task(self.apply_remote_change(region, message["key"]))
+
+    async def apply_remote_change(self, region, key):
+        try:
+            await region.invalidate(key)
+        except Exception as e:
+            logger.error(f"Failed to reload cache region {region.name}: {e}")
+        else:
+            self.changed(region.name, key, publish=False)
+
+    async def write(self, region, statement, *params, key=None, update=None):
+        """
+        Write to the database and keep the region in sync.
+
+        :param region    : Name of the region the statement changes
+        :param key       : Key in the region that changed, None if unknown
+        :param update    : Function applying the same change to the region data.
+                           If not given the region is invalidated instead.
+        """
+        await self.bot.db.execute(statement, *params)
+        if update is not None:
+            update(self.regions[region].data)
+        else:
+            await self.regions[region].invalidate(key)
+        self.changed(region, key)
+
+    async def set_value(self, region, key, value, statement, *params):
+        def update(data):
+            data[key] = value
+
+        await self.write(region, statement, *params, key=key, update=update)
+
+    async def delete_value(self, region, key, statement, *params):
+        def update(data):
+            data.pop(key, None)
+
+        await self.write(region, statement, *params, key=key, update=update)
+
+    async def add_item(self, region, key, item, statement, *params):
+        """Add item to the set under key."""
+
+        def update(data):
+            data.setdefault(key, set()).add(item)
+
+        await self.write(region, statement, *params, key=key, update=update)
+
+    async def discard_item(self, region, key, item, statement, *params):
+        """Remove item from the set under key."""
+
+        def update(data):
+            data.get(key, set()).discard(item)
+
+        await self.write(region, statement, *params, key=key, update=update)
+
+    async def load_prefixes(self):
+        return {
+            str(guild_id): prefix
+            for guild_id, prefix in await self.bot.db.execute(
+                "SELECT guild_id, prefix FROM guild_prefix"
+            )
+        }
+
+    async def load_rolepickers(self):
+        return {
+            channel_id: bool(is_enabled)
+            for channel_id, is_enabled in await self.bot.db.execute(
+                "SELECT channel_id, is_enabled FROM rolepicker_settings WHERE channel_id IS NOT NULL"
+            )
+        }
+
+    async def load_rolepicker_roles(self):
+        roles = {}
+        for guild_id, role_name, role_id in await self.bot.db.execute(
+            "SELECT guild_id, role_name, role_id FROM rolepicker_role"
+        ):
+            roles.setdefault(guild_id, {})[role_name] = role_id
+        return roles
+
+    async def load_votechannels(self):
+        return {
+            channel_id: voting_type
+            for channel_id, voting_type in await self.bot.db.execute(
+                "SELECT channel_id, voting_type FROM voting_channel"
+            )
+        }
+
+    async def load_autoresponse(self):
+        return {
+            str(guild_id): autoresponses
+            for guild_id, autoresponses in await self.bot.db.execute(
+                "SELECT guild_id, autoresponses FROM guild_settings"
+            )
+        }
+
+    async def load_levelupmessage(self):
+        return {
+            str(guild_id): levelup_messages
+            for guild_id, levelup_messages in await self.bot.db.execute(
+                "SELECT guild_id, levelup_messages FROM guild_settings"
+            )
+        }
+
+    async def load_blacklist(self):
+        return {
+            "user": set(
+                await self.bot.db.execute("SELECT user_id FROM blacklisted_user", as_list=True)
+            ),
+            "guild": set(
+                await self.bot.db.execute("SELECT guild_id FROM blacklisted_guild", as_list=True)
+            ),
+            "channel": set(
+                await self.bot.db.execute(
+                    "SELECT channel_id FROM blacklisted_channel", as_list=True
+                )
+            ),
+            "member": set(
+                await self.bot.db.execute("SELECT guild_id, user_id FROM blacklisted_member")
+            ),
+            "command": set(
+                (guild_id, command_name.lower())
+                for guild_id, command_name in await self.bot.db.execute(
+                    "SELECT guild_id, command_name FROM blacklisted_command"
+                )
+            ),
+        }
+
+    async def load_lastfm_users(self):
+        return {
+            user_id: lastfm_username
+            for user_id, lastfm_username in await self.bot.db.execute(
+                "SELECT user_id, lastfm_username FROM user_settings WHERE lastfm_username IS NOT NULL"
+            )
+        }
+
+    async def load_lastfm_cheaters(self):
+        return {
+            lastfm_username.lower(): reason
+            for lastfm_username, reason in await self.bot.db.execute(
+                "SELECT lastfm_username, reason FROM lastfm_cheater"
+            )
+        }
+
+    def guild_lastfm_users(self, guild, filter_cheaters=False):
+        """
+        Linked Last.fm accounts of the members of a guild, from the gateway member cache.
+
+        :returns : List of (member, lastfm_username)
+        """
+        users = []
+        linked = self.lastfm_users
+        if len(linked) < guild.member_count:
+            for user_id, lastfm_username in linked.items():
+                member = guild.get_member(user_id)
+                if member is not None:
+                    users.append((member, lastfm_username))
+        else:
+            for member in guild.members:
+                lastfm_username = linked.get(member.id)
+                if lastfm_username is not None:
+                    users.append((member, lastfm_username))
+
+        if filter_cheaters:
+            cheaters = self.lastfm_cheaters
+            users = [user for user in users if user[1].lower() not in cheaters]
+        return users
+
+    def find_rolepicker_role(self, guild_id, name):
+        """
+        :param name : Role name, case insensitive
+        :returns    : (role_id, None) if found, otherwise (None, closest role name or None)
+        """
+        roles = self.rolepicker_roles.get(guild_id, {})
+        name = name.lower()
+        role_id = roles.get(name)
+        if role_id is not None:
+            return role_id, None
+
+        closest = difflib.get_close_matches(name, roles.keys(), n=1, cutoff=0.6)
+        return None, closest[0] if closest else None
+
+    async def get_guild_settings(self, guild_id):
+        """:returns : GuildSettings of given guild, loaded from the database on first use"""
+        return await self.regions["guild_settings"].get(guild_id)
+
+    def invalidate_guild_settings(self, guild_id):
+        """Call after changing any of the settings in GuildSettings."""
+        self.regions["guild_settings"].discard(guild_id)
+        self.changed("guild_settings", guild_id)
+
+    async def load_guild_settings(self, guild_id):
+        settings = GuildSettings()
+        logging = await self.bot.db.execute(
+            """
+            SELECT member_log_channel_id, ban_log_channel_id, message_log_channel_id
+            FROM logging_settings WHERE guild_id = %s
+            """,
+            guild_id,
+            one_row=True,
         )
+        if logging:
+            (
+                settings.member_log_channel_id,
+                settings.ban_log_channel_id,
+                settings.message_log_channel_id,
+            ) = logging
 
-        self.votechannels = set(
-            await self.bot.db.execute("SELECT channel_id FROM voting_channel", as_list=True)
+        greeter = await self.bot.db.execute(
+            "SELECT channel_id, is_enabled, message_format FROM greeter_settings WHERE guild_id = %s",
+            guild_id,
+            one_row=True,
         )
+        if greeter:
+            settings.greeter_channel_id, is_enabled, settings.greeter_format = greeter
+            settings.greeter_enabled = bool(is_enabled)
 
-        guild_settings = await self.bot.db.execute(
-            "SELECT guild_id, levelup_messages, autoresponses FROM guild_settings"
+        goodbye = await self.bot.db.execute(
+            "SELECT channel_id, is_enabled, message_format FROM goodbye_settings WHERE guild_id = %s",
+            guild_id,
+            one_row=True,
         )
-        for guild_id, levelup_messages, autoresponses in guild_settings:
-            self.autoresponse[str(guild_id)] = autoresponses
-            self.levelupmessage[str(guild_id)] = levelup_messages
-
-        self.blacklist = {
-            "global": {
-                "user": set(
-                    await self.bot.db.execute("SELECT user_id FROM blacklisted_user", as_list=True)
-                ),
-                "guild": set(
-                    await self.bot.db.execute(
-                        "SELECT guild_id FROM blacklisted_guild", as_list=True
-                    )
-                ),
-                "channel": set(
-                    await self.bot.db.execute(
-                        "SELECT channel_id FROM blacklisted_channel", as_list=True
-                    )
-                ),
-            }
-        }
+        if goodbye:
+            settings.goodbye_channel_id, is_enabled, settings.goodbye_format = goodbye
+            settings.goodbye_enabled = bool(is_enabled)
 
-        for guild_id, user_id in await self.bot.db.execute(
-            "SELECT guild_id, user_id FROM blacklisted_member"
-        ):
-            try:
-                self.blacklist[str(guild_id)]["member"].add(user_id)
-            except KeyError:
-                self.blacklist[str(guild_id)] = {"member": set([user_id]), "command": set()}
+        settings.autoroles = await self.bot.db.execute(
+            "SELECT role_id FROM autorole WHERE guild_id = %s", guild_id, as_list=True
+        )
+        settings.message_log_ignored = set(
+            await self.bot.db.execute(
+                "SELECT channel_id FROM message_log_ignore WHERE guild_id = %s",
+                guild_id,
+                as_list=True,
+            )
+        )
 
-        for guild_id, command_name in await self.bot.db.execute(
-            "SELECT guild_id, command_name FROM blacklisted_command"
-        ):
-            try:
-                self.blacklist[str(guild_id)]["command"].add(command_name.lower())
-            except KeyError:
-                self.blacklist[str(guild_id)] = {
-                    "member": set(),
-                    "command": set([command_name.lower()]),
-                }
+        starboard = await self.bot.db.execute(
+            """
+            SELECT is_enabled, channel_id, reaction_count, emoji_name, emoji_id, emoji_type
+            FROM starboard_settings WHERE guild_id = %s
+            """,
+            guild_id,
+            one_row=True,
+        )
+        if starboard:
+            (
+                is_enabled,
+                settings.starboard_channel_id,
+                settings.starboard_reaction_count,
+                settings.starboard_emoji_name,
+                settings.starboard_emoji_id,
+                settings.starboard_emoji_type,
+            ) = starboard
+            settings.starboard_enabled = bool(is_enabled)
+
+        return settings
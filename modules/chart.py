@@ -0,0 +1,151 @@
+import io
+import os
+import re
+import asyncio
+import functools
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+from modules import log
+from modules.blobstore import read_blob
+
+
+logger = log.get_logger(__name__)
+
+TILE_SIZE = 300
+FONT_SIZE = 16
+LINE_SPACING = 4
+LABEL_MARGIN = 5
+
+
+@functools.lru_cache(maxsize=8)
+def load_font(path, size):
+    """
+    Fonts are loaded once per worker process.
+    There is no fallback to Pillow's default font, it has no glyphs outside Latin-1.
+    """
+    return ImageFont.truetype(path, size)
+
+
+def wrap_label(line, font, max_width):
+    """
+    Splits a label line into lines that fit max_width pixels, like the HTML label wraps.
+    Breaks between words where possible, and anywhere in text without spaces (CJK).
+    """
+    lines = []
+    current = ""
+    for word in re.split(r"(?<= )", line):
+        if font.getlength(current + word) <= max_width:
+            current += word
+            continue
+
+        if current:
+            lines.append(current.rstrip())
+            current = ""
+        for character in word:
+            if current and font.getlength(current + character) > max_width:
+                lines.append(current)
+                current = ""
+            current += character
+    if current.strip() or not lines:
+        lines.append(current.rstrip())
+    return lines
+
+
+def compose_grid(covers, labels, width, height, font_path=None, quality=90):
+    """
+    Runs in a worker process.
+
+    :param covers : List of image file paths (or None for a blank tile), row by row
+    :param labels : List of label lines for every tile, or None to not draw labels
+    :returns      : JPEG file bytes of the width x height grid
+    """
+    chart = Image.new("RGB", (width * TILE_SIZE, height * TILE_SIZE), "black")
+    draw = ImageDraw.Draw(chart)
+    font = load_font(font_path, FONT_SIZE) if labels is not None else None
+    for i, path in enumerate(covers[: width * height]):
+        x = (i % width) * TILE_SIZE
+        y = (i // width) * TILE_SIZE
+        if path is not None:
+            try:
+                cover = Image.open(read_blob(path))
+                cover.draft("RGB", (TILE_SIZE, TILE_SIZE))
+                cover = ImageOps.fit(cover.convert("RGB"), (TILE_SIZE, TILE_SIZE))
+                chart.paste(cover, (x, y))
+            except Exception:
+                pass
+
+        if labels is not None and i < len(labels):
+            lines = [
+                wrapped
+                for line in labels[i]
+                for wrapped in wrap_label(line, font, TILE_SIZE - 2 * LABEL_MARGIN)
+            ]
+            line_height = FONT_SIZE + LINE_SPACING
+            text_y = y + TILE_SIZE - LABEL_MARGIN - line_height * len(lines)
+            for line in lines:
+                draw.text((x + LABEL_MARGIN + 1, text_y + 1), line, font=font, fill="black")
+                draw.text((x + LABEL_MARGIN, text_y), line, font=font, fill="white")
+                text_y += line_height
+
+    buffer = io.BytesIO()
+    chart.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+class ChartCompositor:
+    """
+    Draws image grid charts in the bot's process pool instead of a headless browser.
+
+    Covers are downloaded concurrently into the image store,
+    since the same covers show up in most people's charts.
+    Labels need a TrueType font covering the scripts in them (CHART_FONT, e.g. Noto Sans CJK),
+    without one only charts without labels are drawn here.
+
+        buffer = await compositor.render([(url, "label<br>second line"), ...], 3, 3)
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.font_path = os.environ.get("CHART_FONT") or None
+        if self.font_path is None:
+            logger.warning("CHART_FONT is not set, labeled charts use the HTML renderer")
+        else:
+            try:
+                load_font(self.font_path, FONT_SIZE)
+            except OSError as e:
+                logger.warning(
+                    f"Cannot load CHART_FONT {self.font_path} ({e}), "
+                    "labeled charts use the HTML renderer"
+                )
+                self.font_path = None
+        self.concurrency = int(os.environ.get("CHART_DOWNLOAD_CONCURRENCY", 32))
+
+    def can_render(self, show_labels=True):
+        return self.font_path is not None or not show_labels
+
+    async def cover(self, url, semaphore):
+        """:returns : Path of the cover in the image store, or None"""
+        if not url:
+            return None
+
+        async with semaphore:
+            return await self.bot.image_store.fetch(url)
+
+    async def render(self, chart_items, width, height, show_labels=True):
+        """
+        :param chart_items : List of (image url, label), where label lines are separated by <br>
+        :returns           : BytesIO of the JPEG chart
+        """
+        chart_items = chart_items[: width * height]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        covers = await asyncio.gather(*[self.cover(url, semaphore) for url, _ in chart_items])
+        labels = [label.split("<br>") for _, label in chart_items] if show_labels else None
+        data = await self.bot.loop.run_in_executor(
+            self.bot.process_pool,
+            compose_grid,
+            covers,
+            labels,
+            width,
+            height,
+            self.font_path,
+        )
+        return io.BytesIO(data)
@@ -0,0 +1,177 @@
+import os
+import uuid
+import hashlib
+import numpy as np
+from modules import log, ttlcache
+
+
+logger = log.get_logger(__name__)
+
+
+def srgb_to_lab(rgb):
+    """
+    Convert sRGB colours to CIELAB (D65 white point).
+
+    :param rgb : Array of shape (n, 3) with values 0-255
+    :returns   : float32 array of shape (n, 3)
+    """
+    c = np.asarray(rgb, dtype=np.float32) / 255
+    linear = np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+    xyz = linear @ np.array(
+        [
+            [0.4124, 0.2126, 0.0193],
+            [0.3576, 0.7152, 0.1192],
+            [0.1805, 0.0722, 0.9505],
+        ],
+        dtype=np.float32,
+    )
+    xyz /= np.array([0.95047, 1.0, 1.08883], dtype=np.float32)
+    f = np.where(xyz > 0.008856, np.cbrt(xyz), 7.787 * xyz + 16 / 116)
+    return np.stack(
+        [116 * f[:, 1] - 16, 500 * (f[:, 0] - f[:, 1]), 200 * (f[:, 1] - f[:, 2])], axis=1
+    ).astype(np.float32)
+
+
+class ColorIndex:
+    """
+    Nearest colour lookup over a set of images.
+
+    Colours are kept in one contiguous array, and any number of query colours
+    are answered in a single vectorized pass:
+
+        index = ColorIndex(image_ids, colors)
+        for query_results in index.knn([(255, 0, 0), (0, 0, 255)], 10):
+            for image_id, rgb, distance in query_results:
+                ...
+    """
+
+    def __init__(self, image_ids, colors, space="rgb"):
+        """
+        :param image_ids : List of image ids
+        :param colors    : List of (r, g, b) tuples, in the same order as the image ids
+        :param space     : Colour space to measure distance in, rgb or lab
+        """
+        if space not in ["rgb", "lab"]:
+            raise ValueError(f"Unknown colour space '{space}'")
+
+        self.image_ids = list(image_ids)
+        self.space = space
+        self.rgb = np.asarray(colors, dtype=np.uint8).reshape(-1, 3)
+        self.points = self.project(self.rgb)
+
+    def __len__(self):
+        return len(self.image_ids)
+
+    def project(self, rgb):
+        if self.space == "lab":
+            return srgb_to_lab(rgb)
+        return np.asarray(rgb, dtype=np.float32).reshape(-1, 3)
+
+    def knn(self, queries, k):
+        """
+        :param queries : List of (r, g, b) tuples to search for
+        :param k       : Amount of nearest images to return per query
+        :returns       : List of [(image_id, (r, g, b), distance)] per query, nearest first
+        """
+        k = min(k, len(self))
+        if k == 0:
+            return [[] for _ in queries]
+
+        targets = self.project(queries)
+        # squared distances of shape (queries, images)
+        distances = ((targets[:, np.newaxis, :] - self.points[np.newaxis, :, :]) ** 2).sum(axis=2)
+        if k < len(self):
+            nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            nearest = np.broadcast_to(np.arange(len(self)), distances.shape)
+
+        nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+        order = np.argsort(nearest_distances, axis=1)
+        nearest = np.take_along_axis(nearest, order, axis=1)
+        nearest_distances = np.sqrt(np.take_along_axis(nearest_distances, order, axis=1))
+
+        results = []
+        for indices, dists in zip(nearest.tolist(), nearest_distances.tolist()):
+            results.append(
+                [
+                    (self.image_ids[i], tuple(self.rgb[i].tolist()), dist)
+                    for i, dist in zip(indices, dists)
+                ]
+            )
+        return results
+
+
+class ColorIndexStore:
+    """
+    Colour index of every Last.fm user, kept in memory for a while and saved on disk,
+    so it's reused between calls and restarts without querying every album colour again.
+    An index is only used while it covers exactly the user's album set, so albums whose colour
+    could not be extracted are tried again on the next call.
+
+        index = await store.get(username, albums)
+        if index is None:
+            index = ColorIndex(image_ids, colors, space)
+            await store.put(username, index)
+    """
+
+    def __init__(self, bot, space="rgb"):
+        self.bot = bot
+        self.space = space
+        self.root = os.environ.get("COLOR_INDEX_PATH", "downloads/color_indexes")
+        self.memory_ttl = 60 * 60
+        self.memory = ttlcache.TTLCache(maxsize=100)
+
+    def path(self, username):
+        return os.path.join(self.root, hashlib.md5(username.lower().encode()).hexdigest() + ".npz")
+
+    async def get(self, username, albums):
+        """
+        :param albums : Frozenset of the album art ids of the user
+        :returns      : ColorIndex, or None if there is none for this album set
+        """
+        cached = self.memory.get(username.lower())
+        if cached is None:
+            try:
+                cached = await self.bot.loop.run_in_executor(None, self.read, username)
+            except Exception as e:
+                logger.warning(f"Could not read the colour index of {username}: {e}")
+                cached = None
+            if cached is None:
+                return None
+            self.memory.set(username.lower(), cached, self.memory_ttl)
+
+        cached_albums, index = cached
+        return index if cached_albums == albums else None
+
+    async def put(self, username, index):
+        albums = frozenset(index.image_ids)
+        self.memory.set(username.lower(), (albums, index), self.memory_ttl)
+        try:
+            await self.bot.loop.run_in_executor(None, self.write, username, index)
+        except OSError as e:
+            logger.warning(f"Could not save the colour index of {username}: {e}")
+
+    def read(self, username):
+        try:
+            data = np.load(self.path(username), allow_pickle=False)
+        except FileNotFoundError:
+            return None
+
+        with data:
+            if str(data["space"]) != self.space:
+                return None
+            index = ColorIndex(data["image_ids"].tolist(), data["rgb"], space=self.space)
+        return frozenset(index.image_ids), index
+
+    def write(self, username, index):
+        path = self.path(username)
+        os.makedirs(self.root, exist_ok=True)
+        temporary_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temporary_path, "wb") as file:
+            np.savez(
+                file,
+                space=np.array(index.space),
+                image_ids=np.array(index.image_ids, dtype=str),
+                rgb=index.rgb,
+            )
+        os.replace(temporary_path, path)
@@ -0,0 +1,136 @@
+import os
+import asyncio
+from time import time
+from modules import log, ratelimit
+
+
+logger = log.get_logger(__name__)
+
+
+class NotificationQueue:
+    """
+    Delivers keyword notification DMs in the background.
+
+    Notifications are queued by the message handler and sent by a few workers.
+    Every user gets their own token bucket, so one popular keyword can't make the bot
+    spam a single user's DMs, and notifications over the limit wait instead of
+    holding up a worker. All keyword hits for the same message and user are merged
+    into one DM as long as it has not been sent yet.
+
+    times_triggered counters are kept in memory and written in one batch every flush_interval.
+    """
+
+    def __init__(self, bot, send):
+        """
+        :param send : Coroutine function taking (user, message, highlights) that sends the DM
+        """
+        self.bot = bot
+        self.send = send
+        self.rate = float(os.environ.get("NOTIFICATION_DM_RATE", 0.2))
+        self.burst = int(os.environ.get("NOTIFICATION_DM_BURST", 5))
+        self.max_pending = int(os.environ.get("NOTIFICATION_QUEUE_SIZE", 10000))
+        self.flush_interval = float(os.environ.get("USAGE_FLUSH_INTERVAL", 60))
+        self.queue = asyncio.Queue()
+        # (message_id, user_id) : [user, message, highlights]
+        self.pending = {}
+        # user_id : TokenBucket
+        self.buckets = {}
+        # (guild_id, user_id, keyword) : times triggered
+        self.triggered = {}
+        self.sent = 0
+        self.dropped = 0
+        self.flush_lock = asyncio.Lock()
+        self.tasks = [
+            bot.loop.create_task(self.worker())
+            for _ in range(int(os.environ.get("NOTIFICATION_WORKERS", 4)))
+        ]
+        self.tasks.append(bot.loop.create_task(self.flush_loop()))
+
+    def add(self, user, message, highlights):
+        """Queue a notification, or merge the highlights into one already waiting."""
+        key = (message.id, user.id)
+        entry = self.pending.get(key)
+        if entry is not None:
+            entry[2].extend(highlights)
+            return
+
+        if len(self.pending) >= self.max_pending:
+            self.dropped += 1
+            return
+
+        self.pending[key] = [user, message, list(highlights)]
+        self.queue.put_nowait(key)
+
+    def count(self, guild_id, user_id, keyword):
+        key = (guild_id, user_id, keyword)
+        self.triggered[key] = self.triggered.get(key, 0) + 1
+
+    async def worker(self):
+        while True:
+            key = await self.queue.get()
+            user_id = key[1]
+            bucket = self.buckets.get(user_id)
+            if bucket is None:
+                bucket = ratelimit.TokenBucket(self.rate, self.burst)
+                self.buckets[user_id] = bucket
+
+            delay = bucket.delay()
+            if delay > 0:
+                # come back to this one later, the worker is free to send to other users meanwhile
+                self.bot.loop.call_later(delay, self.queue.put_nowait, key)
+                continue
+
+            bucket.consume()
+            user, message, highlights = self.pending.pop(key)
+            try:
+                await self.send(user, message, highlights)
+                self.sent += 1
+            except Exception as e:
+                logger.error(f"Failed to send notification to {user} : {e}")
+
+    def prune_buckets(self):
+        """Forget users whose bucket has filled up again, they are the same as a new bucket."""
+        for user_id, bucket in list(self.buckets.items()):
+            if bucket.delay() == 0 and bucket.tokens >= bucket.capacity:
+                del self.buckets[user_id]
+
+    async def flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.prune_buckets()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Notification counter flush error: {e}")
+
+    async def flush(self):
+        async with self.flush_lock:
+            if not self.triggered:
+                return
+
+            triggered = self.triggered
+            self.triggered = {}
+            start = time()
+            try:
+                await self.bot.db.executemany(
+                    """
+                    UPDATE notification
+                        SET times_triggered = times_triggered + %s
+                    WHERE guild_id = %s AND user_id = %s AND keyword = %s
+                    """,
+                    [(times,) + key for key, times in triggered.items()],
+                )
+            except Exception:
+                for key, times in triggered.items():
+                    self.triggered[key] = self.triggered.get(key, 0) + times
+                raise
+
+            logger.info(
+                f"Saved {sum(triggered.values())} notification triggers "
+                f"({len(triggered)} rows) in {time()-start:.3f}s"
+            )
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+        await self.flush()
@@ -0,0 +1,217 @@
+import os
+import asyncio
+import aiohttp
+from collections import deque
+from time import time
+from yarl import URL
+from modules import log
+
+
+logger = log.get_logger(__name__)
+
+
+def parse_host_settings(value, cast=int):
+    """
+    :param value : String in the format of "host:value,host:value"
+    :param cast  : Function to convert the value with
+    :returns     : Dictionary of {host : value}
+    """
+    settings = {}
+    if not value:
+        return settings
+
+    for item in value.split(","):
+        host, _, setting = item.strip().rpartition(":")
+        if host == "":
+            continue
+        try:
+            settings[host.lower()] = cast(setting)
+        except ValueError:
+            logger.warning(f"Ignoring invalid host setting '{item}'")
+
+    return settings
+
+
+class HostStats:
+    """Request statistics for a single remote host."""
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+        self.latencies = deque(maxlen=200)
+
+    def latency(self, percentile=50):
+        """Request latency in milliseconds for given percentile of recent requests."""
+        if not self.latencies:
+            return 0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[index] * 1000
+
+    def reuse_ratio(self):
+        total = self.new_connections + self.reused_connections
+        if total == 0:
+            return 0
+        return self.reused_connections / total
+
+
+class _RequestContextManager:
+    """Async context manager that waits for a free host slot before making the request."""
+
+    def __init__(self, client, method, url, kwargs):
+        self.client = client
+        self.method = method
+        self.url = url
+        self.kwargs = kwargs
+        self.host = (URL(str(url)).host or "").lower()
+        self.semaphore = None
+        self.request = None
+
+    async def __aenter__(self):
+        stats = self.client.stats_for(self.host)
+        self.semaphore = self.client.semaphore_for(self.host)
+        if self.semaphore is not None:
+            await self.semaphore.acquire()
+
+        stats.in_flight += 1
+        stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+        try:
+            timeout = self.client.timeout_for(self.host)
+            if timeout is not None:
+                self.kwargs.setdefault("timeout", timeout)
+            self.request = self.client.session.request(self.method, self.url, **self.kwargs)
+            return await self.request.__aenter__()
+        except BaseException:
+            self.release()
+            raise
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            await self.request.__aexit__(exc_type, exc, tb)
+        finally:
+            self.release()
+
+    def release(self):
+        self.client.stats_for(self.host).in_flight -= 1
+        if self.semaphore is not None:
+            self.semaphore.release()
+            self.semaphore = None
+
+
+class HttpClient:
+    """
+    Bot wide HTTP client.
+
+    All outgoing requests share one connection pool, so connections are kept alive
+    and DNS lookups are cached between commands. Usage is the same as aiohttp.ClientSession:
+
+        async with bot.session.get(url, params=params) as response:
+            data = await response.json()
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._session = None
+        self.pool_size = int(os.environ.get("HTTP_POOL_SIZE", 100))
+        self.pool_size_per_host = int(os.environ.get("HTTP_POOL_SIZE_PER_HOST", 20))
+        self.dns_cache_ttl = int(os.environ.get("HTTP_DNS_CACHE_TTL", 300))
+        self.keepalive_timeout = float(os.environ.get("HTTP_KEEPALIVE_TIMEOUT", 30))
+        self.default_timeout = float(os.environ.get("HTTP_TIMEOUT", 30))
+        self.host_limits = parse_host_settings(os.environ.get("HTTP_HOST_LIMITS"), int)
+        self.host_timeouts = parse_host_settings(os.environ.get("HTTP_HOST_TIMEOUTS"), float)
+        self.semaphores = {}
+        self.stats = {}
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            self._session = self.create_session()
+        return self._session
+
+    def create_session(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.pool_size_per_host,
+            ttl_dns_cache=self.dns_cache_ttl,
+            use_dns_cache=True,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self.on_request_start)
+        trace_config.on_request_end.append(self.on_request_end)
+        trace_config.on_request_exception.append(self.on_request_exception)
+        trace_config.on_connection_create_end.append(self.on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(self.on_connection_reuseconn)
+        logger.info(
+            f"Created HTTP connection pool with {self.pool_size} connections "
+            f"({self.pool_size_per_host} per host)"
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.default_timeout),
+            trace_configs=[trace_config],
+        )
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("Closed HTTP connection pool")
+
+    def stats_for(self, host):
+        try:
+            return self.stats[host]
+        except KeyError:
+            stats = HostStats(self.host_limits.get(host))
+            self.stats[host] = stats
+            return stats
+
+    def semaphore_for(self, host):
+        limit = self.host_limits.get(host)
+        if limit is None:
+            return None
+        try:
+            return self.semaphores[host]
+        except KeyError:
+            semaphore = asyncio.Semaphore(limit)
+            self.semaphores[host] = semaphore
+            return semaphore
+
+    def timeout_for(self, host):
+        timeout = self.host_timeouts.get(host)
+        if timeout is None:
+            return None
+        return aiohttp.ClientTimeout(total=timeout)
+
+    def request(self, method, url, **kwargs):
+        return _RequestContextManager(self, method, url, kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    async def on_request_start(self, _session, trace_config_ctx, params):
+        trace_config_ctx.host = (params.url.host or "").lower()
+        trace_config_ctx.start = time()
+
+    async def on_request_end(self, _session, trace_config_ctx, params):
+        stats = self.stats_for(trace_config_ctx.host)
+        stats.requests += 1
+        stats.latencies.append(time() - trace_config_ctx.start)
+
+    async def on_request_exception(self, _session, trace_config_ctx, params):
+        stats = self.stats_for(trace_config_ctx.host)
+        stats.requests += 1
+        stats.errors += 1
+
+    async def on_connection_create_end(self, _session, trace_config_ctx, params):
+        self.stats_for(trace_config_ctx.host).new_connections += 1
+
+    async def on_connection_reuseconn(self, _session, trace_config_ctx, params):
+        self.stats_for(trace_config_ctx.host).reused_connections += 1
@@ -0,0 +1,171 @@
+import os
+import asyncio
+import colorgram
+from PIL import Image
+from modules import log, ttlcache
+from modules.blobstore import content_addressed, image_key, read_blob
+
+
+logger = log.get_logger(__name__)
+
+THUMBNAIL_SIZE = (64, 64)
+
+
+def dominant_color(path):
+    """
+    Runs in a worker process.
+
+    :param path : Path of the image file in the image store
+    :returns    : (r, g, b) of the most dominant colour, None if the image can't be read
+    """
+    try:
+        image = Image.open(read_blob(path))
+        image.draft("RGB", THUMBNAIL_SIZE)
+        image = image.convert("RGB")
+        image.thumbnail(THUMBNAIL_SIZE)
+        color = colorgram.extract(image, 1)[0].rgb
+    except Exception:
+        return None
+
+    return color.r, color.g, color.b
+
+
+class ColorExtractionPipeline:
+    """
+    Downloads images with bounded concurrency and extracts their dominant colours
+    in the bot's process pool, so decoding never blocks the event loop.
+
+    Finished colours are handed to store_batch in batches while the rest are still being
+    processed. Cancelling the task running the pipeline cancels all pending work.
+    """
+
+    def __init__(self, bot, store_batch):
+        """
+        :param store_batch : Coroutine function taking a list of (image_id, (r, g, b))
+        """
+        self.bot = bot
+        self.store_batch = store_batch
+        self.concurrency = int(os.environ.get("COLOR_DOWNLOAD_CONCURRENCY", 16))
+        self.batch_size = int(os.environ.get("COLOR_BATCH_SIZE", 100))
+
+    async def run(self, images):
+        """
+        :param images : Dictionary of {image_id : [urls to try in order]}
+        :returns      : List of (image_id, (r, g, b)) for every image that succeeded
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def process(image_id, urls):
+            # the semaphore covers decoding too, so only a bounded amount of images is in memory
+            async with semaphore:
+                path = await self.bot.image_store.fetch(*urls)
+                if path is None:
+                    return image_id, None
+                color = await self.bot.loop.run_in_executor(
+                    self.bot.process_pool, dominant_color, path
+                )
+                return image_id, color
+
+        tasks = [
+            asyncio.ensure_future(process(image_id, urls)) for image_id, urls in images.items()
+        ]
+        results = []
+        batch = []
+        try:
+            for next_finished in asyncio.as_completed(tasks):
+                image_id, color = await next_finished
+                if color is None:
+                    continue
+
+                results.append((image_id, color))
+                batch.append((image_id, color))
+                if len(batch) >= self.batch_size:
+                    await self.store_batch(batch)
+                    batch = []
+
+            if batch:
+                await self.store_batch(batch)
+        except asyncio.CancelledError:
+            if batch:
+                # keep what we already paid for
+                self.bot.loop.create_task(self.store_batch(batch))
+            raise
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        return results
+
+
+class ColorCache:
+    """
+    Dominant colours of images, shared by the whole bot.
+
+    Lookups go through a size bounded in-process LRU first, then the image_color_cache table,
+    and only then download the image and extract the colour in the process pool.
+    Images that could not be read are remembered for a while so broken urls
+    are not downloaded again for every embed.
+    Only content addressed images are saved to image_color_cache, anything else can change
+    behind its url, so it is kept in memory for ttl.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.memory = ttlcache.TTLCache(maxsize=int(os.environ.get("COLOR_CACHE_SIZE", 10000)))
+        self.ttl = 24 * 60 * 60
+        self.negative_ttl = 10 * 60
+        self.extracted = 0
+        self.failed = 0
+
+    async def get(self, url):
+        """:returns : (r, g, b) of the most dominant colour in the image, None if it failed"""
+        if not url or not str(url).strip():
+            return None
+
+        url = str(url)
+        key = image_key(url)
+        cached = self.memory.get(key)
+        if cached is not None:
+            # empty tuple marks a failed image
+            return cached or None
+
+        return await self.memory.coalesce(key, self.lookup, key, url)
+
+    async def lookup(self, key, url):
+        stored = content_addressed(url)
+        row = None
+        if stored:
+            row = await self.bot.db.execute(
+                "SELECT r, g, b FROM image_color_cache WHERE image_hash = %s",
+                key,
+                one_row=True,
+            )
+        if row:
+            color = tuple(row)
+        else:
+            color = await self.extract(url)
+            if color is None:
+                self.failed += 1
+                self.memory.set(key, (), self.negative_ttl)
+                return None
+
+            self.extracted += 1
+            r, g, b = color
+            if stored:
+                await self.bot.db.execute(
+                    "INSERT IGNORE image_color_cache (image_hash, r, g, b, hex) VALUES (%s, %s, %s, %s, %s)",
+                    key,
+                    r,
+                    g,
+                    b,
+                    "{:02x}{:02x}{:02x}".format(r, g, b),
+                )
+
+        self.memory.set(key, color, self.ttl)
+        return color
+
+    async def extract(self, url):
+        path = await self.bot.image_store.fetch(url)
+        if path is None:
+            return None
+        return await self.bot.loop.run_in_executor(self.bot.process_pool, dominant_color, path)
@@ -0,0 +1,152 @@
+KEYWORD_PREFIX_CHARACTERS = "~*`_/"
+
+
+class _Node:
+    __slots__ = ("children", "fail", "output", "keyword")
+
+    def __init__(self):
+        self.children = {}
+        self.fail = None
+        # next node on the fail chain that ends a keyword
+        self.output = None
+        self.keyword = None
+
+
+def lowercase(text):
+    """Lowercase text while keeping every character at the same index."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+def is_word_boundary(text, start, end):
+    """
+    Same rules as the regex (?:^|\\s|[~*`_\\/])keyword(?:$|\\W)
+    """
+    if start > 0:
+        before = text[start - 1]
+        if not (before.isspace() or before in KEYWORD_PREFIX_CHARACTERS):
+            return False
+    if end < len(text):
+        after = text[end]
+        if after.isalnum() or after == "_":
+            return False
+    return True
+
+
+class KeywordMatcher:
+    """
+    Case insensitive multi keyword matcher (Aho-Corasick).
+
+    Finds every subscribed keyword in a text with one pass over it,
+    no matter how many keywords there are.
+
+        matcher.add("miso", user_id)
+        for keyword, spans in matcher.match(message.content).items():
+            for original_keyword, user_id in matcher.subscribers[keyword]:
+                ...
+
+    Adding and removing keywords is cheap, the fail links are rebuilt lazily
+    on the next match after a change.
+    """
+
+    def __init__(self):
+        self.root = _Node()
+        # lowercase keyword : set of (keyword as written, user_id)
+        self.subscribers = {}
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.subscribers)
+
+    def add(self, keyword, user_id):
+        key = lowercase(keyword)
+        if not key:
+            return
+
+        if key not in self.subscribers:
+            node = self.root
+            for char in key:
+                child = node.children.get(char)
+                if child is None:
+                    child = _Node()
+                    node.children[char] = child
+                node = child
+            node.keyword = key
+            self.subscribers[key] = set()
+            self.dirty = True
+
+        self.subscribers[key].add((keyword, user_id))
+
+    def remove(self, keyword, user_id):
+        key = lowercase(keyword)
+        users = self.subscribers.get(key)
+        if users is None:
+            return
+
+        users.discard((keyword, user_id))
+        if users:
+            return
+
+        del self.subscribers[key]
+        node = self.root
+        for char in key:
+            node = node.children[char]
+        node.keyword = None
+        self.dirty = True
+
+    def build(self):
+        """Compute fail and output links breadth first."""
+        self.root.fail = self.root
+        self.root.output = None
+        queue = []
+        for child in self.root.children.values():
+            child.fail = self.root
+            child.output = None
+            queue.append(child)
+
+        i = 0
+        while i < len(queue):
+            node = queue[i]
+            i += 1
+            for char, child in node.children.items():
+                fail = node.fail
+                while fail is not self.root and char not in fail.children:
+                    fail = fail.fail
+                target = fail.children.get(char)
+                child.fail = target if target is not None and target is not child else self.root
+                child.output = child.fail if child.fail.keyword is not None else child.fail.output
+                queue.append(child)
+
+        self.dirty = False
+
+    def match(self, text):
+        """
+        :param text : Text to search
+        :returns    : Dictionary of {lowercase keyword : [(start, end)]} of whole word matches
+        """
+        if not self.subscribers:
+            return {}
+
+        if self.dirty:
+            self.build()
+
+        lowered = lowercase(text)
+        matches = {}
+        root = self.root
+        node = root
+        for i, char in enumerate(lowered):
+            while node is not root and char not in node.children:
+                node = node.fail
+            node = node.children.get(char, root)
+
+            found = node if node.keyword is not None else node.output
+            while found is not None:
+                end = i + 1
+                start = end - len(found.keyword)
+                if is_word_boundary(lowered, start, end):
+                    matches.setdefault(found.keyword, []).append((start, end))
+                found = found.output
+
+        return matches
@@ -0,0 +1,449 @@
+import os
+import asyncio
+import itertools
+from bisect import bisect_left, insort
+from time import time
+from modules import log
+
+
+logger = log.get_logger(__name__)
+
+
+class RankedSet:
+    """
+    Members ordered by score, highest first, with fast rank lookups.
+
+    Members are kept as (-score, member) keys in a list of small sorted buckets. Finding a
+    position is a binary search over the bucket maxes and then inside one bucket, and the
+    bucket offsets are a prefix sum that is only rebuilt when a lookup follows a change.
+
+        board = RankedSet.from_items([(user_id, xp, message_count), ...])
+        board.rank(user_id)
+        for user_id, xp, message_count in board: ...
+
+    Tied members share the same rank, like RANK() in SQL.
+    """
+
+    bucket_size = 512
+
+    def __init__(self):
+        # member : score
+        self.scores = {}
+        # member : anything shown next to the score
+        self.data = {}
+        self.buckets = []
+        self.maxes = []
+        self.offsets = None
+
+    @classmethod
+    def from_items(cls, items):
+        """:param items : Iterable of (member, score, data)"""
+        ranked = cls()
+        keys = []
+        for member, score, data in items:
+            ranked.scores[member] = score
+            ranked.data[member] = data
+            keys.append((-score, member))
+
+        keys.sort()
+        ranked.buckets = [
+            keys[i : i + cls.bucket_size] for i in range(0, len(keys), cls.bucket_size)
+        ]
+        ranked.maxes = [bucket[-1] for bucket in ranked.buckets]
+        return ranked
+
+    def __len__(self):
+        return len(self.scores)
+
+    def __contains__(self, member):
+        return member in self.scores
+
+    def __iter__(self):
+        """Yields (member, score, data) from the highest score down."""
+        for bucket in self.buckets:
+            for _, member in bucket:
+                yield member, self.scores[member], self.data[member]
+
+    def score(self, member, default=None):
+        return self.scores.get(member, default)
+
+    def set(self, member, score, data=None):
+        if member in self.scores:
+            self._remove_key((-self.scores[member], member))
+        self.scores[member] = score
+        self.data[member] = data
+        self._insert_key((-score, member))
+
+    def discard(self, member):
+        if member in self.scores:
+            self._remove_key((-self.scores.pop(member), member))
+            del self.data[member]
+
+    def rank(self, member):
+        """:returns : 1 + the amount of members with a higher score, or None if not ranked"""
+        score = self.scores.get(member)
+        if score is None:
+            return None
+        return self._position((-score,)) + 1
+
+    def top(self, amount):
+        """:returns : List of (member, score, data) for the highest amount of members"""
+        return list(itertools.islice(self, amount))
+
+    def _position(self, key):
+        """Amount of keys that sort before key."""
+        i = bisect_left(self.maxes, key)
+        if i == len(self.buckets):
+            return len(self.scores)
+        if self.offsets is None:
+            self.offsets = [0] + list(itertools.accumulate(len(b) for b in self.buckets))
+        return self.offsets[i] + bisect_left(self.buckets[i], key)
+
+    def _insert_key(self, key):
+        self.offsets = None
+        if not self.buckets:
+            self.buckets.append([key])
+            self.maxes.append(key)
+            return
+
+        i = min(bisect_left(self.maxes, key), len(self.buckets) - 1)
+        bucket = self.buckets[i]
+        insort(bucket, key)
+        self.maxes[i] = bucket[-1]
+        if len(bucket) > 2 * self.bucket_size:
+            half = len(bucket) // 2
+            self.buckets[i : i + 1] = [bucket[:half], bucket[half:]]
+            self.maxes[i : i + 1] = [bucket[half - 1], bucket[-1]]
+
+    def _remove_key(self, key):
+        self.offsets = None
+        i = bisect_left(self.maxes, key)
+        bucket = self.buckets[i]
+        del bucket[bisect_left(bucket, key)]
+        if bucket:
+            self.maxes[i] = bucket[-1]
+        else:
+            del self.buckets[i]
+            del self.maxes[i]
+
+
+class Leaderboards:
+    """
+    All the leaderboards of the bot, kept in memory and updated as the data is written.
+
+    Boards are RankedSets keyed by (name, guild_id), where guild_id 0 is the global board.
+    Activity boards are named after their activity table and exist for every guild,
+    while fishy and wpm only have a global board and crowns only have guild boards.
+
+        board = await bot.leaderboards.get("user_activity_week", guild.id)
+
+    Everything is loaded from the database once on startup, and until that is done boards
+    are read from the database on every call. The day, week and month tables are cleared
+    outside of the bot, so their boards are reloaded every reload_interval, and all the
+    activity boards are resynced every resync_interval in case a write was missed.
+    """
+
+    activity_tables = [
+        "user_activity",
+        "user_activity_day",
+        "user_activity_week",
+        "user_activity_month",
+        "user_activity_year",
+    ]
+    timeframe_tables = ["user_activity_day", "user_activity_week", "user_activity_month"]
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.reload_interval = float(os.environ.get("LEADERBOARD_RELOAD_INTERVAL", 300))
+        self.resync_interval = float(os.environ.get("LEADERBOARD_RESYNC_INTERVAL", 3600))
+        # (name, guild_id) : RankedSet
+        self.boards = {}
+        self.ready = asyncio.Event()
+        # held while activity is written and applied, so no write is halfway through
+        # when a reload takes its database snapshot
+        self.lock = asyncio.Lock()
+        # activity added while reloads are running, replayed onto the reloaded boards
+        self.journals = []
+        self.task = bot.loop.create_task(self.run())
+
+    async def get(self, name, guild_id=0):
+        """:returns : The board, or an empty one if there is nothing on it yet"""
+        if not self.ready.is_set():
+            return RankedSet.from_items(await self.query(name, guild_id))
+
+        board = self.boards.get((name, guild_id))
+        if board is None:
+            return RankedSet()
+        return board
+
+    async def rank(self, name, guild_id, member):
+        """:returns : (rank, members on the board), or None if member is not on it"""
+        if not self.ready.is_set() and name in self.activity_tables:
+            return await self.query_activity_rank(name, guild_id, member)
+
+        board = await self.get(name, guild_id)
+        rank = board.rank(member)
+        return None if rank is None else (rank, len(board))
+
+    def board(self, name, guild_id=0):
+        """:returns : The board, created if it does not exist"""
+        key = (name, guild_id)
+        board = self.boards.get(key)
+        if board is None:
+            board = RankedSet()
+            self.boards[key] = board
+        return board
+
+    def replace(self, name, boards):
+        """Swap in freshly loaded boards, dropping every old board with this name."""
+        for key in [key for key in self.boards if key[0] == name]:
+            del self.boards[key]
+        for guild_id, board in boards.items():
+            self.boards[(name, guild_id)] = board
+
+    async def run(self):
+        while True:
+            try:
+                await self.load_all()
+                break
+            except Exception as e:
+                logger.error(f"Failed to load leaderboards: {e}")
+                await asyncio.sleep(self.reload_interval)
+
+        resync_every = max(1, round(self.resync_interval / self.reload_interval))
+        for reloads in itertools.count(1):
+            await asyncio.sleep(self.reload_interval)
+            if reloads % resync_every == 0:
+                tables = self.activity_tables
+            else:
+                tables = self.timeframe_tables
+            try:
+                await self.reload_activity(tables)
+            except Exception as e:
+                logger.error(f"Failed to reload {', '.join(tables)} leaderboards: {e}")
+
+    async def load_all(self):
+        start = time()
+        await self.reload_activity(self.activity_tables)
+        await self.load_fishy()
+        await self.load_wpm()
+        await self.load_crowns()
+        self.ready.set()
+        logger.info(f"Loaded {len(self.boards)} leaderboards in {time()-start:.3f}s")
+
+    async def reload_activity(self, tables):
+        """
+        Reload the boards of the given activity tables without blocking activity writes.
+
+        The tables are read in one database snapshot, taken under the lock so that every write
+        is either in it or journaled. The journaled activity is added onto the new boards
+        in the same step as they are swapped in.
+        """
+        journal = []
+        async with self.bot.db.snapshot() as snapshot:
+            async with self.lock:
+                await snapshot.begin()
+                self.journals.append(journal)
+            try:
+                loaded = {table: await self.read_activity(snapshot, table) for table in tables}
+            except Exception:
+                self.journals.remove(journal)
+                raise
+
+        self.journals.remove(journal)
+        for table, boards in loaded.items():
+            self.replace(table, boards)
+        for table, rows, user_rows in journal:
+            if table in loaded:
+                self.apply_activity(table, rows, user_rows)
+
+    async def read_activity(self, db, table):
+        """:returns : Dictionary of {guild_id : RankedSet} of the activity table"""
+        per_guild = {}
+        for guild_id, user_id, xp, message_count in await db.execute(
+            f"SELECT guild_id, user_id, xp, message_count FROM {table} WHERE NOT is_bot"
+        ):
+            per_guild.setdefault(guild_id, []).append((user_id, xp, message_count))
+
+        boards = {guild_id: RankedSet.from_items(items) for guild_id, items in per_guild.items()}
+        boards[0] = RankedSet.from_items(
+            await db.execute(
+                """
+                SELECT user_id, xp, message_count FROM user_xp_global
+                WHERE activity_table = %s AND NOT is_bot
+                """,
+                table,
+            )
+        )
+        return boards
+
+    async def load_fishy(self):
+        self.replace("fishy", {0: RankedSet.from_items(await self.query("fishy", 0))})
+
+    async def load_wpm(self):
+        self.replace("wpm", {0: RankedSet.from_items(await self.query("wpm", 0))})
+
+    async def load_crowns(self):
+        per_guild = {}
+        for guild_id, user_id, amount in await self.bot.db.execute(
+            "SELECT guild_id, user_id, COUNT(1) FROM artist_crown GROUP BY guild_id, user_id"
+        ):
+            per_guild.setdefault(guild_id, []).append((user_id, amount, None))
+
+        self.replace(
+            "crowns",
+            {guild_id: RankedSet.from_items(items) for guild_id, items in per_guild.items()},
+        )
+
+    async def query(self, name, guild_id):
+        """:returns : List of (member, score, data) of one board, read from the database"""
+        if name in self.activity_tables:
+            if guild_id == 0:
+                return await self.bot.db.execute(
+                    """
+                    SELECT user_id, xp, message_count FROM user_xp_global
+                    WHERE activity_table = %s AND NOT is_bot
+                    """,
+                    name,
+                )
+            return await self.bot.db.execute(
+                f"""
+                SELECT user_id, xp, message_count FROM {name}
+                WHERE guild_id = %s AND NOT is_bot
+                """,
+                guild_id,
+            )
+
+        elif name == "fishy":
+            return await self.bot.db.execute(
+                "SELECT user_id, fishy_count, NULL FROM fishy WHERE fishy_count > 0"
+            )
+
+        elif name == "wpm":
+            # the date and word count of each user's best run
+            data = await self.bot.db.execute(
+                """
+                SELECT user_id, wpm, test_date, word_count FROM (
+                    SELECT user_id, wpm, test_date, word_count, ROW_NUMBER() OVER(
+                        PARTITION BY user_id ORDER BY wpm DESC, test_date
+                    ) AS user_rank
+                    FROM typing_stats
+                ) AS best
+                WHERE user_rank = 1
+                """
+            )
+            return [
+                (user_id, wpm, (test_date, word_count))
+                for user_id, wpm, test_date, word_count in data
+            ]
+
+        elif name == "crowns":
+            return await self.bot.db.execute(
+                """
+                SELECT user_id, COUNT(1), NULL FROM artist_crown
+                WHERE guild_id = %s GROUP BY user_id
+                """,
+                guild_id,
+            )
+
+        return []
+
+    async def query_activity_rank(self, table, guild_id, member):
+        """:returns : (rank, members on the board) counted from the xp index, or None"""
+        if guild_id == 0:
+            total, rank = (
+                await self.bot.db.execute(
+                    """
+                    SELECT
+                        (SELECT COUNT(*) FROM user_xp_global
+                            WHERE activity_table = %s AND NOT is_bot),
+                        (SELECT COUNT(*) + 1 FROM user_xp_global
+                            WHERE activity_table = %s AND NOT is_bot AND xp > me.xp)
+                    FROM user_xp_global me
+                    WHERE activity_table = %s AND user_id = %s AND NOT is_bot
+                    """,
+                    table,
+                    table,
+                    table,
+                    member,
+                    one_row=True,
+                )
+                or (None, None)
+            )
+        else:
+            total, rank = (
+                await self.bot.db.execute(
+                    f"""
+                    SELECT
+                        (SELECT COUNT(*) FROM {table}
+                            WHERE guild_id = %s AND NOT is_bot),
+                        (SELECT COUNT(*) + 1 FROM {table}
+                            WHERE guild_id = %s AND NOT is_bot AND xp > me.xp)
+                    FROM {table} me
+                    WHERE guild_id = %s AND user_id = %s AND NOT is_bot
+                    """,
+                    guild_id,
+                    guild_id,
+                    guild_id,
+                    member,
+                    one_row=True,
+                )
+                or (None, None)
+            )
+
+        if rank is None or total is None:
+            return None
+        return int(rank), total
+
+    def add_activity(self, table, rows, user_rows):
+        """
+        :param rows      : List of (guild_id, user_id, is_bot, xp, messages) that were written
+        :param user_rows : List of (user_id, is_bot, xp, messages) summed over all guilds
+        """
+        self.apply_activity(table, rows, user_rows)
+        for journal in self.journals:
+            journal.append((table, rows, user_rows))
+
+    def apply_activity(self, table, rows, user_rows):
+        for guild_id, user_id, is_bot, xp, messages in rows:
+            if not is_bot:
+                increment(self.board(table, guild_id), user_id, xp, messages)
+
+        board = self.board(table)
+        for user_id, is_bot, xp, messages in user_rows:
+            if not is_bot:
+                increment(board, user_id, xp, messages)
+
+    def add_fishy(self, user_id, amount):
+        board = self.board("fishy")
+        fishy_count = board.score(user_id, 0) + amount
+        if fishy_count > 0:
+            board.set(user_id, fishy_count)
+        else:
+            board.discard(user_id)
+
+    def add_wpm(self, user_id, wpm, test_date, word_count):
+        board = self.board("wpm")
+        if wpm > board.score(user_id, 0):
+            board.set(user_id, wpm, (test_date, word_count))
+
+    def clear_wpm(self, user_id):
+        self.board("wpm").discard(user_id)
+
+    def move_crown(self, guild_id, old_user_id, new_user_id):
+        """:param old_user_id : Previous holder of the crown, or None if it's a new crown"""
+        if old_user_id == new_user_id:
+            return
+
+        board = self.board("crowns", guild_id)
+        if old_user_id is not None and old_user_id in board:
+            remaining = board.score(old_user_id) - 1
+            if remaining > 0:
+                board.set(old_user_id, remaining)
+            else:
+                board.discard(old_user_id)
+        board.set(new_user_id, board.score(new_user_id, 0) + 1)
+
+
+def increment(board, member, score, messages):
+    board.set(member, board.score(member, 0) + score, (board.data.get(member) or 0) + messages)
@@ -39,9 +39,7 @@ class MariaDB:
             f"Connecting to database {cred['db']} on {cred['host']}:{cred['port']} as {cred['user']}"
         )
         maxsize = int(os.environ.get("DB_POOL_SIZE", 10))
-        self.pool = await aiomysql.create_pool(
-            **cred, maxsize=maxsize, autocommit=True, echo=False
-        )
+        self.pool = await aiomysql.create_pool(**cred, maxsize=maxsize, autocommit=True, echo=False)
         logger.info(f"Initialized MariaDB connection pool with {maxsize} connections")
 
     async def cleanup(self):
@@ -81,3 +79,48 @@ class MariaDB:
             return ()
         else:
             raise exceptions.Error("Could not connect to the local MariaDB instance!")
+
+    def snapshot(self):
+        """
+        Connection for reading several statements from one consistent point in time.
+
+            async with bot.db.snapshot() as snapshot:
+                await snapshot.begin()
+                data = await snapshot.execute("SELECT ...")
+        """
+        return Snapshot(self)
+
+
+class Snapshot:
+    """
+    Holds one pooled connection, reading in a consistent snapshot transaction once begin()
+    is called. The snapshot is taken in begin(), so the caller decides which writes it sees.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.acquired = None
+        self.connection = None
+
+    async def __aenter__(self):
+        if not await self.db.wait_for_pool():
+            raise exceptions.Error("Could not connect to the local MariaDB instance!")
+
+        self.acquired = self.db.pool.acquire()
+        self.connection = await self.acquired.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        try:
+            await self.connection.rollback()
+        finally:
+            await self.acquired.__aexit__(exc_type, exc, traceback)
+
+    async def begin(self):
+        async with self.connection.cursor() as cur:
+            await cur.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+
+    async def execute(self, statement, *params):
+        async with self.connection.cursor() as cur:
+            await cur.execute(statement, params)
+            return await cur.fetchall() or ()
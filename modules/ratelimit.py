@@ -0,0 +1,163 @@
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from time import monotonic
+
+
+INTERACTIVE = 0
+BULK = 1
+
+
+class TokenBucket:
+    """Classic token bucket. Holds up to capacity tokens, refilled at rate tokens per second."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = monotonic()
+
+    def refill(self):
+        now = monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self):
+        """:returns : Seconds until a token is available, 0 if one is available now"""
+        self.refill()
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.refill()
+        self.tokens -= 1
+
+    def drain(self):
+        """Throw away all tokens, used to back off after the remote end rate limited us."""
+        self.tokens = 0
+        self.updated = monotonic()
+
+
+class RequestScheduler:
+    """
+    Rate limited request scheduler with bounded concurrency.
+
+    Interactive requests are always served before bulk ones.
+    Bulk requests are grouped (for example by guild) and the groups are served round robin,
+    so one huge fan-out can't starve everyone else.
+
+        async with scheduler.slot(ratelimit.BULK, group=guild.id):
+            ...
+    """
+
+    def __init__(self, rate, burst, concurrency):
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = concurrency
+        self.active = 0
+        self.waiting = 0
+        self.interactive = deque()
+        self.bulk = OrderedDict()
+        self.timer = None
+        self.completed = 0
+        self.wait_times = {INTERACTIVE: deque(maxlen=500), BULK: deque(maxlen=500)}
+
+    def queued(self, priority=None):
+        interactive = sum(1 for f in self.interactive if not f.done())
+        bulk = sum(1 for queue in self.bulk.values() for f in queue if not f.done())
+        if priority == INTERACTIVE:
+            return interactive
+        if priority == BULK:
+            return bulk
+        return interactive + bulk
+
+    def wait_time(self, priority, percentile=50):
+        """Queue wait time in milliseconds for given percentile of recent requests."""
+        waits = self.wait_times[priority]
+        if not waits:
+            return 0
+        ordered = sorted(waits)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[index] * 1000
+
+    @asynccontextmanager
+    async def slot(self, priority=INTERACTIVE, group=None):
+        """Wait for a free slot, yields the time spent waiting in seconds."""
+        start = monotonic()
+        future = asyncio.get_event_loop().create_future()
+        if priority == INTERACTIVE:
+            self.interactive.append(future)
+        else:
+            self.bulk.setdefault(group, deque()).append(future)
+
+        self.waiting += 1
+        self.dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # slot was handed to us right as we got cancelled
+                self.release()
+            else:
+                self.waiting -= 1
+            raise
+
+        waited = monotonic() - start
+        self.wait_times[priority].append(waited)
+        try:
+            yield waited
+        finally:
+            self.release()
+
+    def release(self):
+        self.active -= 1
+        self.completed += 1
+        self.dispatch()
+
+    def next_waiter(self):
+        while self.interactive:
+            future = self.interactive.popleft()
+            if not future.done():
+                return future
+
+        while self.bulk:
+            group, queue = next(iter(self.bulk.items()))
+            future = None
+            while queue and future is None:
+                candidate = queue.popleft()
+                if not candidate.done():
+                    future = candidate
+
+            if queue:
+                self.bulk.move_to_end(group)
+            else:
+                del self.bulk[group]
+
+            if future is not None:
+                return future
+
+        return None
+
+    def dispatch(self):
+        while self.active < self.concurrency:
+            if self.waiting == 0:
+                return
+
+            delay = self.bucket.delay()
+            if delay > 0:
+                if self.timer is None:
+                    self.timer = asyncio.get_event_loop().call_later(delay, self.on_timer)
+                return
+
+            future = self.next_waiter()
+            if future is None:
+                return
+
+            self.bucket.consume()
+            self.waiting -= 1
+            self.active += 1
+            future.set_result(None)
+
+    def on_timer(self):
+        self.timer = None
+        self.dispatch()
@@ -0,0 +1,176 @@
+import io
+import os
+import json
+import asyncio
+import hashlib
+import aiohttp
+from collections import deque
+from time import time
+from modules import log, exceptions, ttlcache
+
+
+logger = log.get_logger(__name__)
+
+
+class RenderBackend:
+    """One HTML rendering server and its statistics."""
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self.healthy = True
+        self.in_flight = 0
+        self.renders = 0
+        self.errors = 0
+        self.render_times = deque(maxlen=200)
+
+    def render_time(self, percentile=50):
+        """Render time in milliseconds for given percentile of recent renders."""
+        if not self.render_times:
+            return 0
+        ordered = sorted(self.render_times)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[index] * 1000
+
+
+class RenderClient:
+    """
+    Client for the HTML rendering servers (sushii-image-server).
+
+    Renders go through a bounded queue served by a fixed amount of workers per server,
+    so a burst of big charts waits its turn instead of overloading the renderer.
+    Identical payloads share one render while it's running, and finished images are cached
+    by the hash of the payload. A render that fails on one server is retried on the next
+    healthy one, and failed servers are checked again every health_interval.
+
+        buffer = await bot.renderer.render({"html": html, "width": 600, "height": 400})
+
+    Servers are set with RENDERER_URLS, separated by commas.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.backends = [
+            RenderBackend(url)
+            for url in os.environ.get("RENDERER_URLS", "http://localhost:3000").split(",")
+            if url.strip()
+        ]
+        self.concurrency = int(os.environ.get("RENDERER_CONCURRENCY", 4))
+        self.health_interval = float(os.environ.get("RENDERER_HEALTH_INTERVAL", 30))
+        self.cache_ttl = float(os.environ.get("RENDERER_CACHE_TTL", 600))
+        self.cache = ttlcache.TTLCache(maxsize=int(os.environ.get("RENDERER_CACHE_SIZE", 100)))
+        self.queue = asyncio.Queue(maxsize=int(os.environ.get("RENDERER_QUEUE_SIZE", 100)))
+        self.peak_queue = 0
+        self.rejected = 0
+        self.queue_times = deque(maxlen=200)
+        self.tasks = [
+            bot.loop.create_task(self.worker())
+            for _ in range(self.concurrency * len(self.backends))
+        ]
+        self.tasks.append(bot.loop.create_task(self.health_loop()))
+
+    async def render(self, payload):
+        """
+        :param payload : Form data for the /html endpoint
+        :returns       : BytesIO of the rendered image
+        """
+        key = hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+        data = self.cache.get(key)
+        if data is None:
+            data = await self.cache.coalesce(key, self.render_uncached, key, payload)
+        return io.BytesIO(data)
+
+    async def render_uncached(self, key, payload):
+        try:
+            future = self.bot.loop.create_future()
+            self.queue.put_nowait((payload, future, time()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise exceptions.Warning("The image renderer is busy right now, please try again soon!")
+
+        self.peak_queue = max(self.peak_queue, self.queue.qsize())
+        data = await future
+        self.cache.set(key, data, self.cache_ttl)
+        return data
+
+    def queue_time(self, percentile=50):
+        """Time spent in the queue in milliseconds for given percentile of recent renders."""
+        if not self.queue_times:
+            return 0
+        ordered = sorted(self.queue_times)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[index] * 1000
+
+    def pick_backends(self):
+        """:returns : Healthy backends, least busy first, followed by the unhealthy ones"""
+        return sorted(self.backends, key=lambda b: (not b.healthy, b.in_flight))
+
+    async def worker(self):
+        while True:
+            payload, future, queued_at = await self.queue.get()
+            if future.cancelled():
+                continue
+
+            self.queue_times.append(time() - queued_at)
+            try:
+                result = await self.render_anywhere(payload)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+    async def render_anywhere(self, payload):
+        for backend in self.pick_backends():
+            try:
+                return await self.render_on(backend, payload)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                backend.errors += 1
+                if backend.healthy:
+                    logger.warning(f"Renderer {backend.url} failed, marking as unhealthy: {e}")
+                backend.healthy = False
+
+        raise exceptions.RendererError("Unable to connect to the HTML Rendering server")
+
+    async def render_on(self, backend, payload):
+        backend.in_flight += 1
+        start = time()
+        try:
+            async with self.bot.session.post(f"{backend.url}/html", data=payload) as response:
+                if response.status >= 500:
+                    raise aiohttp.ClientResponseError(
+                        response.request_info, response.history, status=response.status
+                    )
+                if response.status != 200:
+                    raise exceptions.RendererError(
+                        f"Renderer responded with {response.status} : {await response.text()}"
+                    )
+                data = await response.read()
+        finally:
+            backend.in_flight -= 1
+
+        backend.renders += 1
+        backend.render_times.append(time() - start)
+        return data
+
+    async def health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            for backend in self.backends:
+                if not backend.healthy:
+                    await self.check_health(backend)
+
+    async def check_health(self, backend):
+        try:
+            async with self.bot.session.get(backend.url) as response:
+                if response.status >= 500:
+                    return
+        except Exception:
+            return
+
+        logger.info(f"Renderer {backend.url} is back up")
+        backend.healthy = True
+
+    def close(self):
+        for task in self.tasks:
+            task.cancel()
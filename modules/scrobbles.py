@@ -0,0 +1,436 @@
+import os
+import asyncio
+import arrow
+from time import time
+from modules import log
+
+
+logger = log.get_logger(__name__)
+
+NAME_MAX_LENGTH = 255
+IMAGE_URL_MAX_LENGTH = 512
+
+
+class ScrobbleMirror:
+    """
+    Local copy of the listening history of every linked Last.fm user.
+
+    New scrobbles are pulled incrementally with user.getrecenttracks using from= the newest
+    scrobble we already have. Pages are stored oldest first, so an interrupted sync simply
+    continues from where it left off on the next run. Per user artist, album and track
+    playcounts are kept up to date alongside, so server wide queries are a single lookup
+    instead of one api call per member.
+
+    A user is only served from the mirror once a full sync has completed for them,
+    and only while that sync is at most max_age old. Everyone else goes through the api.
+
+    The periodic sync only covers users who share a guild with the bot or have used
+    a Last.fm command recently, at most users_per_pass of them per pass, least recently
+    synced first, so one pass never hogs the api rate limit from interactive commands.
+    """
+
+    def __init__(self, bot, api_request):
+        self.bot = bot
+        self.api_request = api_request
+        self.page_size = 200
+        self.max_pages = int(os.environ.get("SCROBBLE_SYNC_MAX_PAGES", 50))
+        self.concurrency = int(os.environ.get("SCROBBLE_SYNC_CONCURRENCY", 4))
+        self.users_per_pass = int(os.environ.get("SCROBBLE_SYNC_USERS_PER_PASS", 100))
+        self.active_window = float(os.environ.get("SCROBBLE_SYNC_ACTIVE_DAYS", 7)) * 24 * 60 * 60
+        self.max_age = float(os.environ.get("SCROBBLE_MAX_AGE_MINUTES", 60)) * 60
+        # lowercased lastfm username : last time they used a Last.fm command
+        self.last_active = {}
+        self.tasks = set()
+        self.locks = {}
+
+    def mark_active(self, username):
+        self.last_active[username.lower()] = time()
+
+    def sync_later(self, username):
+        """Sync user in the background, logging instead of raising any errors."""
+        self.mark_active(username)
+        task = asyncio.ensure_future(self.sync_user(username, bulk_group="scrobble-sync"))
+        self.tasks.add(task)
+
+        def done(finished):
+            self.tasks.discard(finished)
+            if not finished.cancelled() and finished.exception() is not None:
+                logger.error(f"Failed to sync scrobbles of {username}: {finished.exception()}")
+
+        task.add_done_callback(done)
+
+    def close(self):
+        for task in self.tasks:
+            task.cancel()
+
+    def sync_candidates(self):
+        """:returns : Set of linked usernames that share a guild with the bot or were active"""
+        active_since = time() - self.active_window
+        self.last_active = {
+            username: active_on
+            for username, active_on in self.last_active.items()
+            if active_on > active_since
+        }
+        usernames = set()
+        for user_id, username in self.bot.cache.lastfm_users.items():
+            if self.bot.get_user(user_id) is not None or username.lower() in self.last_active:
+                usernames.add(username)
+        return usernames
+
+    def lock_for(self, username):
+        username = username.lower()
+        try:
+            return self.locks[username]
+        except KeyError:
+            lock = asyncio.Lock()
+            self.locks[username] = lock
+            return lock
+
+    async def sync_all(self):
+        """Sync the next users_per_pass candidates, never synced and least recently synced first."""
+        usernames = self.sync_candidates()
+        if not usernames:
+            return
+
+        data = await self.bot.db.execute(
+            """
+            SELECT lastfm_username, synced_on FROM lastfm_sync_state
+            WHERE lastfm_username IN %s
+            """,
+            list(usernames),
+        )
+        synced_on = {username.lower(): value for username, value in data}
+
+        def priority(username):
+            last_synced = synced_on.get(username.lower())
+            return (last_synced is not None, last_synced or 0)
+
+        batch = sorted(usernames, key=priority)[: self.users_per_pass]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = arrow.utcnow()
+
+        async def worker(username):
+            async with semaphore:
+                try:
+                    return await self.sync_user(username, bulk_group="scrobble-sync")
+                except Exception as e:
+                    logger.error(f"Failed to sync scrobbles of {username}: {e}")
+                    return False
+
+        results = await asyncio.gather(*(worker(username) for username in batch))
+        logger.info(
+            f"Synced scrobbles of {sum(results)}/{len(results)} users "
+            f"(of {len(usernames)} candidates) "
+            f"in {(arrow.utcnow() - start).total_seconds():.1f}s"
+        )
+
+    async def sync_user(self, username, bulk_group=None):
+        """
+        Fetch and store all scrobbles newer than the newest one we have.
+
+        :param username   : Last.fm username
+        :param bulk_group : Passed on to the api request scheduler, None for interactive
+        :returns          : True if the user is now fully synced
+        """
+        async with self.lock_for(username):
+            last_scrobble = await self.bot.db.execute(
+                "SELECT last_scrobble FROM lastfm_sync_state WHERE lastfm_username = %s",
+                username,
+                one_value=True,
+            )
+            # fixing the end of the range keeps the page numbers stable while we go through them
+            params = {
+                "method": "user.getrecenttracks",
+                "user": username,
+                "from": (last_scrobble or 0) + 1,
+                "to": int(time()),
+                "limit": self.page_size,
+            }
+            data = await self.api_request(
+                dict(params, page=1), ignore_errors=True, bulk_group=bulk_group
+            )
+            if data is None:
+                return False
+
+            total_pages = int(data["recenttracks"]["@attr"]["totalPages"])
+            for i, page in enumerate(range(total_pages, 0, -1)):
+                if i >= self.max_pages:
+                    # continue backfilling on the next run
+                    return False
+
+                if page > 1:
+                    page_data = await self.api_request(
+                        dict(params, page=page), ignore_errors=True, bulk_group=bulk_group
+                    )
+                    if page_data is None:
+                        return False
+                else:
+                    page_data = data
+
+                await self.store_scrobbles(username, page_data["recenttracks"]["track"])
+
+            await self.bot.db.execute(
+                """
+                INSERT INTO lastfm_sync_state (lastfm_username, synced_on)
+                    VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE
+                    synced_on = VALUES(synced_on)
+                """,
+                username,
+                arrow.utcnow().datetime,
+            )
+            return True
+
+    async def store_scrobbles(self, username, tracks):
+        """Save one page of recent tracks and refresh the playcounts of the artists in it."""
+        rows = []
+        for track in tracks:
+            if track.get("date") is None:
+                # currently playing track, not scrobbled yet
+                continue
+
+            try:
+                image_url = track["image"][-1]["#text"][:IMAGE_URL_MAX_LENGTH] or None
+            except (KeyError, IndexError):
+                image_url = None
+
+            rows.append(
+                (
+                    username,
+                    track["artist"]["#text"][:NAME_MAX_LENGTH],
+                    track["album"]["#text"][:NAME_MAX_LENGTH],
+                    track["name"][:NAME_MAX_LENGTH],
+                    int(track["date"]["uts"]),
+                    image_url,
+                )
+            )
+
+        if not rows:
+            return
+
+        await self.bot.db.executemany(
+            """
+            INSERT IGNORE INTO lastfm_scrobble
+                (lastfm_username, artist_name, album_name, track_name, played_on, image_url)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """,
+            rows,
+        )
+        # counting again from the scrobbles keeps the playcounts right even if a page is stored twice
+        artists = list(set(row[1] for row in rows))
+        await self.bot.db.execute(
+            """
+            INSERT INTO lastfm_artist_playcount (lastfm_username, artist_name, playcount)
+                SELECT lastfm_username, artist_name, COUNT(*) FROM lastfm_scrobble
+                WHERE lastfm_username = %s AND artist_name IN %s
+                GROUP BY lastfm_username, artist_name
+            ON DUPLICATE KEY UPDATE
+                playcount = VALUES(playcount)
+            """,
+            username,
+            artists,
+        )
+        await self.bot.db.execute(
+            """
+            INSERT INTO lastfm_album_playcount
+                (lastfm_username, artist_name, album_name, playcount, image_url)
+                SELECT lastfm_username, artist_name, album_name, COUNT(*), MAX(image_url)
+                FROM lastfm_scrobble
+                WHERE lastfm_username = %s AND artist_name IN %s AND album_name != ''
+                GROUP BY lastfm_username, artist_name, album_name
+            ON DUPLICATE KEY UPDATE
+                playcount = VALUES(playcount),
+                image_url = VALUES(image_url)
+            """,
+            username,
+            artists,
+        )
+        await self.bot.db.execute(
+            """
+            INSERT INTO lastfm_track_playcount (lastfm_username, artist_name, track_name, playcount)
+                SELECT lastfm_username, artist_name, track_name, COUNT(*) FROM lastfm_scrobble
+                WHERE lastfm_username = %s AND artist_name IN %s
+                GROUP BY lastfm_username, artist_name, track_name
+            ON DUPLICATE KEY UPDATE
+                playcount = VALUES(playcount)
+            """,
+            username,
+            artists,
+        )
+        await self.bot.db.execute(
+            """
+            INSERT INTO lastfm_sync_state (lastfm_username, last_scrobble)
+                VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE
+                last_scrobble = GREATEST(last_scrobble, VALUES(last_scrobble))
+            """,
+            username,
+            max(row[4] for row in rows),
+        )
+
+    def fresh_since(self):
+        """:returns : Oldest synced_on that is still served from the mirror"""
+        return arrow.utcnow().shift(seconds=-self.max_age).datetime
+
+    async def synced_usernames(self, usernames):
+        """
+        :returns : Set of the given usernames (lowercased) that are served from the mirror,
+                   meaning fully synced within max_age
+        """
+        if not usernames:
+            return set()
+
+        data = await self.bot.db.execute(
+            """
+            SELECT lastfm_username FROM lastfm_sync_state
+            WHERE synced_on >= %s AND lastfm_username IN %s
+            """,
+            self.fresh_since(),
+            usernames,
+            as_list=True,
+        )
+        return set(username.lower() for username in data)
+
+    async def artist_playcounts(self, artist, usernames):
+        """:returns : Dictionary of {lastfm_username (lowercased) : playcount}"""
+        data = await self.bot.db.execute(
+            """
+            SELECT lastfm_username, playcount FROM lastfm_artist_playcount
+            WHERE artist_name = %s AND lastfm_username IN %s
+            """,
+            artist,
+            usernames,
+        )
+        return {username.lower(): playcount for username, playcount in data}
+
+    async def album_playcounts(self, artist, album, usernames):
+        """:returns : Dictionary of {lastfm_username (lowercased) : playcount}"""
+        data = await self.bot.db.execute(
+            """
+            SELECT lastfm_username, playcount FROM lastfm_album_playcount
+            WHERE artist_name = %s AND album_name = %s AND lastfm_username IN %s
+            """,
+            artist,
+            album,
+            usernames,
+        )
+        return {username.lower(): playcount for username, playcount in data}
+
+    async def track_playcounts(self, artist, track, usernames):
+        """:returns : Dictionary of {lastfm_username (lowercased) : playcount}"""
+        data = await self.bot.db.execute(
+            """
+            SELECT lastfm_username, playcount FROM lastfm_track_playcount
+            WHERE artist_name = %s AND track_name = %s AND lastfm_username IN %s
+            """,
+            artist,
+            track,
+            usernames,
+        )
+        return {username.lower(): playcount for username, playcount in data}
+
+    async def combined_top(self, datatype, usernames, limit=1000, per_user=100):
+        """
+        Combined top artists, albums or tracks of the given users.
+
+        :param datatype : One of [artist, album, track]
+        :param per_user : How many of each user's own top items are counted, like the limit
+                          of the user.gettop* request used for members that aren't synced
+        :returns        : List of items in the same format as user.gettop* api methods
+        """
+        if datatype == "artist":
+            data = await self.bot.db.execute(
+                """
+                SELECT artist_name, SUM(playcount) AS total FROM (
+                    SELECT artist_name, playcount, ROW_NUMBER() OVER(
+                        PARTITION BY lastfm_username ORDER BY playcount DESC
+                    ) AS user_rank
+                    FROM lastfm_artist_playcount
+                    WHERE lastfm_username IN %s
+                ) AS user_top
+                WHERE user_rank <= %s
+                GROUP BY artist_name ORDER BY total DESC LIMIT %s
+                """,
+                usernames,
+                per_user,
+                limit,
+            )
+            return [{"name": artist, "playcount": plays} for artist, plays in data]
+
+        elif datatype == "album":
+            data = await self.bot.db.execute(
+                """
+                SELECT artist_name, album_name, SUM(playcount) AS total, MAX(image_url) FROM (
+                    SELECT artist_name, album_name, playcount, image_url, ROW_NUMBER() OVER(
+                        PARTITION BY lastfm_username ORDER BY playcount DESC
+                    ) AS user_rank
+                    FROM lastfm_album_playcount
+                    WHERE lastfm_username IN %s
+                ) AS user_top
+                WHERE user_rank <= %s
+                GROUP BY artist_name, album_name ORDER BY total DESC LIMIT %s
+                """,
+                usernames,
+                per_user,
+                limit,
+            )
+            return [
+                {
+                    "name": album,
+                    "artist": {"name": artist},
+                    "playcount": plays,
+                    "image": [{"#text": image_url or ""}],
+                }
+                for artist, album, plays, image_url in data
+            ]
+
+        elif datatype == "track":
+            data = await self.bot.db.execute(
+                """
+                SELECT artist_name, track_name, SUM(playcount) AS total FROM (
+                    SELECT artist_name, track_name, playcount, ROW_NUMBER() OVER(
+                        PARTITION BY lastfm_username ORDER BY playcount DESC
+                    ) AS user_rank
+                    FROM lastfm_track_playcount
+                    WHERE lastfm_username IN %s
+                ) AS user_top
+                WHERE user_rank <= %s
+                GROUP BY artist_name, track_name ORDER BY total DESC LIMIT %s
+                """,
+                usernames,
+                per_user,
+                limit,
+            )
+            return [
+                {"name": track, "artist": {"name": artist}, "playcount": plays}
+                for artist, track, plays in data
+            ]
+
+    async def recent_tracks(self, username, since):
+        """
+        :param since : Unix timestamp
+        :returns     : Scrobbles since given time in the same format as user.getrecenttracks
+        """
+        data = await self.bot.db.execute(
+            """
+            SELECT artist_name, album_name, track_name, image_url FROM lastfm_scrobble
+            WHERE lastfm_username = %s AND played_on >= %s
+            ORDER BY played_on DESC
+            """,
+            username,
+            since,
+        )
+        return {
+            "recenttracks": {
+                "track": [
+                    {
+                        "artist": {"#text": artist},
+                        "album": {"#text": album},
+                        "name": track,
+                        "image": [{"#text": image_url or ""}] * 4,
+                    }
+                    for artist, album, track, image_url in data
+                ],
+                "@attr": {"user": username},
+            }
+        }
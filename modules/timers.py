@@ -0,0 +1,112 @@
+import asyncio
+import heapq
+import itertools
+from time import time
+from modules import log
+
+
+logger = log.get_logger(__name__)
+
+
+class TimerQueue:
+    """
+    Fires callbacks for entries when their due time comes, without polling.
+
+    Entries are kept in a heap ordered by due time, and the queue sleeps until the
+    earliest one is due. Everything that is due at the same time is handed to the
+    callback as one batch, so it can be cleaned up from the database in one query.
+
+        timers = TimerQueue(bot, fire_reminders)
+        timers.add(date.timestamp, key, reminder)
+        timers.start()
+
+    Adding an entry with a key that is already queued replaces the old entry.
+    """
+
+    # wall clock can jump, so never trust a single sleep for longer than this
+    max_sleep = 600
+
+    def __init__(self, bot, callback, batch_size=500):
+        """
+        :param callback   : Coroutine function taking a list of due payloads
+        :param batch_size : Max amount of payloads given to the callback at once
+        """
+        self.bot = bot
+        self.callback = callback
+        self.batch_size = batch_size
+        self.heap = []
+        # key : heap entry [due, sequence, key, payload]
+        self.entries = {}
+        self.counter = itertools.count()
+        self.changed = asyncio.Event()
+        self.task = None
+        self.fired = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, due, key, payload):
+        """
+        :param due     : Unix timestamp to fire on
+        :param key     : Hashable identifying the entry, used for removing it
+        :param payload : Anything, given to the callback as is
+        """
+        self.discard(key)
+        entry = [due, next(self.counter), key, payload]
+        self.entries[key] = entry
+        heapq.heappush(self.heap, entry)
+        if self.heap[0] is entry:
+            # new earliest entry, wake up the runner to sleep for less
+            self.changed.set()
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            # removed entries stay in the heap until they are popped
+            entry[2] = None
+            if len(self.heap) > 2 * len(self.entries) + 64:
+                self.heap = [e for e in self.heap if e[2] is not None]
+                heapq.heapify(self.heap)
+
+    def pop_due(self, now):
+        due = []
+        while self.heap and self.heap[0][0] <= now and len(due) < self.batch_size:
+            _, _, key, payload = heapq.heappop(self.heap)
+            if key is None:
+                continue
+            del self.entries[key]
+            due.append(payload)
+        return due
+
+    def start(self):
+        if self.task is None:
+            self.task = self.bot.loop.create_task(self.run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def run(self):
+        await self.bot.wait_until_ready()
+        while True:
+            self.changed.clear()
+            due = self.pop_due(time())
+            if due:
+                self.fired += len(due)
+                try:
+                    await self.callback(due)
+                except Exception as e:
+                    logger.error(f"Timer callback error: {e}")
+                continue
+
+            timeout = self.max_sleep
+            while self.heap and self.heap[0][2] is None:
+                heapq.heappop(self.heap)
+            if self.heap:
+                timeout = min(timeout, self.heap[0][0] - time())
+
+            try:
+                await asyncio.wait_for(self.changed.wait(), timeout=max(timeout, 0))
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,79 @@
+import asyncio
+from collections import OrderedDict
+from time import time
+
+
+class TTLCache:
+    """
+    Size bounded key-value cache where every entry expires after its own time to live.
+
+    Identical requests that are running at the same time can be coalesced with
+    coalesce(), so only one of them actually does the work and the rest wait for its result.
+    """
+
+    def __init__(self, maxsize=5000):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        if total == 0:
+            return 0
+        return self.hits / total
+
+    def get(self, key, default=None):
+        """Get a value from the cache, or default if it's missing or expired."""
+        try:
+            expires, value = self.data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+
+        if expires < time():
+            del self.data[key]
+            self.misses += 1
+            return default
+
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl):
+        """Store value for ttl seconds, evicting the least recently used entries if full."""
+        self.data[key] = (time() + ttl, value)
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def clear(self):
+        self.data.clear()
+
+    async def coalesce(self, key, func, *args):
+        """Await func(*args), sharing the result with any concurrent call using the same key."""
+        task = self.pending.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(func(*args))
+        self.pending[key] = task
+
+        def done(finished):
+            if self.pending.get(key) is finished:
+                del self.pending[key]
+            if not finished.cancelled():
+                # mark exception as retrieved even if every waiter was cancelled
+                finished.exception()
+
+        task.add_done_callback(done)
+        return await asyncio.shield(task)
@@ -0,0 +1,146 @@
+import os
+import asyncio
+from time import time
+from modules import log
+
+
+logger = log.get_logger(__name__)
+
+
+class CommandUsageBuffer:
+    """
+    Keeps command usage counters in memory and writes them to the database in batches.
+
+    Counters are flushed every flush_interval seconds, or sooner if there are more than
+    max_pending different counters waiting. The bot flushes once more when shutting down.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.flush_interval = float(os.environ.get("USAGE_FLUSH_INTERVAL", 60))
+        self.max_pending = int(os.environ.get("USAGE_FLUSH_SIZE", 1000))
+        self.counts = {}
+        self.lock = asyncio.Lock()
+        self.size_flush = None
+        self.task = bot.loop.create_task(self.flush_loop())
+
+    def add(self, guild_id, user_id, command_name, command_type="internal"):
+        key = (guild_id, user_id, command_name, command_type)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        if len(self.counts) >= self.max_pending and self.size_flush is None:
+            self.size_flush = self.bot.loop.create_task(self.flush())
+            self.size_flush.add_done_callback(self.on_size_flush_done)
+
+    def on_size_flush_done(self, task):
+        self.size_flush = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Command usage flush error: {task.exception()}")
+
+    async def flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Command usage flush error: {e}")
+
+    async def flush(self):
+        async with self.lock:
+            if not self.counts:
+                return
+
+            counts = self.counts
+            self.counts = {}
+            start = time()
+            try:
+                await self.bot.db.executemany(
+                    """
+                    INSERT INTO command_usage (guild_id, user_id, command_name, command_type, uses)
+                        VALUES (%s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        uses = uses + VALUES(uses)
+                    """,
+                    [key + (uses,) for key, uses in counts.items()],
+                )
+            except Exception:
+                # put the counts back so they are written on the next flush instead of lost
+                for key, uses in counts.items():
+                    self.counts[key] = self.counts.get(key, 0) + uses
+                raise
+
+            logger.info(
+                f"Saved {sum(counts.values())} command uses ({len(counts)} rows) in {time()-start:.3f}s"
+            )
+
+    async def close(self):
+        self.task.cancel()
+        await self.flush()
+
+
+class ActivityBuffer:
+    """
+    Message activity and emoji use counters waiting to be written to the database.
+
+    Everything is keyed by integer id tuples so counting a message is a single dict lookup.
+    The owner swaps in a new buffer when writing, so the old one is never modified again.
+    """
+
+    __slots__ = ("activity", "unicode_emojis", "custom_emojis", "messages")
+
+    def __init__(self):
+        # (guild_id, user_id) : [is_bot, xp, messages]
+        self.activity = {}
+        # (guild_id, user_id, emoji_name) : uses
+        self.unicode_emojis = {}
+        # (guild_id, user_id, emoji_id) : [emoji_name, uses]
+        self.custom_emojis = {}
+        self.messages = 0
+
+    def add_message(self, guild_id, user_id, is_bot, xp):
+        self.messages += 1
+        key = (guild_id, user_id)
+        entry = self.activity.get(key)
+        if entry is None:
+            self.activity[key] = [is_bot, xp, 1]
+        else:
+            entry[1] += xp
+            entry[2] += 1
+
+    def add_unicode_emoji(self, guild_id, user_id, emoji_name):
+        key = (guild_id, user_id, emoji_name)
+        self.unicode_emojis[key] = self.unicode_emojis.get(key, 0) + 1
+
+    def add_custom_emoji(self, guild_id, user_id, emoji_name, emoji_id):
+        key = (guild_id, user_id, emoji_id)
+        entry = self.custom_emojis.get(key)
+        if entry is None:
+            self.custom_emojis[key] = [emoji_name, 1]
+        else:
+            entry[1] += 1
+
+    def activity_rows(self):
+        """:returns : List of (guild_id, user_id, is_bot, xp, messages)"""
+        return [key + tuple(value) for key, value in self.activity.items()]
+
+    def user_rows(self):
+        """:returns : List of (user_id, is_bot, xp, messages) summed over all guilds"""
+        users = {}
+        for (_, user_id), (is_bot, xp, messages) in self.activity.items():
+            entry = users.get(user_id)
+            if entry is None:
+                users[user_id] = [is_bot, xp, messages]
+            else:
+                entry[1] += xp
+                entry[2] += messages
+        return [(user_id,) + tuple(value) for user_id, value in users.items()]
+
+    def unicode_emoji_rows(self):
+        """:returns : List of (guild_id, user_id, emoji_name, uses)"""
+        return [key + (uses,) for key, uses in self.unicode_emojis.items()]
+
+    def custom_emoji_rows(self):
+        """:returns : List of (guild_id, user_id, emoji_name, emoji_id, uses)"""
+        return [
+            (guild_id, user_id, emoji_name, emoji_id, uses)
+            for (guild_id, user_id, emoji_id), (emoji_name, uses) in self.custom_emojis.items()
+        ]
@@ -1,14 +1,12 @@
+import os
 import math
 import asyncio
 import discord
 import copy
 import regex
-import colorgram
 import arrow
 import re
-import io
 from modules import queries, exceptions
-import aiohttp
 from discord.ext import commands
 from PIL import Image, UnidentifiedImageError
 from durations_nlp import Duration
@@ -52,23 +50,22 @@ async def determine_prefix(bot, message):
 
 async def is_blacklisted(ctx):
     """Check command invocation context for blacklist triggers."""
-    if ctx.guild is not None and ctx.guild.id in ctx.bot.cache.blacklist["global"]["guild"]:
+    blacklist = await ctx.bot.cache.loaded("blacklist")
+
+    if ctx.guild is not None and ctx.guild.id in blacklist["guild"]:
         raise exceptions.BlacklistedGuild()
 
-    if ctx.channel.id in ctx.bot.cache.blacklist["global"]["channel"]:
+    if ctx.channel.id in blacklist["channel"]:
         raise exceptions.BlacklistedChannel()
 
-    if ctx.author.id in ctx.bot.cache.blacklist["global"]["user"]:
+    if ctx.author.id in blacklist["user"]:
         raise exceptions.BlacklistedUser()
 
-    if ctx.guild is not None and ctx.bot.cache.blacklist.get(str(ctx.guild.id)) is not None:
-        if ctx.author.id in ctx.bot.cache.blacklist[str(ctx.guild.id)]["member"]:
+    if ctx.guild is not None:
+        if (ctx.guild.id, ctx.author.id) in blacklist["member"]:
             raise exceptions.BlacklistedMember()
 
-        if (
-            ctx.command.qualified_name.lower()
-            in ctx.bot.cache.blacklist[str(ctx.guild.id)]["command"]
-        ):
+        if (ctx.guild.id, ctx.command.qualified_name.lower()) in blacklist["command"]:
             raise exceptions.BlacklistedCommand()
 
     return True
@@ -474,9 +471,7 @@ async def get_textchannel(ctx, argument, fallback=None, guildfilter=None):
         except commands.errors.BadArgument:
             return fallback
     else:
-        result = discord.utils.find(
-            lambda m: argument in (m.name, m.id), guildfilter.text_channels
-        )
+        result = discord.utils.find(lambda m: argument in (m.name, m.id), guildfilter.text_channels)
         return result or fallback
 
 
@@ -579,29 +574,19 @@ def rgb_to_hex(rgb):
     return "{0:02x}{1:02x}{2:02x}".format(clamp(r), clamp(g), clamp(b))
 
 
-async def color_from_image_url(url, fallback="E74C3C", return_color_object=False):
+async def color_from_image_url(bot, url, fallback="E74C3C"):
     """
+    :param bot      : the bot, whose shared image colour cache is used
     :param url      : image url
     :param fallback : the color to return in case the operation fails
     :return         : hex color code of the most dominant color in the image
     """
-    if url.strip() == "":
-        return fallback
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                image = Image.open(io.BytesIO(await response.read()))
-                colors = colorgram.extract(image, 1)
-                dominant_color = colors[0].rgb
-
-        if return_color_object:
-            return dominant_color
-        else:
-            return rgb_to_hex(dominant_color)
-    except Exception as e:
-        print(e)
+    color = await bot.image_colors.get(url)
+    if color is None:
         return fallback
 
+    return rgb_to_hex(color)
+
 
 def bool_to_int(value: bool):
     """Turn boolean into 1 or 0."""
@@ -648,28 +633,32 @@ def find_custom_emojis(text):
     return emoji_list
 
 
-async def image_info_from_url(url):
+async def image_info_from_url(bot, url):
     """Return dictionary containing filesize, filetype and dimensions of an image."""
-    async with aiohttp.ClientSession() as session:
-        async with session.get(str(url)) as response:
-            filesize = int(response.headers.get("Content-Length")) / 1024
-            filetype = response.headers.get("Content-Type")
-            try:
-                image = Image.open(io.BytesIO(await response.read()))
-            except UnidentifiedImageError:
-                return None
+    path = await bot.image_store.fetch(str(url))
+    if path is None:
+        return None
 
-            dimensions = image.size
-            if filesize > 1024:
-                filesize = f"{filesize/1024:.2f}MB"
-            else:
-                filesize = f"{filesize:.2f}KB"
+    filesize = os.path.getsize(path) / 1024
+    try:
+        # only the header is read here
+        image = Image.open(path)
+    except UnidentifiedImageError:
+        return None
 
-            return {
-                "filesize": filesize,
-                "filetype": filetype,
-                "dimensions": f"{dimensions[0]}x{dimensions[1]}",
-            }
+    filetype = Image.MIME.get(image.format)
+    dimensions = image.size
+    image.close()
+    if filesize > 1024:
+        filesize = f"{filesize/1024:.2f}MB"
+    else:
+        filesize = f"{filesize:.2f}KB"
+
+    return {
+        "filesize": filesize,
+        "filetype": filetype,
+        "dimensions": f"{dimensions[0]}x{dimensions[1]}",
+    }
 
 
 class OptionalSubstitute(dict):
@@ -800,15 +789,9 @@ def format_html(template, replacements):
     return re.sub(r"\$(\S*?)\$", dictsub, template)
 
 
-async def render_html(payload):
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.post("http://localhost:3000/html", data=payload) as response:
-                buffer = io.BytesIO(await response.read())
-        except aiohttp.client_exceptions.ClientConnectorError:
-            raise exceptions.RendererError("Unable to connect to the HTML Rendering server")
-
-    return buffer
+async def render_html(bot, payload):
+    """:returns : BytesIO of the image rendered from payload, see RenderClient"""
+    return await bot.renderer.render(payload)
 
 
 class TwoWayIterator:
@@ -0,0 +1,5 @@
+-- Adds the scrape time of artist images to an existing database.
+-- Existing rows keep a NULL scraped_on and are scraped again in the background on first use.
+
+ALTER TABLE artist_image_cache
+    ADD COLUMN IF NOT EXISTS scraped_on DATETIME DEFAULT NULL AFTER image_hash;
@@ -0,0 +1,66 @@
+-- Adds the pre-aggregated xp totals to an existing database.
+-- Safe to run more than once, totals are recalculated from the hourly columns.
+
+ALTER TABLE user_activity
+    ADD KEY IF NOT EXISTS user_id (user_id),
+    ADD COLUMN IF NOT EXISTS xp INT NOT NULL DEFAULT 0 AFTER h23,
+    ADD KEY IF NOT EXISTS guild_id_is_bot_xp (guild_id, is_bot, xp);
+UPDATE user_activity SET xp = h0+h1+h2+h3+h4+h5+h6+h7+h8+h9+h10+h11+h12+h13+h14+h15+h16+h17+h18+h19+h20+h21+h22+h23;
+
+ALTER TABLE user_activity_day
+    ADD COLUMN IF NOT EXISTS xp INT NOT NULL DEFAULT 0 AFTER h23,
+    ADD KEY IF NOT EXISTS guild_id_is_bot_xp (guild_id, is_bot, xp);
+UPDATE user_activity_day SET xp = h0+h1+h2+h3+h4+h5+h6+h7+h8+h9+h10+h11+h12+h13+h14+h15+h16+h17+h18+h19+h20+h21+h22+h23;
+
+ALTER TABLE user_activity_week
+    ADD COLUMN IF NOT EXISTS xp INT NOT NULL DEFAULT 0 AFTER h23,
+    ADD KEY IF NOT EXISTS guild_id_is_bot_xp (guild_id, is_bot, xp);
+UPDATE user_activity_week SET xp = h0+h1+h2+h3+h4+h5+h6+h7+h8+h9+h10+h11+h12+h13+h14+h15+h16+h17+h18+h19+h20+h21+h22+h23;
+
+ALTER TABLE user_activity_month
+    ADD COLUMN IF NOT EXISTS xp INT NOT NULL DEFAULT 0 AFTER h23,
+    ADD KEY IF NOT EXISTS guild_id_is_bot_xp (guild_id, is_bot, xp);
+UPDATE user_activity_month SET xp = h0+h1+h2+h3+h4+h5+h6+h7+h8+h9+h10+h11+h12+h13+h14+h15+h16+h17+h18+h19+h20+h21+h22+h23;
+
+ALTER TABLE user_activity_year
+    ADD COLUMN IF NOT EXISTS xp INT NOT NULL DEFAULT 0 AFTER h23,
+    ADD KEY IF NOT EXISTS guild_id_is_bot_xp (guild_id, is_bot, xp);
+UPDATE user_activity_year SET xp = h0+h1+h2+h3+h4+h5+h6+h7+h8+h9+h10+h11+h12+h13+h14+h15+h16+h17+h18+h19+h20+h21+h22+h23;
+
+CREATE TABLE IF NOT EXISTS user_xp_global (
+    activity_table ENUM(
+        'user_activity',
+        'user_activity_day',
+        'user_activity_week',
+        'user_activity_month',
+        'user_activity_year'
+    ),
+    user_id BIGINT,
+    is_bot BOOLEAN,
+    message_count INT NOT NULL DEFAULT 0,
+    xp INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (activity_table, user_id),
+    KEY (activity_table, is_bot, xp)
+);
+
+DELETE FROM user_xp_global;
+
+INSERT INTO user_xp_global (activity_table, user_id, is_bot, xp, message_count)
+    SELECT 'user_activity', user_id, MAX(is_bot), SUM(xp), SUM(message_count)
+    FROM user_activity GROUP BY user_id;
+
+INSERT INTO user_xp_global (activity_table, user_id, is_bot, xp, message_count)
+    SELECT 'user_activity_day', user_id, MAX(is_bot), SUM(xp), SUM(message_count)
+    FROM user_activity_day GROUP BY user_id;
+
+INSERT INTO user_xp_global (activity_table, user_id, is_bot, xp, message_count)
+    SELECT 'user_activity_week', user_id, MAX(is_bot), SUM(xp), SUM(message_count)
+    FROM user_activity_week GROUP BY user_id;
+
+INSERT INTO user_xp_global (activity_table, user_id, is_bot, xp, message_count)
+    SELECT 'user_activity_month', user_id, MAX(is_bot), SUM(xp), SUM(message_count)
+    FROM user_activity_month GROUP BY user_id;
+
+INSERT INTO user_xp_global (activity_table, user_id, is_bot, xp, message_count)
+    SELECT 'user_activity_year', user_id, MAX(is_bot), SUM(xp), SUM(message_count)
+    FROM user_activity_year GROUP BY user_id;
@@ -1 +1,2 @@
-TRUNCATE TABLE user_activity_day;
\ No newline at end of file
+TRUNCATE TABLE user_activity_day;
+DELETE FROM user_xp_global WHERE activity_table = 'user_activity_day';
\ No newline at end of file
@@ -306,6 +306,7 @@ CREATE TABLE IF NOT EXISTS image_color_cache (
 CREATE TABLE IF NOT EXISTS artist_image_cache (
     artist_name VARCHAR(255),
     image_hash VARCHAR(32),
+    scraped_on DATETIME DEFAULT NULL,
     PRIMARY KEY (artist_name)
 );
 
@@ -316,6 +317,52 @@ CREATE TABLE IF NOT EXISTS album_image_cache (
     PRIMARY KEY (artist_name, album_name)
 );
 
+-- lastfm scrobble mirror
+CREATE TABLE IF NOT EXISTS lastfm_scrobble (
+    lastfm_username VARCHAR(64),
+    artist_name VARCHAR(255),
+    album_name VARCHAR(255),
+    track_name VARCHAR(255),
+    played_on INT UNSIGNED,
+    image_url VARCHAR(512) DEFAULT NULL,
+    PRIMARY KEY (lastfm_username, played_on, track_name),
+    KEY (lastfm_username, artist_name)
+);
+
+CREATE TABLE IF NOT EXISTS lastfm_artist_playcount (
+    lastfm_username VARCHAR(64),
+    artist_name VARCHAR(255),
+    playcount INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (lastfm_username, artist_name),
+    KEY (artist_name)
+);
+
+CREATE TABLE IF NOT EXISTS lastfm_album_playcount (
+    lastfm_username VARCHAR(64),
+    artist_name VARCHAR(255),
+    album_name VARCHAR(255),
+    playcount INT NOT NULL DEFAULT 0,
+    image_url VARCHAR(512) DEFAULT NULL,
+    PRIMARY KEY (lastfm_username, artist_name, album_name),
+    KEY (artist_name, album_name)
+);
+
+CREATE TABLE IF NOT EXISTS lastfm_track_playcount (
+    lastfm_username VARCHAR(64),
+    artist_name VARCHAR(255),
+    track_name VARCHAR(255),
+    playcount INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (lastfm_username, artist_name, track_name),
+    KEY (artist_name, track_name)
+);
+
+CREATE TABLE IF NOT EXISTS lastfm_sync_state (
+    lastfm_username VARCHAR(64),
+    last_scrobble INT UNSIGNED NOT NULL DEFAULT 0,
+    synced_on DATETIME DEFAULT NULL,
+    PRIMARY KEY (lastfm_username)
+);
+
 -- activity
 CREATE TABLE IF NOT EXISTS user_activity (
     guild_id BIGINT,
@@ -346,7 +393,10 @@ CREATE TABLE IF NOT EXISTS user_activity (
     h21 INT NOT NULL DEFAULT 0,
     h22 INT NOT NULL DEFAULT 0,
     h23 INT NOT NULL DEFAULT 0,
-    PRIMARY KEY (guild_id, user_id)
+    xp INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, user_id),
+    KEY (user_id),
+    KEY guild_id_is_bot_xp (guild_id, is_bot, xp)
 );
 
 CREATE TABLE IF NOT EXISTS user_activity_day (
@@ -378,7 +428,9 @@ CREATE TABLE IF NOT EXISTS user_activity_day (
     h21 INT NOT NULL DEFAULT 0,
     h22 INT NOT NULL DEFAULT 0,
     h23 INT NOT NULL DEFAULT 0,
-    PRIMARY KEY (guild_id, user_id)
+    xp INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, user_id),
+    KEY guild_id_is_bot_xp (guild_id, is_bot, xp)
 );
 
 CREATE TABLE IF NOT EXISTS user_activity_week (
@@ -410,7 +462,9 @@ CREATE TABLE IF NOT EXISTS user_activity_week (
     h21 INT NOT NULL DEFAULT 0,
     h22 INT NOT NULL DEFAULT 0,
     h23 INT NOT NULL DEFAULT 0,
-    PRIMARY KEY (guild_id, user_id)
+    xp INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, user_id),
+    KEY guild_id_is_bot_xp (guild_id, is_bot, xp)
 );
 
 CREATE TABLE IF NOT EXISTS user_activity_month (
@@ -442,7 +496,9 @@ CREATE TABLE IF NOT EXISTS user_activity_month (
     h21 INT NOT NULL DEFAULT 0,
     h22 INT NOT NULL DEFAULT 0,
     h23 INT NOT NULL DEFAULT 0,
-    PRIMARY KEY (guild_id, user_id)
+    xp INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, user_id),
+    KEY guild_id_is_bot_xp (guild_id, is_bot, xp)
 );
 
 CREATE TABLE IF NOT EXISTS user_activity_year (
@@ -474,5 +530,23 @@ CREATE TABLE IF NOT EXISTS user_activity_year (
     h21 INT NOT NULL DEFAULT 0,
     h22 INT NOT NULL DEFAULT 0,
     h23 INT NOT NULL DEFAULT 0,
-    PRIMARY KEY (guild_id, user_id)
-);
\ No newline at end of file
+    xp INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, user_id),
+    KEY guild_id_is_bot_xp (guild_id, is_bot, xp)
+);
+
+CREATE TABLE IF NOT EXISTS user_xp_global (
+    activity_table ENUM(
+        'user_activity',
+        'user_activity_day',
+        'user_activity_week',
+        'user_activity_month',
+        'user_activity_year'
+    ),
+    user_id BIGINT,
+    is_bot BOOLEAN,
+    message_count INT NOT NULL DEFAULT 0,
+    xp INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (activity_table, user_id),
+    KEY (activity_table, is_bot, xp)
+);
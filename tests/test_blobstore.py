@@ -0,0 +1,26 @@
+from modules.blobstore import blob_key, content_addressed, image_key
+
+COVER_HASH = "2a96cbd8b46e442fc41c2b86b821562f"
+
+
+def test_content_addressed_urls_use_the_filename():
+    url = f"https://lastfm.freetls.fastly.net/i/u/300x300/{COVER_HASH}.png"
+    assert content_addressed(url)
+    assert blob_key(url) == (COVER_HASH, "300x300")
+    assert blob_key(f"https://lastfm.freetls.fastly.net/i/u/{COVER_HASH}.png")[0] == COVER_HASH
+
+
+def test_different_images_on_one_path_get_different_keys():
+    assert not content_addressed("https://example.com/image.php?id=1")
+    assert blob_key("https://example.com/image.php?id=1") != blob_key(
+        "https://example.com/image.php?id=2"
+    )
+    assert image_key("https://example.com/a.png?x=1&y=2") == image_key(
+        "https://example.com/a.png?y=2&x=1"
+    )
+
+
+def test_size_and_signature_parameters_are_ignored():
+    attachment = "https://cdn.discordapp.com/attachments/1/2/cat.png"
+    assert image_key(f"{attachment}?ex=1&is=2&hm=3") == image_key(f"{attachment}?ex=4&is=5&hm=6")
+    assert blob_key(f"{attachment}?size=64") == (image_key(attachment), "64")
@@ -0,0 +1,158 @@
+"""
+Leaderboard reloads against an in-memory stand-in for the activity tables.
+
+The stand-in database has snapshots like MariaDB: a snapshot sees the rows as they were
+when it began, whatever is written while it is being read.
+"""
+
+import asyncio
+import copy
+from modules import leaderboard
+
+
+class FakeDatabase:
+    def __init__(self):
+        # table : {(guild_id, user_id) : xp}
+        self.activity = {table: {} for table in leaderboard.Leaderboards.activity_tables}
+        # table : {user_id : xp}
+        self.global_xp = {table: {} for table in leaderboard.Leaderboards.activity_tables}
+        self.typing_stats = []
+        # awaited on the first read of a snapshot, to write in the middle of a reload
+        self.on_read = None
+
+    def write(self, table, guild_id, user_id, xp):
+        self.activity[table][(guild_id, user_id)] = (
+            self.activity[table].get((guild_id, user_id), 0) + xp
+        )
+        self.global_xp[table][user_id] = self.global_xp[table].get(user_id, 0) + xp
+
+    def select(self, statement, params, activity, global_xp):
+        statement = " ".join(statement.split())
+        if statement.startswith("SELECT guild_id, user_id, xp, message_count FROM"):
+            table = statement.split()[6]
+            return [(g, u, xp, 1) for (g, u), xp in activity[table].items()]
+        if "FROM user_xp_global" in statement:
+            return [(u, xp, 1) for u, xp in global_xp[params[0]].items()]
+        if "FROM typing_stats" in statement:
+            best = {}
+            for user_id, wpm, test_date, word_count in sorted(
+                self.typing_stats, key=lambda row: (-row[1], row[2])
+            ):
+                best.setdefault(user_id, (user_id, wpm, test_date, word_count))
+            return list(best.values())
+        return []
+
+    async def execute(self, statement, *params, **kwargs):
+        return self.select(statement, params, self.activity, self.global_xp)
+
+    def snapshot(self):
+        return FakeSnapshot(self)
+
+
+class FakeSnapshot:
+    def __init__(self, db):
+        self.db = db
+        self.activity = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def begin(self):
+        self.activity = copy.deepcopy(self.db.activity)
+        self.global_xp = copy.deepcopy(self.db.global_xp)
+
+    async def execute(self, statement, *params):
+        if self.db.on_read is not None:
+            on_read, self.db.on_read = self.db.on_read, None
+            await on_read()
+        return self.db.select(statement, params, self.activity, self.global_xp)
+
+
+class FakeBot:
+    def __init__(self, db):
+        self.db = db
+        self.loop = asyncio.get_event_loop()
+
+
+def make_leaderboards(db):
+    boards = leaderboard.Leaderboards.__new__(leaderboard.Leaderboards)
+    boards.bot = FakeBot(db)
+    boards.boards = {}
+    boards.ready = asyncio.Event()
+    boards.lock = asyncio.Lock()
+    boards.journals = []
+    return boards
+
+
+async def write_activity(db, boards, table, guild_id, user_id, xp, write_global=True):
+    """Same order as Events.write_usage_data: write under the lock, then update the boards."""
+    async with boards.lock:
+        db.activity[table][(guild_id, user_id)] = (
+            db.activity[table].get((guild_id, user_id), 0) + xp
+        )
+        if write_global:
+            db.global_xp[table][user_id] = db.global_xp[table].get(user_id, 0) + xp
+        boards.add_activity(
+            table,
+            [(guild_id, user_id, False, xp, 1)],
+            [(user_id, False, xp, 1)] if write_global else [],
+        )
+
+
+def test_writes_during_a_reload_are_neither_lost_nor_counted_twice():
+    async def run():
+        db = FakeDatabase()
+        db.write("user_activity", 1, 10, 100)
+        db.write("user_activity", 1, 11, 50)
+        boards = make_leaderboards(db)
+        await boards.reload_activity(["user_activity"])
+
+        # lands in the middle of the next reload, after its snapshot was taken
+        db.on_read = lambda: write_activity(db, boards, "user_activity", 1, 11, 80)
+        await write_activity(db, boards, "user_activity", 1, 10, 5)
+        await boards.reload_activity(["user_activity"])
+
+        board = boards.board("user_activity", 1)
+        assert board.score(10) == 105
+        assert board.score(11) == 130
+        assert board.rank(11) == 1
+        assert boards.board("user_activity").score(11) == 130
+        assert boards.journals == []
+
+    asyncio.run(run())
+
+
+def test_a_failed_global_write_is_fixed_by_the_resync():
+    async def run():
+        db = FakeDatabase()
+        boards = make_leaderboards(db)
+        await boards.reload_activity(["user_activity"])
+
+        await write_activity(db, boards, "user_activity", 1, 10, 20, write_global=False)
+        assert boards.board("user_activity", 1).score(10) == 20
+        assert 10 not in boards.board("user_activity")
+
+        db.global_xp["user_activity"][10] = 20
+        await boards.reload_activity(boards.activity_tables)
+        assert boards.board("user_activity").score(10) == 20
+
+    asyncio.run(run())
+
+
+def test_boards_are_read_from_the_database_until_loaded():
+    async def run():
+        db = FakeDatabase()
+        db.typing_stats = [(1, 90, 3, 25), (1, 120, 2, 50), (1, 120, 5, 10), (2, 100, 1, 25)]
+        boards = make_leaderboards(db)
+
+        wpm = await boards.get("wpm")
+        # date and word count of the best run, the first one of equal runs
+        assert list(wpm) == [(1, 120, (2, 50)), (2, 100, (1, 25))]
+
+        boards.ready.set()
+        assert list(await boards.get("wpm")) == []
+
+    asyncio.run(run())
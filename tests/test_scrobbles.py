@@ -0,0 +1,274 @@
+"""
+Scrobble mirror sync against a fake Last.fm api.
+
+The paging tests use an in-memory stand-in for the database. The playcount aggregates are
+plain SQL, so those are checked against a real MariaDB when MISOBOT_TEST_DB_NAME is set
+(using MISOBOT_DB_USER and MISOBOT_DB_PASSWORD), and skipped otherwise.
+"""
+
+import os
+import re
+import asyncio
+from collections import Counter
+from time import time
+import arrow
+import pytest
+from modules import scrobbles
+
+
+class FakeLastFm:
+    """user.getrecenttracks with the paging of the real api: newest first, from and to inclusive."""
+
+    def __init__(self, tracks=(), now_playing=False):
+        # list of (artist, album, track, uts)
+        self.tracks = list(tracks)
+        self.now_playing = now_playing
+        self.requests = []
+        self.on_request = None
+
+    def add(self, count, start, artists=("Artist A", "Artist B", "Artist C")):
+        for i in range(count):
+            artist = artists[i % len(artists)]
+            self.tracks.append((artist, f"{artist} album", f"track {start + i}", start + i))
+
+    async def api_request(self, params, ignore_errors=False, bulk_group=None):
+        self.requests.append(dict(params))
+        if self.on_request is not None:
+            self.on_request(params)
+
+        selected = sorted(
+            (t for t in self.tracks if params["from"] <= t[3] <= params["to"]),
+            key=lambda t: t[3],
+            reverse=True,
+        )
+        limit = params["limit"]
+        total_pages = (len(selected) + limit - 1) // limit
+        page = params["page"]
+        tracks = [
+            {
+                "artist": {"#text": artist},
+                "album": {"#text": album},
+                "name": name,
+                "date": {"uts": str(uts)},
+                "image": [{"#text": f"https://img/{album}.png"}],
+            }
+            for artist, album, name, uts in selected[(page - 1) * limit : page * limit]
+        ]
+        if page == 1 and self.now_playing:
+            tracks.insert(
+                0,
+                {
+                    "artist": {"#text": "Now"},
+                    "album": {"#text": "Playing"},
+                    "name": "now playing",
+                    "@attr": {"nowplaying": "true"},
+                    "image": [],
+                },
+            )
+        return {
+            "recenttracks": {
+                "track": tracks,
+                "@attr": {"user": params["user"], "totalPages": str(total_pages)},
+            }
+        }
+
+
+class FakeDatabase:
+    """Just enough of the scrobble tables to follow the sync state."""
+
+    def __init__(self):
+        self.scrobbles = {}
+        self.last_scrobble = {}
+        self.synced_on = {}
+
+    async def execute(self, statement, *params, one_value=False, **kwargs):
+        statement = " ".join(statement.split())
+        if statement.startswith("SELECT last_scrobble"):
+            return self.last_scrobble.get(params[0])
+        if statement.startswith("SELECT lastfm_username, synced_on"):
+            return [(u, self.synced_on.get(u)) for u in params[0] if u in self.synced_on]
+        if statement.startswith("SELECT lastfm_username FROM lastfm_sync_state"):
+            fresh_since, usernames = params
+            return [u for u in usernames if self.synced_on.get(u, fresh_since) > fresh_since]
+        if "lastfm_sync_state (lastfm_username, last_scrobble)" in statement:
+            username, value = params
+            self.last_scrobble[username] = max(self.last_scrobble.get(username, 0), value)
+        elif "lastfm_sync_state (lastfm_username, synced_on)" in statement:
+            self.synced_on[params[0]] = params[1]
+        return ()
+
+    async def executemany(self, statement, rows):
+        for row in rows:
+            self.scrobbles.setdefault((row[0], row[4], row[3]), row)
+
+
+class FakeBot:
+    def __init__(self, db):
+        self.db = db
+
+
+def make_mirror(api, db=None, page_size=200, max_pages=50):
+    mirror = scrobbles.ScrobbleMirror(FakeBot(db or FakeDatabase()), api.api_request)
+    mirror.page_size = page_size
+    mirror.max_pages = max_pages
+    return mirror
+
+
+def test_initial_sync_goes_through_pages_oldest_first():
+    api = FakeLastFm(now_playing=True)
+    api.add(450, start=1000)
+    mirror = make_mirror(api)
+
+    assert asyncio.run(mirror.sync_user("someone"))
+    # the first page tells the page count, the rest are fetched from the oldest
+    assert [r["page"] for r in api.requests] == [1, 3, 2]
+    assert len({r["to"] for r in api.requests}) == 1
+    db = mirror.bot.db
+    assert len(db.scrobbles) == 450
+    assert db.last_scrobble["someone"] == 1449
+    assert "someone" in db.synced_on
+
+
+def test_incremental_sync_starts_after_the_newest_scrobble():
+    api = FakeLastFm()
+    api.add(10, start=1000)
+    mirror = make_mirror(api)
+    asyncio.run(mirror.sync_user("someone"))
+
+    api.add(5, start=2000)
+    api.requests.clear()
+    assert asyncio.run(mirror.sync_user("someone"))
+    assert api.requests[0]["from"] == 1010
+    assert len(mirror.bot.db.scrobbles) == 15
+    assert mirror.bot.db.last_scrobble["someone"] == 2004
+
+
+def test_scrobbles_after_the_range_wait_for_the_next_sync(monkeypatch):
+    clock = [5000]
+    monkeypatch.setattr(scrobbles, "time", lambda: clock[0])
+    api = FakeLastFm()
+    api.add(300, start=1000)
+    mirror = make_mirror(api, page_size=100)
+
+    def scrobble_during_sync(params):
+        if params["page"] == 1 and len(api.requests) == 1:
+            api.tracks.append(("Late", "Late album", "late track", params["to"] + 1))
+
+    api.on_request = scrobble_during_sync
+    assert asyncio.run(mirror.sync_user("someone"))
+    # pages stay stable while new scrobbles arrive, nothing is skipped or stored twice
+    assert len(mirror.bot.db.scrobbles) == 300
+
+    api.on_request = None
+    clock[0] += 60
+    asyncio.run(mirror.sync_user("someone"))
+    assert len(mirror.bot.db.scrobbles) == 301
+
+
+def test_interrupted_backfill_continues_on_the_next_run():
+    api = FakeLastFm()
+    api.add(500, start=1000)
+    mirror = make_mirror(api, page_size=100, max_pages=2)
+    db = mirror.bot.db
+
+    assert not asyncio.run(mirror.sync_user("someone"))
+    assert len(db.scrobbles) == 200
+    assert db.last_scrobble["someone"] == 1199
+    assert "someone" not in db.synced_on
+
+    runs = 1
+    while True:
+        runs += 1
+        if asyncio.run(mirror.sync_user("someone")):
+            break
+    assert runs == 3
+    assert sorted(key[1] for key in db.scrobbles) == list(range(1000, 1500))
+
+
+def test_sync_all_only_takes_candidates_least_recently_synced_first():
+    class Cache:
+        lastfm_users = {1: "member", 2: "stranger", 3: "active", 4: "synced"}
+
+    db = FakeDatabase()
+    db.synced_on = {"member": 20, "synced": 10}
+    bot = FakeBot(db)
+    bot.cache = Cache()
+    bot.get_user = lambda user_id: object() if user_id in (1, 4) else None
+    api = FakeLastFm()
+    mirror = scrobbles.ScrobbleMirror(bot, api.api_request)
+    mirror.mark_active("Active")
+    mirror.users_per_pass = 2
+
+    assert mirror.sync_candidates() == {"member", "active", "synced"}
+    asyncio.run(mirror.sync_all())
+    assert [r["user"] for r in api.requests] == ["active", "synced"]
+
+
+def test_only_recently_synced_users_are_served_from_the_mirror():
+    api = FakeLastFm()
+    api.add(10, start=1000)
+    mirror = make_mirror(api)
+    db = mirror.bot.db
+    asyncio.run(mirror.sync_user("fresh"))
+    asyncio.run(mirror.sync_user("stale"))
+    db.synced_on["stale"] = arrow.utcnow().shift(seconds=-mirror.max_age - 60).datetime
+
+    synced = asyncio.run(mirror.synced_usernames(["fresh", "stale", "never"]))
+    assert synced == {"fresh"}
+
+
+@pytest.mark.skipif(
+    not os.environ.get("MISOBOT_TEST_DB_NAME"), reason="MISOBOT_TEST_DB_NAME is not set"
+)
+def test_playcounts_match_the_stored_scrobbles():
+    from modules import maria
+
+    async def run():
+        bot = FakeBot(None)
+        bot.loop = asyncio.get_event_loop()
+        os.environ["MISOBOT_DB_NAME"] = os.environ["MISOBOT_TEST_DB_NAME"]
+        bot.db = maria.MariaDB(bot)
+        await bot.db.wait_for_pool()
+        with open(os.path.join(os.path.dirname(__file__), "..", "sql", "schema.sql")) as file:
+            for statement in re.findall(
+                r"CREATE TABLE IF NOT EXISTS lastfm_(?:scrobble|\w+_playcount|sync_state) \(.*?\);",
+                file.read(),
+                re.S,
+            ):
+                await bot.db.execute(statement)
+        for table in ["scrobble", "artist_playcount", "album_playcount", "track_playcount"]:
+            await bot.db.execute(
+                f"DELETE FROM lastfm_{table} WHERE lastfm_username = %s", "mirror-test"
+            )
+        await bot.db.execute(
+            "DELETE FROM lastfm_sync_state WHERE lastfm_username = %s", "mirror-test"
+        )
+
+        api = FakeLastFm()
+        now = int(time())
+        api.add(350, start=now - 10000, artists=("Artist A", "Artist A", "Artist B"))
+        mirror = scrobbles.ScrobbleMirror(bot, api.api_request)
+        mirror.page_size = 100
+        assert await mirror.sync_user("mirror-test")
+
+        # storing a page again must not count it twice
+        page = (await api.api_request(dict(api.requests[0], page=2)))["recenttracks"]["track"]
+        await mirror.store_scrobbles("mirror-test", page)
+
+        expected = Counter(artist for artist, _, _, _ in api.tracks)
+        artists = await mirror.artist_playcounts("Artist A", ["mirror-test"])
+        assert artists == {"mirror-test": expected["Artist A"]}
+        top = await mirror.combined_top("artist", ["mirror-test"])
+        assert {a["name"]: int(a["playcount"]) for a in top} == dict(expected)
+        # only each user's own top items are counted
+        top = await mirror.combined_top("artist", ["mirror-test"], per_user=1)
+        assert {a["name"]: int(a["playcount"]) for a in top} == {"Artist A": expected["Artist A"]}
+        albums = await mirror.album_playcounts("Artist B", "Artist B album", ["mirror-test"])
+        assert albums == {"mirror-test": expected["Artist B"]}
+        tracks = await mirror.track_playcounts("Artist A", "track 0", ["mirror-test"])
+        assert tracks == {}
+        tracks = await mirror.track_playcounts("Artist A", f"track {now - 10000}", ["mirror-test"])
+        assert tracks == {"mirror-test": 1}
+        await bot.db.cleanup()
+
+    asyncio.run(run())